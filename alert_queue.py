@@ -0,0 +1,55 @@
+import threading
+
+# Sessions whose latest notification can wait in the queue at once
+ALERT_QUEUE_SIZE = 1000
+
+
+class CoalescingQueue:
+    """Hands the latest notification per session from the alert thread to a consumer.
+
+    put() replaces the pending entry of the same session, so a burst of
+    notifications costs the consumer one update. At most max_keys sessions
+    wait at once, and entries for further sessions are dropped. With a
+    registry the queued, coalesced and dropped entries are counted and the
+    depth is exposed. on_first_put runs on the producer thread whenever the
+    queue stops being empty, so a sleeping consumer can be woken.
+    """
+
+    def __init__(self, max_keys=ALERT_QUEUE_SIZE, registry=None, on_first_put=None):
+        self.max_keys = max_keys
+        self.on_first_put = on_first_put
+        self._pending = {}  # key -> latest item, in order of first arrival
+        self._lock = threading.Lock()
+        self._entries = None
+        if registry is not None:
+            self._entries = registry.counter(
+                "plex_skip_alert_queue_entries_total", "Notifications by what the queue did with them", ("result",))
+            registry.gauge("plex_skip_alert_queue_depth", "Sessions with a notification waiting", self.__len__)
+
+    def __len__(self):
+        return len(self._pending)
+
+    def put(self, key, item):
+        """Queue item as the latest for key; False if it was dropped because the queue is full."""
+        with self._lock:
+            if key in self._pending:
+                result = "coalesced"
+            elif len(self._pending) >= self.max_keys:
+                result = "dropped"
+            else:
+                result = "queued"
+            if result != "dropped":
+                self._pending[key] = item
+            first = result == "queued" and len(self._pending) == 1
+        if self._entries is not None:
+            self._entries.inc(result)
+        if first and self.on_first_put:
+            self.on_first_put()
+        return result != "dropped"
+
+    def drain(self):
+        """Take every waiting item, oldest session first."""
+        with self._lock:
+            items = list(self._pending.values())
+            self._pending.clear()
+        return items
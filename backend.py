@@ -1,23 +1,126 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from sqlalchemy import create_engine, Column, Integer, String, JSON, UniqueConstraint, update, and_
+from sqlalchemy import (
+    create_engine, event, func, Boolean, Column, Float, Index, Integer, String, JSON, UniqueConstraint, update, and_
+)
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from typing import Optional, List
+from contextlib import asynccontextmanager
+import asyncio
+import enum
+import json
+import logging
+import math
+import os
+import threading
+import time
 import sqlalchemy
 
+try:
+    import orjson
+except ImportError:  # Optional dependency, fall back to the standard library
+    orjson = None
+
+try:
+    from brotli_asgi import BrotliMiddleware
+except ImportError:  # Optional dependency, fall back to gzip
+    BrotliMiddleware = None
+
+import metrics
+import wire_format
+from jobs import FAILED, FINISHED, QUEUED, RUNNING, JobQueueFull, JobRunner, JobStore
+from log_setup import setup_logging
+from singleflight import SingleFlight
+from snapshot import SnapshotStore, SnapshotWriter
+from title_index import TitleIndex, normalize_title, release_year
+
+logger = logging.getLogger("plex_skip.backend")
+
 # Database setup
-DATABASE_URL = "sqlite:///./media.db"
+DATABASE_URL = os.getenv("PLEX_SKIP_DATABASE_URL", "sqlite:///./media.db")
 Base = declarative_base()
-engine = create_engine(DATABASE_URL)
+engine = create_engine(
+    DATABASE_URL,
+    json_serializer=(lambda value: orjson.dumps(value).decode()) if orjson else json.dumps,
+    json_deserializer=orjson.loads if orjson else json.loads
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Set by the production entry point once it has migrated, so workers skip it
+DATABASE_PREPARED_ENV = "PLEX_SKIP_DATABASE_PREPARED"
+# Milliseconds a writer waits for another worker's write lock before failing
+SQLITE_BUSY_TIMEOUT_MS = 5000
+# Seconds shutdown waits for requests still using the database
+SHUTDOWN_DRAIN_TIMEOUT = 30
+# Seconds between folds of new segment events into the titles' timestamps
+COMPACTION_INTERVAL = float(os.getenv("PLEX_SKIP_COMPACTION_INTERVAL", "30"))
+# Titles one skip plan batch request may ask for
+SKIP_PLAN_BATCH_LIMIT = 200
+# Milliseconds skip plan buffers are rounded to, so nearby buffers share one stored plan
+SKIP_PLAN_BUFFER_STEP_MS = 100
+# Ranges added at once beyond which the whole list is merged again instead of inserting each
+INSERT_MERGE_LIMIT = 16
+# Titles a maintenance job handles per transaction
+JOB_BATCH_SIZE = 500
+# Jobs listed by GET /jobs/, newest first
+JOB_LIST_LIMIT = 50
+# Request header naming who made an edit, kept with the segment events
+AUTHOR_HEADER = "X-Plex-Skip-Author"
+# Snapshot file a read-only edge node serves from; the database is not opened when set
+SNAPSHOT_PATH = os.getenv("PLEX_SKIP_SNAPSHOT")
+# Snapshot file the export-snapshot job of a primary writes, the job is only offered when it is set
+SNAPSHOT_EXPORT_PATH = os.getenv("PLEX_SKIP_SNAPSHOT_EXPORT")
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers in every worker proceed while one worker writes
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+class Category(str, enum.Enum):
+    """Content categories a timestamp range can be tagged with."""
+    NUDITY = "nudity"
+    GORE = "gore"
+    VIOLENCE = "violence"
+    DRUGS = "drugs"
+    OTHER = "other"
+
+
+# Each category owns one bit of a category mask
+CATEGORY_BITS = {category: 1 << position for position, category in enumerate(Category)}
+ALL_CATEGORIES_MASK = sum(CATEGORY_BITS.values())
+
+
+def categories_to_mask(categories) -> int:
+    """Convert a list of category names to a bitmask."""
+    mask = 0
+    for category in categories or []:
+        mask |= CATEGORY_BITS[Category(category)]
+    return mask
+
+
+def mask_to_categories(mask: int) -> List[str]:
+    """Convert a bitmask back to a list of category names."""
+    return [category.value for category, bit in CATEGORY_BITS.items() if mask & bit]
+
 
 # Database Models
 class Movie(Base):
     __tablename__ = "movies"
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, unique=True, index=True)
+    normalized_title = Column(String, index=True)  # See title_index.normalize_title
     timestamps = Column(JSON)  # Changed back to timestamps
+    compacted_event_id = Column(Integer, default=0)  # Last SegmentEvent folded into timestamps
+    last_event_id = Column(Integer, default=0)  # Last SegmentEvent recorded for the title
 
 
 class TVShow(Base):
@@ -28,12 +131,92 @@ class TVShow(Base):
     episode_number = Column(String)
     title = Column(String)
     timestamps = Column(JSON)  # Changed back to timestamps
+    compacted_event_id = Column(Integer, default=0)  # Last SegmentEvent folded into timestamps
+    last_event_id = Column(Integer, default=0)  # Last SegmentEvent recorded for the title
+
+
+class Profile(Base):
+    __tablename__ = "profiles"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, index=True)
+    category_mask = Column(Integer, default=ALL_CATEGORIES_MASK)  # Categories this viewer skips
+
+
+class SkipPlan(Base):
+    """Ready-to-execute skip ranges for one (media, profile, buffer) combination."""
+    __tablename__ = "skip_plans"
+    id = Column(Integer, primary_key=True, index=True)
+    media_type = Column(String)  # "movie" or "episode"
+    media_id = Column(Integer)
+    profile_id = Column(Integer)  # 0 when no profile was requested
+    buffer_ms = Column(Integer)
+    plan = Column(JSON)  # Sorted, non-overlapping [start_time, end_time, label] triples
+    event_id = Column(Integer, default=0)  # The title's last_event_id when the plan was built
+
+    __table_args__ = (
+        UniqueConstraint('media_type', 'media_id', 'profile_id', 'buffer_ms', name='unique_skip_plan'),
+    )
+
+class MediaIdentity(Base):
+    """Integer surrogate key tying Plex identifiers to a stored movie or episode."""
+    __tablename__ = "media_identities"
+    id = Column(Integer, primary_key=True, index=True)
+    media_type = Column(String)  # "movie" or "episode"
+    media_id = Column(Integer)
+    rating_key = Column(Integer, index=True)  # Plex ratingKey on our server
+
+    __table_args__ = (
+        UniqueConstraint('media_type', 'media_id', name='unique_media_identity'),
+    )
+
+
+class MediaGuid(Base):
+    __tablename__ = "media_guids"
+    id = Column(Integer, primary_key=True, index=True)
+    guid = Column(String, unique=True, index=True)  # e.g. imdb://tt0133093, tmdb://603, plex://movie/...
+    identity_id = Column(Integer, index=True)
+
+
+class SegmentEvent(Base):
+    """One edit of a title's ranges, kept as history after it was folded into the title's timestamps."""
+    __tablename__ = "segment_events"
+    id = Column(Integer, primary_key=True)  # Edits of a title apply in id order
+    media_type = Column(String)  # "movie" or "episode"
+    media_id = Column(Integer)
+    action = Column(String)  # "add", "update", "delete" or "replace"
+    index = Column(Integer)  # Position updated or deleted
+    data = Column(JSON)  # Ranges added, the updated range, or the whole list of a replace
+    author = Column(String)
+    created_at = Column(Float)
+
+    __table_args__ = (
+        Index('ix_segment_events_media', 'media_type', 'media_id', 'id'),
+    )
+
+
+class Job(Base):
+    """A background maintenance job and its latest recorded state."""
+    __tablename__ = "jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String)
+    status = Column(String, index=True)  # queued, running, succeeded, failed or cancelled
+    params = Column(JSON)
+    result = Column(JSON)
+    error = Column(String)
+    done = Column(Integer, default=0)  # Units of work done out of total, as counted by the job
+    total = Column(Integer)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(Float)
+    started_at = Column(Float)
+    finished_at = Column(Float)
+
 
 class UpdateTimestampRequest(BaseModel):
     index: int
     start_time: float
     end_time: float
     label: Optional[str] = None
+    categories: List[Category] = []
 
 class DeleteTimestampRequest(BaseModel):
     index: int
@@ -48,11 +231,14 @@ class TimestampRange(BaseModel):
     start_time: float = Field(..., description="Start time of the range in seconds")
     end_time: float = Field(..., description="End time of the range in seconds")
     label: Optional[str] = Field(None, description="Optional label for this timestamp range")
+    categories: List[Category] = Field(default_factory=list, description="Content categories covered by this range")
 
 
 class AddMovieRequest(BaseModel):
     title: str
     timestamps: List[TimestampRange]  # Changed to match expected field name
+    rating_key: Optional[int] = None
+    guids: List[str] = []
 
 
 class AddTVShowRequest(BaseModel):
@@ -61,6 +247,8 @@ class AddTVShowRequest(BaseModel):
     episode_number: str
     title: str
     timestamps: List[TimestampRange]  # Changed to match expected field name
+    rating_key: Optional[int] = None
+    guids: List[str] = []
 
 
 class GetMediaRequest(BaseModel):
@@ -68,19 +256,177 @@ class GetMediaRequest(BaseModel):
     show_name: Optional[str] = None
     season: Optional[str] = None
     episode_number: Optional[str] = None
+    rating_key: Optional[int] = None  # Plex ratingKey, checked before the names
+    guids: List[str] = []  # Plex GUIDs, checked before the names
+    profile: Optional[str] = None  # Viewer profile whose skip ranges should be included
+
+
+class ProfileRequest(BaseModel):
+    name: str
+    categories: List[Category]
+
+
+class SkipPlanRequest(GetMediaRequest):
+    buffer_seconds: float = Field(0, ge=0, description="Extra seconds skipped around every range")
+
+
+class SkipPlanBatchRequest(BaseModel):
+    items: List[GetMediaRequest] = Field(max_length=SKIP_PLAN_BATCH_LIMIT)
+    buffer_seconds: float = Field(0, ge=0, description="Extra seconds skipped around every range")
+    profile: Optional[str] = None
+
+
+class JobRequest(BaseModel):
+    kind: str
+    params: dict = {}
+
+
+# Responses smaller than this are not worth compressing
+COMPRESSION_MINIMUM_SIZE = 1024
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, several times faster for long timestamp lists."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+DefaultJSONResponse = FastJSONResponse if orjson else JSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global snapshots
+    setup_logging()
+    if SNAPSHOT_PATH:
+        snapshots = SnapshotStore(SNAPSHOT_PATH)
+        snapshots.start()
+    else:
+        if not os.getenv(DATABASE_PREPARED_ENV):
+            prepare_database(engine)
+            fail_interrupted_jobs(engine)
+        segment_compactor.start()
+        jobs.start()
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    if snapshots:
+        snapshots.stop()
+        return
+    segment_compactor.stop()
+    await asyncio.to_thread(jobs.shutdown)
+    if not await asyncio.to_thread(wait_for_in_flight_sessions, SHUTDOWN_DRAIN_TIMEOUT):
+        logger.warning("Shutting down with requests still using the database")
+    engine.dispose()
+
+
+# Requests an edge node serves from its snapshot, everything else needs the primary
+EDGE_ROUTES = {
+    ("POST", "/movies/get-timestamps/"),
+    ("POST", "/tv-shows/get-timestamps/"),
+    ("POST", "/skip-plans/get/"),
+    ("POST", "/skip-plans/batch/"),
+    ("GET", "/metrics"),
+    ("GET", "/healthz"),
+    ("GET", "/readyz"),
+}
+
+
+class EdgeReadOnlyMiddleware:
+    """ASGI middleware refusing requests a read-only edge node cannot serve."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            method, path = scope["method"], scope["path"]
+            media_read = method == "GET" and path.startswith("/media/") and path.endswith("/timestamps")
+            if (method, path) not in EDGE_ROUTES and not media_read:
+                response = DefaultJSONResponse({"detail": "Read-only edge node, send this to the primary"},
+                                               status_code=405)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
 
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(default_response_class=DefaultJSONResponse, lifespan=lifespan)
+app.state.ready = False
+if BrotliMiddleware:
+    app.add_middleware(BrotliMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE, gzip_fallback=True)
+else:
+    app.add_middleware(GZipMiddleware, minimum_size=COMPRESSION_MINIMUM_SIZE)
+
+# Metrics
+registry = metrics.Registry()
+REQUESTS = registry.counter(
+    "plex_skip_requests_total", "HTTP requests by method, route and status", ("method", "route", "status"))
+REQUEST_LATENCY = registry.histogram(
+    "plex_skip_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+DB_QUERY_SECONDS = registry.histogram(
+    "plex_skip_db_query_seconds", "Database statement execution time", ("statement",))
+SKIP_PLAN_LOOKUPS = registry.counter(
+    "plex_skip_skip_plan_lookups_total", "Skip plan reads served materialized (hit) or built (miss)", ("result",))
+registry.gauge(
+    "plex_skip_skip_plan_hit_ratio", "Share of skip plan reads served from the materialized table",
+    lambda: SKIP_PLAN_LOOKUPS.value("hit") / max(1, SKIP_PLAN_LOOKUPS.value("hit") + SKIP_PLAN_LOOKUPS.value("miss")))
+TITLE_LOOKUPS = registry.counter(
+    "plex_skip_title_lookups_total", "Movie lookups by how the title was resolved", ("match",))
+MERGE_SECONDS = registry.histogram(
+    "plex_skip_merge_seconds", "Time spent merging overlapping ranges per call")
+SEGMENTS = registry.histogram(
+    "plex_skip_segments", "Ranges per title read or written", ("operation",), buckets=metrics.COUNT_BUCKETS)
+if SNAPSHOT_PATH:
+    app.add_middleware(EdgeReadOnlyMiddleware)
+app.add_middleware(metrics.MetricsMiddleware, requests=REQUESTS, latency=REQUEST_LATENCY)
+
+# Concurrent identical reads, such as many players starting the same new episode, share one query
+READS = SingleFlight(registry)
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    DB_QUERY_SECONDS.observe(elapsed, statement.split(None, 1)[0].upper())
+
+
+@event.listens_for(engine, "handle_error")
+def discard_query_timer(context):
+    # Failed statements never reach after_cursor_execute
+    if context.connection is not None and context.connection.info.get("query_start"):
+        context.connection.info["query_start"].pop()
+
+
+# Requests holding a database session; shutdown waits until none are left
+in_flight_sessions = 0
+in_flight_changed = threading.Condition()
+
+
+def wait_for_in_flight_sessions(timeout: float) -> bool:
+    """Block until no request holds a database session; False if timeout passed first."""
+    with in_flight_changed:
+        return in_flight_changed.wait_for(lambda: in_flight_sessions == 0, timeout)
 
 
 # Dependency
 def get_db():
+    global in_flight_sessions
+    with in_flight_changed:
+        in_flight_sessions += 1
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+        with in_flight_changed:
+            in_flight_sessions -= 1
+            in_flight_changed.notify_all()
 
 
 def ranges_overlap(range1: TimestampRange, range2: TimestampRange) -> bool:
@@ -89,20 +435,32 @@ def ranges_overlap(range1: TimestampRange, range2: TimestampRange) -> bool:
             range1.end_time >= range2.start_time)
 
 
-def merge_overlapping_ranges(ranges: List[TimestampRange]) -> List[TimestampRange]:
-    """Merge any overlapping timestamp ranges with improved label handling"""
+@MERGE_SECONDS.time()
+def merge_overlapping_ranges(ranges: List[TimestampRange], by_category: bool = True) -> List[TimestampRange]:
+    """Merge any overlapping timestamp ranges with improved label handling
+
+    With by_category set only ranges tagged with the same categories are merged,
+    so overlapping ranges of different categories keep their own tags. Without
+    it every overlap is merged and the categories are combined.
+    """
     if not ranges:
         return []
 
     # Sort ranges by start time
     sorted_ranges = sorted(ranges, key=lambda x: x.start_time)
-    merged = [sorted_ranges[0]]
-
-    for current in sorted_ranges[1:]:
-        last = merged[-1]
-        if ranges_overlap(last, current):
+    merged = []
+    # Most recently merged range for each category group
+    last_by_group = {}
+
+    for current in sorted_ranges:
+        group = frozenset(current.categories) if by_category else None
+        last = last_by_group.get(group)
+        if last is not None and ranges_overlap(last, current):
             # Merge overlapping ranges
             last.end_time = max(last.end_time, current.end_time)
+            if not by_category:
+                last.categories = sorted(set(last.categories) | set(current.categories),
+                                         key=list(Category).index)
 
             # Handle labels
             if current.label:
@@ -115,98 +473,575 @@ def merge_overlapping_ranges(ranges: List[TimestampRange]) -> List[TimestampRang
                     last.label = current.label
         else:
             merged.append(current)
+            last_by_group[group] = current
 
     return merged
 
 
+# Normalization: every stored list is kept valid, sorted by start time and merged
+# per category group, so a merged list has no duplicates either.
+def range_error(start_time, end_time) -> Optional[str]:
+    """Why a range cannot be stored, None when it is valid."""
+    if not (math.isfinite(start_time) and math.isfinite(end_time)):
+        return "start_time and end_time must be finite"
+    if start_time < 0:
+        return "start_time must not be negative"
+    if end_time <= start_time:
+        return "end_time must be after start_time"
+    return None
+
+
+def validate_range(start_time, end_time):
+    error = range_error(start_time, end_time)
+    if error:
+        raise HTTPException(status_code=400, detail=f"Invalid range {start_time}-{end_time}: {error}")
+
+
+def normalize_ranges(timestamps) -> List[dict]:
+    """Bring a list of stored ranges into normal form, dropping invalid ones."""
+    valid = []
+    for ts in timestamps or []:
+        if range_error(ts['start_time'], ts['end_time']):
+            logger.warning("Dropping invalid range", extra={"range": ts})
+        else:
+            valid.append(TimestampRange(**ts))
+    return [ts.dict() for ts in merge_overlapping_ranges(valid)]
+
+
+def category_group(ts: dict) -> frozenset:
+    # Stored ranges hold category strings, ranges from a request Category members
+    return frozenset(Category(category) for category in ts.get('categories') or [])
+
+
+def insert_range(timestamps: List[dict], new_range: dict) -> List[dict]:
+    """Insert a valid range into a normalized list, merging it with the ranges around it only.
+
+    Gives the same list as normalize_ranges(timestamps + [new_range]) but only
+    the ranges new_range can touch are parsed and merged again: the closest
+    earlier range of its category group, since ranges of one group never
+    overlap each other, and everything starting before new_range ends.
+    """
+    low, high = 0, len(timestamps)
+    while low < high:
+        middle = (low + high) // 2
+        if timestamps[middle]['start_time'] <= new_range['start_time']:
+            low = middle + 1
+        else:
+            high = middle
+    position = low
+
+    group = category_group(new_range)
+    first = position
+    for index in range(position - 1, -1, -1):
+        if category_group(timestamps[index]) == group:
+            if timestamps[index]['end_time'] >= new_range['start_time']:
+                first = index
+            break
+    last = position
+    while last < len(timestamps) and timestamps[last]['start_time'] <= new_range['end_time']:
+        last += 1
+
+    window = timestamps[first:position] + [new_range] + timestamps[position:last]
+    merged = merge_overlapping_ranges([TimestampRange(**ts) for ts in window])
+    return timestamps[:first] + [ts.dict() for ts in merged] + timestamps[last:]
+
+
+def build_skip_ranges(timestamps, category_mask: int) -> List[dict]:
+    """Select the stored ranges a profile skips and merge them into one sorted list.
+
+    Uncategorized ranges are always skipped, matching the behaviour from before
+    ranges could be tagged.
+    """
+    selected = [
+        TimestampRange(**ts) for ts in (timestamps or [])
+        if not ts.get('categories') or categories_to_mask(ts['categories']) & category_mask
+    ]
+    return [ts.dict() for ts in merge_overlapping_ranges(selected, by_category=False)]
+
+
+def quantize_buffer(buffer_seconds: float) -> int:
+    """Buffer in milliseconds, rounded to SKIP_PLAN_BUFFER_STEP_MS."""
+    return int(round(buffer_seconds * 1000 / SKIP_PLAN_BUFFER_STEP_MS)) * SKIP_PLAN_BUFFER_STEP_MS
+
+
+def compute_skip_plan(timestamps, category_mask: int, buffer_ms: int) -> List[list]:
+    """Build the compact skip plan for a profile mask with the buffer already applied."""
+    buffer_seconds = buffer_ms / 1000
+    plan = []
+    for ts in build_skip_ranges(timestamps, category_mask):
+        start_time = max(0.0, ts['start_time'] - buffer_seconds)
+        end_time = ts['end_time'] + buffer_seconds
+        # Buffering can make neighbouring ranges overlap, fold them together
+        if plan and start_time <= plan[-1][1]:
+            plan[-1][1] = max(plan[-1][1], end_time)
+            if ts['label'] and ts['label'] != plan[-1][2]:
+                plan[-1][2] = f"{plan[-1][2]} | {ts['label']}" if plan[-1][2] else ts['label']
+        else:
+            plan.append([start_time, end_time, ts['label']])
+    return [[round(start, 3), round(end, 3), label] for start, end, label in plan]
+
+
+def refresh_profile_skip_plans(db: Session, profile: Profile):
+    """Recompute every stored skip plan of a profile after its categories changed."""
+    plans = db.query(SkipPlan).filter(SkipPlan.profile_id == profile.id).all()
+    for plan in plans:
+        model = Movie if plan.media_type == 'movie' else TVShow
+        media = db.get(model, plan.media_id)
+        timestamps = current_timestamps(db, plan.media_type, media) if media else []
+        plan.plan = compute_skip_plan(timestamps, profile.category_mask, plan.buffer_ms)
+        plan.event_id = (media.last_event_id or 0) if media else 0
+
+
+# Segment event log: writes append an event instead of rewriting the title's list,
+# reads fold the events not compacted yet on top of the stored list.
+def apply_segment_event(timestamps: list, segment_event: SegmentEvent) -> list:
+    """The ranges after one edit, in normal form when they were before it."""
+    if segment_event.action == "add":
+        if len(segment_event.data) > INSERT_MERGE_LIMIT:
+            return normalize_ranges(timestamps + segment_event.data)
+        for ts in segment_event.data:
+            timestamps = insert_range(timestamps, ts)
+        return timestamps
+    if segment_event.action == "replace":
+        return normalize_ranges(segment_event.data)
+    if segment_event.index is None or not 0 <= segment_event.index < len(timestamps):
+        # Validated when written, a concurrent delete can still leave it dangling
+        logger.warning("Skipping segment event with a dangling index", extra={"event": segment_event.id})
+        return timestamps
+    timestamps = timestamps[:segment_event.index] + timestamps[segment_event.index + 1:]
+    if segment_event.action == "update":
+        # The edited range moves to where its new start time sorts and merges with its neighbours
+        timestamps = insert_range(timestamps, segment_event.data)
+    return timestamps
+
+
+def pending_segment_events(db: Session, media_type: str, media) -> List[SegmentEvent]:
+    return db.query(SegmentEvent).filter(
+        SegmentEvent.media_type == media_type,
+        SegmentEvent.media_id == media.id,
+        SegmentEvent.id > (media.compacted_event_id or 0)
+    ).order_by(SegmentEvent.id).all()
+
+
+def fold_segment_events(timestamps, segment_events) -> list:
+    timestamps = list(timestamps or [])
+    for segment_event in segment_events:
+        timestamps = apply_segment_event(timestamps, segment_event)
+    return timestamps
+
+
+def stored_timestamps(media) -> list:
+    """The ranges stored on a title row, in normal form.
+
+    Rows never compacted may hold lists written before every write was
+    normalized; they are normalized here, until the normalize job stores
+    them normalized, so the indexes clients see match the order edits are
+    applied in.
+    """
+    if media.compacted_event_id:
+        return media.timestamps or []
+    return normalize_ranges(media.timestamps)
+
+
+def current_timestamps(db: Session, media_type: str, media) -> list:
+    """A title's ranges including the edits not compacted yet."""
+    return fold_segment_events(stored_timestamps(media), pending_segment_events(db, media_type, media))
+
+
+def record_baseline_event(db: Session, media_type: str, media, author: Optional[str] = None) -> SegmentEvent:
+    """Record the ranges stored before the log existed as its first event, so history starts from them."""
+    segment_event = SegmentEvent(media_type=media_type, media_id=media.id, action="replace",
+                                 data=stored_timestamps(media), author=author, created_at=time.time())
+    db.add(segment_event)
+    db.flush()
+    media.last_event_id = segment_event.id
+    # The ranges are unchanged, so are the title's stored plans
+    db.query(SkipPlan).filter(SkipPlan.media_type == media_type, SkipPlan.media_id == media.id).update(
+        {SkipPlan.event_id: segment_event.id}
+    )
+    return segment_event
+
+
+def refresh_media_skip_plans(db: Session, media_type: str, media, timestamps: Optional[list] = None):
+    """Recompute a title's stored skip plans after an edit, so reads keep finding them current.
+
+    timestamps are the ranges after the edit, folded here when not given.
+    """
+    plans = db.query(SkipPlan).filter(SkipPlan.media_type == media_type, SkipPlan.media_id == media.id).all()
+    if not plans:
+        return
+    if timestamps is None:
+        timestamps = current_timestamps(db, media_type, media)
+    profile_ids = {plan.profile_id for plan in plans if plan.profile_id}
+    masks = {
+        profile.id: profile.category_mask for profile in db.query(Profile).filter(Profile.id.in_(profile_ids))
+    } if profile_ids else {}
+    for plan in plans:
+        plan.plan = compute_skip_plan(timestamps, masks.get(plan.profile_id, ALL_CATEGORIES_MASK), plan.buffer_ms)
+        plan.event_id = media.last_event_id
+
+
+def record_segment_event(db: Session, media_type: str, media, action: str, index: Optional[int] = None,
+                         data=None, author: Optional[str] = None, refresh_plans: bool = True) -> SegmentEvent:
+    """Append an edit of a title's ranges; the list itself is only rewritten by compaction.
+
+    Indexes are not checked here, edits made through the API go through
+    record_segment_edit. The title's stored skip plans are recomputed in
+    the same transaction unless refresh_plans is off.
+    """
+    if not media.last_event_id and media.timestamps:
+        record_baseline_event(db, media_type, media)
+    segment_event = SegmentEvent(
+        media_type=media_type, media_id=media.id, action=action, index=index, data=data, author=author,
+        created_at=time.time()
+    )
+    db.add(segment_event)
+    db.flush()
+    media.last_event_id = segment_event.id
+    SEGMENTS.observe(len(data) if action in ("add", "replace") else 1, "write")
+    if refresh_plans:
+        refresh_media_skip_plans(db, media_type, media)
+    return segment_event
+
+
+def record_segment_edit(db: Session, media_type: str, media, action: str, index: Optional[int] = None,
+                        data=None, author: Optional[str] = None):
+    """Record an edit after checking its index against the title's latest ranges.
+
+    The title's row is written first, which takes the database write lock,
+    so no other worker's edit lands between the check and the event. Returns
+    the event and the ranges after it.
+    """
+    model = type(media)
+    db.execute(update(model).where(model.id == media.id).values(last_event_id=model.last_event_id))
+    db.refresh(media)
+    timestamps = current_timestamps(db, media_type, media)
+    if index is not None and not 0 <= index < len(timestamps):
+        raise HTTPException(status_code=404, detail="Timestamp index not found")
+    segment_event = record_segment_event(db, media_type, media, action, index, data, author, refresh_plans=False)
+    timestamps = apply_segment_event(timestamps, segment_event)
+    refresh_media_skip_plans(db, media_type, media, timestamps)
+    return segment_event, timestamps
+
+
+def create_media(db: Session, media, media_type: str, timestamps: list, author: Optional[str] = None):
+    """Store a new title with its first ranges, recording them as an already compacted event."""
+    db.add(media)
+    db.flush()
+    segment_event = record_segment_event(db, media_type, media, "add", data=timestamps, author=author)
+    db.flush()
+    media.timestamps = timestamps
+    media.compacted_event_id = segment_event.id
+
+
+def compact_media(db: Session, media_type: str, media_id: int) -> int:
+    """Fold a title's pending events into its stored ranges; returns how many were folded."""
+    model = Movie if media_type == "movie" else TVShow
+    media = db.get(model, media_id)
+    if media is None:
+        return 0
+    segment_events = pending_segment_events(db, media_type, media)
+    if not segment_events:
+        return 0
+    timestamps = fold_segment_events(stored_timestamps(media), segment_events)
+    last_event_id = segment_events[-1].id
+    # Another worker compacting the same title at once leaves this update without effect
+    db.execute(
+        update(model)
+        .where(model.id == media_id, func.coalesce(model.compacted_event_id, 0) == (media.compacted_event_id or 0))
+        .values(timestamps=timestamps, compacted_event_id=last_event_id)
+    )
+    return len(segment_events)
+
+
+def compact_segment_events(db: Session, after_event_id: int = 0, job=None) -> int:
+    """Compact every title with events newer than after_event_id; returns the newest event id seen."""
+    titles = db.query(SegmentEvent.media_type, SegmentEvent.media_id, func.max(SegmentEvent.id)).filter(
+        SegmentEvent.id > after_event_id
+    ).group_by(SegmentEvent.media_type, SegmentEvent.media_id).all()
+    newest = after_event_id
+    for done, (media_type, media_id, last_event_id) in enumerate(titles):
+        if job:
+            job.checkpoint(done, len(titles))
+        compact_media(db, media_type, media_id)
+        db.commit()
+        newest = max(newest, last_event_id)
+    return newest
+
+
+class SegmentCompactor:
+    """Background thread folding new segment events into the titles' stored ranges."""
+
+    def __init__(self, interval: float = COMPACTION_INTERVAL):
+        self.interval = interval
+        self.last_event_id = 0  # Events up to this one were compacted
+        self._stop = threading.Event()
+        self._thread = None
+
+    def compact(self):
+        with SessionLocal() as db:
+            self.last_event_id = compact_segment_events(db, self.last_event_id)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.compact()
+            except sqlalchemy.exc.SQLAlchemyError:
+                logger.exception("Segment compaction failed")
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="segment-compactor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+
+segment_compactor = SegmentCompactor()
+
+
+def resolve_identity(db: Session, rating_key: Optional[int] = None, guids=()) -> Optional[MediaIdentity]:
+    """Find the stored media for a Plex ratingKey or any of its GUIDs."""
+    if rating_key is not None:
+        identity = db.query(MediaIdentity).filter(MediaIdentity.rating_key == rating_key).first()
+        if identity:
+            return identity
+    if guids:
+        return db.query(MediaIdentity).join(
+            MediaGuid, MediaGuid.identity_id == MediaIdentity.id
+        ).filter(MediaGuid.guid.in_(list(guids))).first()
+    return None
+
+
+def link_identity(db: Session, media_type: str, media_id: int, rating_key: Optional[int] = None, guids=()):
+    """Record the Plex ratingKey and GUIDs of a stored movie or episode."""
+    if rating_key is None and not guids:
+        return None
+
+    identity = db.query(MediaIdentity).filter(
+        MediaIdentity.media_type == media_type,
+        MediaIdentity.media_id == media_id
+    ).first()
+    if not identity:
+        identity = MediaIdentity(media_type=media_type, media_id=media_id)
+        db.add(identity)
+        db.flush()
+
+    if rating_key is not None and identity.rating_key != rating_key:
+        # A ratingKey belongs to one item, drop it from whatever held it before
+        db.query(MediaIdentity).filter(
+            MediaIdentity.rating_key == rating_key
+        ).update({MediaIdentity.rating_key: None})
+        identity.rating_key = rating_key
+
+    known = {row.guid for row in db.query(MediaGuid.guid).filter(MediaGuid.guid.in_(list(guids)))}
+    for guid in guids:
+        if guid not in known:
+            db.add(MediaGuid(guid=guid, identity_id=identity.id))
+            known.add(guid)
+    return identity
+
+
+def find_media(db: Session, model, media_type: str, request: GetMediaRequest, name_filter):
+    """Load a movie or episode by Plex identifiers, falling back to its names.
+
+    Identifiers sent along with a name match are linked so the next lookup is
+    a single integer key lookup.
+    """
+    identity = resolve_identity(db, request.rating_key, request.guids)
+    if identity and identity.media_type == media_type:
+        media = db.get(model, identity.media_id)
+        if media:
+            return media
+
+    media = db.query(model).filter(name_filter).first()
+    if media and (request.rating_key is not None or request.guids):
+        link_identity(db, media_type, media.id, request.rating_key, request.guids)
+        db.commit()
+    return media
+
+
+# Trigram index over movie titles, topped up lazily from rows newer than it has seen
+movie_title_index = TitleIndex()
+
+
+def same_release(title: str, other: str) -> bool:
+    """Whether two titles do not name different release years, which normalization drops."""
+    year, other_year = release_year(title), release_year(other)
+    return year is None or other_year is None or year == other_year
+
+
+def find_similar_movie(db: Session, title: str, fuzzy: bool = True):
+    """Resolve a movie whose stored title differs slightly from the requested one.
+
+    Returns the movie and how it matched, or (None, None). Titles equal after
+    normalization hit an indexed column and match "normalized"; only when
+    that misses, and with fuzzy set, is the in-memory trigram index searched
+    for a "fuzzy" match. A fuzzy match may be another film, so callers must
+    not use it for skipping or editing.
+    """
+    normalized = normalize_title(title)
+    for movie in db.query(Movie).filter(Movie.normalized_title == normalized):
+        if same_release(title, movie.title):
+            TITLE_LOOKUPS.inc("normalized")
+            return movie, "normalized"
+    if not fuzzy:
+        TITLE_LOOKUPS.inc("miss")
+        return None, None
+
+    with movie_title_index.lock:
+        new_rows = db.query(Movie.id, Movie.title, Movie.normalized_title).filter(
+            Movie.id > movie_title_index.last_key
+        )
+        for row in new_rows:
+            movie_title_index.add(row.id, row.title, row.normalized_title)
+        key = movie_title_index.best_match(title)
+    movie = db.get(Movie, key) if key is not None else None
+    if movie is not None and not same_release(title, movie.title):
+        movie = None
+    TITLE_LOOKUPS.inc("fuzzy" if movie is not None else "miss")
+    return (movie, "fuzzy") if movie is not None else (None, None)
+
+
+def backfill_normalized_titles(bind):
+    """Fill normalized_title for movies stored before the column existed."""
+    with Session(bind) as db:
+        for movie in db.query(Movie).filter(Movie.normalized_title.is_(None)):
+            movie.normalized_title = normalize_title(movie.title)
+        db.commit()
+
+
+def negotiated_response(raw_request: Request, payload: dict):
+    """Encode a segment payload compactly when the client's Accept header prefers it.
+
+    JSON payloads are rendered directly, skipping FastAPI's jsonable_encoder
+    walk which costs more than the serialization itself for long lists.
+    """
+    SEGMENTS.observe(len(payload.get("timestamps", payload.get("plan")) or []), "read")
+    media_type = wire_format.negotiate(raw_request.headers.get("accept"))
+    if media_type is None:
+        return DefaultJSONResponse(payload)
+    return Response(content=wire_format.encode(payload, media_type), media_type=media_type)
+
+
+def get_profile_mask(db: Session, name: Optional[str]) -> Optional[int]:
+    """Look up the category mask of a viewer profile, None when no profile was requested."""
+    if not name:
+        return None
+    profile = db.query(Profile).filter(Profile.name == name).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+    return profile.category_mask
+
+
+def add_missing_columns(bind):
+    """Add columns and indexes introduced after a table was first created.
+
+    create_all only creates missing tables, so existing databases would otherwise
+    lack newer columns such as last_event_id.
+    """
+    inspector = sqlalchemy.inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        with bind.begin() as conn:
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(sqlalchemy.text(
+                        f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                    ))
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+def prepare_database(bind):
+    """Create missing tables and bring existing databases up to date."""
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    backfill_normalized_titles(bind)
+
+
+# Profile Endpoints
+@app.post("/profiles/")
+def save_profile(request: ProfileRequest, db: Session = Depends(get_db)):
+    mask = categories_to_mask(request.categories)
+    profile = db.query(Profile).filter(Profile.name == request.name).first()
+    if profile:
+        profile.category_mask = mask
+        refresh_profile_skip_plans(db, profile)
+    else:
+        profile = Profile(name=request.name, category_mask=mask)
+        db.add(profile)
+    db.commit()
+    return {
+        "message": f"Profile '{request.name}' saved",
+        "profile": {"name": request.name, "categories": mask_to_categories(mask)}
+    }
+
+
+@app.get("/profiles/")
+def list_profiles(db: Session = Depends(get_db)):
+    return {
+        "profiles": [
+            {"name": profile.name, "categories": mask_to_categories(profile.category_mask)}
+            for profile in db.query(Profile).order_by(Profile.name)
+        ]
+    }
+
+
 @app.post("/movies/update-timestamp/")
-async def update_movie_timestamp(
+def update_movie_timestamp(
         title: str,
         update_data: UpdateTimestampRequest,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        author: Optional[str] = Header(None, alias=AUTHOR_HEADER)
 ):
-    print(f"Updating timestamp for movie: {title}")
-    print(f"Update data received: {update_data}")
+    logger.debug("Updating movie timestamp", extra={"title": title, "index": update_data.index})
 
     movie = db.query(Movie).filter(Movie.title == title).first()
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    if not movie.timestamps or update_data.index >= len(movie.timestamps):
-        raise HTTPException(status_code=404, detail="Timestamp index not found")
+    validate_range(update_data.start_time, update_data.end_time)
 
-    print(f"Original timestamps: {movie.timestamps}")
-
-    # Create a new list with the updated timestamp
-    timestamps = movie.timestamps.copy()
-    timestamps[update_data.index] = {
+    segment_event, timestamps = record_segment_edit(db, "movie", movie, "update", update_data.index, {
         "start_time": float(update_data.start_time),  # Ensure float type
         "end_time": float(update_data.end_time),  # Ensure float type
-        "label": update_data.label
-    }
-
-    print(f"Modified timestamps: {timestamps}")
-
-    # Update the movie object with the new timestamps
-    movie.timestamps = timestamps
-
+        "label": update_data.label,
+        "categories": [category.value for category in update_data.categories]
+    }, author)
     try:
-        # Force the update by explicitly updating the timestamps column
-        db.execute(
-            update(Movie)
-            .where(Movie.title == title)
-            .values(timestamps=timestamps)
-        )
         db.commit()
-        db.refresh(movie)
-
-        print(f"Final timestamps after commit: {movie.timestamps}")
-
-        return {
-            "message": "Timestamp updated successfully",
-            "timestamps": movie.timestamps
-        }
     except Exception as e:
-        print(f"Error during update: {str(e)}")
+        logger.exception("Movie timestamp update failed", extra={"title": title})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+    return {"message": "Timestamp updated successfully", "timestamps": timestamps, "event_id": segment_event.id}
+
 @app.post("/movies/delete-timestamp/")
 def delete_movie_timestamp(
         title: str,
         delete_data: DeleteTimestampRequest,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        author: Optional[str] = Header(None, alias=AUTHOR_HEADER)
 ):
     movie = db.query(Movie).filter(Movie.title == title).first()
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
 
-    if not movie.timestamps or delete_data.index >= len(movie.timestamps):
-        raise HTTPException(status_code=404, detail="Timestamp index not found")
-
-    # Create a new list without the deleted timestamp
-    timestamps = movie.timestamps.copy()
-    timestamps.pop(delete_data.index)
-
-    # Update using SQLAlchemy update statement
-    stmt = (
-        update(Movie)
-        .where(Movie.title == title)
-        .values(timestamps=timestamps)
-    )
-    db.execute(stmt)
+    segment_event, timestamps = record_segment_edit(db, "movie", movie, "delete", delete_data.index, author=author)
     db.commit()
-
-    # Fetch the updated movie to verify changes
-    updated_movie = db.query(Movie).filter(Movie.title == title).first()
-    return {
-        "message": "Timestamp deleted successfully",
-        "timestamps": updated_movie.timestamps
-    }
+    return {"message": "Timestamp deleted successfully", "timestamps": timestamps, "event_id": segment_event.id}
 
 
 @app.post("/tv-shows/update-timestamp/")
-async def update_tvshow_timestamp(
+def update_tvshow_timestamp(
         show_name: str,
         season: str,
         episode_number: str,
@@ -214,9 +1049,13 @@ async def update_tvshow_timestamp(
         start_time: float,
         end_time: float,
         label: Optional[str] = None,
-        db: Session = Depends(get_db)
+        categories: List[Category] = Query(default=[]),
+        db: Session = Depends(get_db),
+        author: Optional[str] = Header(None, alias=AUTHOR_HEADER)
 ):
-    print(f"Updating timestamp for TV show: {show_name} S{season}E{episode_number}")
+    logger.debug("Updating TV show timestamp", extra={
+        "show_name": show_name, "season": season, "episode_number": episode_number, "index": index
+    })
 
     episode = db.query(TVShow).filter(
         TVShow.show_name == show_name,
@@ -227,48 +1066,30 @@ async def update_tvshow_timestamp(
     if not episode:
         raise HTTPException(status_code=404, detail="TV show episode not found")
 
-    if not episode.timestamps or index >= len(episode.timestamps):
-        raise HTTPException(status_code=404, detail="Timestamp index not found")
+    validate_range(start_time, end_time)
 
-    # Create a new list with the updated timestamp
-    timestamps = episode.timestamps.copy()
-    timestamps[index] = {
+    segment_event, timestamps = record_segment_edit(db, "episode", episode, "update", index, {
         "start_time": float(start_time),
         "end_time": float(end_time),
-        "label": label
-    }
-
-    # Update using SQLAlchemy update statement
+        "label": label,
+        "categories": [category.value for category in categories]
+    }, author)
     try:
-        stmt = (
-            update(TVShow)
-            .where(
-                and_(
-                    TVShow.show_name == show_name,
-                    TVShow.season == season,
-                    TVShow.episode_number == episode_number
-                )
-            )
-            .values(timestamps=timestamps)
-        )
-        db.execute(stmt)
         db.commit()
-        db.refresh(episode)
-
-        return {
-            "message": "Timestamp updated successfully",
-            "timestamps": episode.timestamps
-        }
     except Exception as e:
+        logger.exception("TV show timestamp update failed", extra={"show_name": show_name})
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
+    return {"message": "Timestamp updated successfully", "timestamps": timestamps, "event_id": segment_event.id}
+
 
 @app.post("/tv-shows/delete-timestamp/")
 def delete_tvshow_timestamp(
         request: GetMediaRequest,
         delete_data: DeleteTimestampRequest,
-        db: Session = Depends(get_db)
+        db: Session = Depends(get_db),
+        author: Optional[str] = Header(None, alias=AUTHOR_HEADER)
 ):
     if not all([request.show_name, request.season, request.episode_number]):
         raise HTTPException(
@@ -285,101 +1106,88 @@ def delete_tvshow_timestamp(
     if not episode:
         raise HTTPException(status_code=404, detail="TV show episode not found")
 
-    if not episode.timestamps or delete_data.index >= len(episode.timestamps):
-        raise HTTPException(status_code=404, detail="Timestamp index not found")
-
-    # Create a new list without the deleted timestamp
-    timestamps = episode.timestamps.copy()
-    timestamps.pop(delete_data.index)
-
-    # Update using SQLAlchemy update statement
-    stmt = (
-        update(TVShow)
-        .where(
-            and_(
-                TVShow.show_name == request.show_name,
-                TVShow.season == request.season,
-                TVShow.episode_number == request.episode_number
-            )
-        )
-        .values(timestamps=timestamps)
+    segment_event, timestamps = record_segment_edit(
+        db, "episode", episode, "delete", delete_data.index, author=author
     )
-    db.execute(stmt)
     db.commit()
-
-    # Fetch the updated episode to verify changes
-    updated_episode = db.query(TVShow).filter(
-        TVShow.show_name == request.show_name,
-        TVShow.season == request.season,
-        TVShow.episode_number == request.episode_number
-    ).first()
-
-    return {
-        "message": "Timestamp deleted successfully",
-        "timestamps": updated_episode.timestamps
-    }
+    return {"message": "Timestamp deleted successfully", "timestamps": timestamps, "event_id": segment_event.id}
 
 # Movie Endpoints
 @app.post("/movies/add-timestamps/")
-def add_movie_timestamps(request: AddMovieRequest, db: Session = Depends(get_db)):
+def add_movie_timestamps(request: AddMovieRequest, db: Session = Depends(get_db),
+                         author: Optional[str] = Header(None, alias=AUTHOR_HEADER)):
     existing_movie = db.query(Movie).filter(Movie.title == request.title).first()
 
     # Validate timestamp ranges
     for range_data in request.timestamps:
-        if range_data.start_time >= range_data.end_time:
-            raise HTTPException(
-                status_code=400,
-                detail="Start time must be less than end time"
-            )
+        validate_range(range_data.start_time, range_data.end_time)
 
     if existing_movie:
-        current_ranges = [TimestampRange(**ts) for ts in (existing_movie.timestamps or [])]
-        new_ranges = current_ranges + request.timestamps
-
-        # Merge overlapping ranges
-        merged_ranges = merge_overlapping_ranges(new_ranges)
-
-        # Update the movie with merged ranges
-        existing_movie.timestamps = [ts.dict() for ts in merged_ranges]
+        # Overlapping ranges are merged when the event is folded
+        segment_event, timestamps = record_segment_edit(
+            db, "movie", existing_movie, "add", data=[ts.dict() for ts in request.timestamps], author=author
+        )
+        link_identity(db, "movie", existing_movie.id, request.rating_key, request.guids)
         db.commit()
-        db.refresh(existing_movie)
 
         return {
             "message": f"Timestamp ranges updated for movie '{existing_movie.title}'",
-            "updated_timestamps": existing_movie.timestamps
+            "updated_timestamps": timestamps,
+            "event_id": segment_event.id
         }
 
-    new_movie = Movie(
-        title=request.title,
-        timestamps=[ts.dict() for ts in request.timestamps]
-    )
-    db.add(new_movie)
+    new_movie = Movie(title=request.title, normalized_title=normalize_title(request.title))
+    timestamps = normalize_ranges([ts.dict() for ts in request.timestamps])
+    create_media(db, new_movie, "movie", timestamps, author)
+    link_identity(db, "movie", new_movie.id, request.rating_key, request.guids)
     db.commit()
-    db.refresh(new_movie)
     return {"message": "Movie and timestamp ranges added successfully!"}
 
 
-@app.post("/movies/get-timestamps/")
-def get_movie_timestamps(request: GetMediaRequest, db: Session = Depends(get_db)):
-    movie = db.query(Movie).filter(Movie.title == request.title).first()
+def read_key(kind: str, request: GetMediaRequest, *extra):
+    """Single-flight key of a read: everything in the request that can change its answer."""
+    return (kind, request.title, request.show_name, request.season, request.episode_number, request.rating_key,
+            tuple(request.guids), request.profile, *extra)
+
+
+def read_movie_timestamps(db: Session, request: GetMediaRequest) -> dict:
+    profile_mask = get_profile_mask(db, request.profile)
+    movie = find_media(db, Movie, "movie", request, Movie.title == request.title)
+    match = "exact"
+    if movie:
+        TITLE_LOOKUPS.inc("direct")
+    else:
+        # Similar titles are never linked to the request's Plex identifiers, a wrong link
+        # would make the other film's ranges answer every identifier lookup
+        movie, match = find_similar_movie(db, request.title)
     if not movie:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return {
+    timestamps = current_timestamps(db, "movie", movie)
+    response = {
         "title": movie.title,
-        "timestamps": movie.timestamps
+        "match": match,
+        "timestamps": timestamps
     }
+    if profile_mask is not None:
+        response["skip_ranges"] = build_skip_ranges(timestamps, profile_mask)
+    return response
+
+
+@app.post("/movies/get-timestamps/")
+def get_movie_timestamps(request: GetMediaRequest, raw_request: Request, db: Session = Depends(get_db)):
+    if snapshots:
+        return edge_timestamps(raw_request, request, ("movie",), request.profile, "Movie not found")
+    response = READS.do(read_key("movie", request), read_movie_timestamps, db, request)
+    return negotiated_response(raw_request, response)
 
 
 # TV Show Endpoints
 @app.post("/tv-shows/add-timestamps/")
-def add_tvshow_timestamps(request: AddTVShowRequest, db: Session = Depends(get_db)):
+def add_tvshow_timestamps(request: AddTVShowRequest, db: Session = Depends(get_db),
+                          author: Optional[str] = Header(None, alias=AUTHOR_HEADER)):
     # Validate timestamp ranges
     for range_data in request.timestamps:
-        if range_data.start_time >= range_data.end_time:
-            raise HTTPException(
-                status_code=400,
-                detail="Start time must be less than end time"
-            )
+        validate_range(range_data.start_time, range_data.end_time)
 
     existing_episode = db.query(TVShow).filter(
         TVShow.show_name == request.show_name,
@@ -388,65 +1196,696 @@ def add_tvshow_timestamps(request: AddTVShowRequest, db: Session = Depends(get_d
     ).first()
 
     if existing_episode:
-        current_ranges = [TimestampRange(**ts) for ts in (existing_episode.timestamps or [])]
-        new_ranges = current_ranges + request.timestamps
-
-        # Merge overlapping ranges
-        merged_ranges = merge_overlapping_ranges(new_ranges)
-
-        # Update the episode with merged ranges
-        existing_episode.timestamps = [ts.dict() for ts in merged_ranges]
+        # Overlapping ranges are merged when the event is folded
+        segment_event, timestamps = record_segment_edit(
+            db, "episode", existing_episode, "add", data=[ts.dict() for ts in request.timestamps], author=author
+        )
+        link_identity(db, "episode", existing_episode.id, request.rating_key, request.guids)
         db.commit()
-        db.refresh(existing_episode)
 
         return {
             "message": f"Timestamp ranges updated for TV show '{existing_episode.show_name}' S{existing_episode.season}E{existing_episode.episode_number}",
-            "updated_timestamps": existing_episode.timestamps
+            "updated_timestamps": timestamps,
+            "event_id": segment_event.id
         }
 
     new_episode = TVShow(
         show_name=request.show_name,
         season=request.season,
         episode_number=request.episode_number,
-        title=request.title,
-        timestamps=[ts.dict() for ts in request.timestamps]
+        title=request.title
     )
-    db.add(new_episode)
+    timestamps = normalize_ranges([ts.dict() for ts in request.timestamps])
+    create_media(db, new_episode, "episode", timestamps, author)
+    link_identity(db, "episode", new_episode.id, request.rating_key, request.guids)
     db.commit()
-    db.refresh(new_episode)
     return {"message": "TV show episode and timestamp ranges added successfully!"}
 
 
-@app.post("/tv-shows/get-timestamps/")
-def get_tvshow_timestamps(request: GetMediaRequest, db: Session = Depends(get_db)):
-    if not all([request.show_name, request.season, request.episode_number]):
-        raise HTTPException(
-            status_code=400,
-            detail="show_name, season, and episode_number are required for TV shows"
-        )
-
-    episode = db.query(TVShow).filter(
+def read_tvshow_timestamps(db: Session, request: GetMediaRequest) -> dict:
+    profile_mask = get_profile_mask(db, request.profile)
+    episode = find_media(db, TVShow, "episode", request, and_(
         TVShow.show_name == request.show_name,
         TVShow.season == request.season,
         TVShow.episode_number == request.episode_number
-    ).first()
+    ))
 
     if not episode:
         raise HTTPException(status_code=404, detail="TV show episode not found")
 
-    return {
+    timestamps = current_timestamps(db, "episode", episode)
+    response = {
         "show_name": episode.show_name,
         "season": episode.season,
         "episode_number": episode.episode_number,
         "title": episode.title,
-        "timestamps": episode.timestamps
+        "timestamps": timestamps
     }
+    if profile_mask is not None:
+        response["skip_ranges"] = build_skip_ranges(timestamps, profile_mask)
+    return response
 
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+@app.post("/tv-shows/get-timestamps/")
+def get_tvshow_timestamps(request: GetMediaRequest, raw_request: Request, db: Session = Depends(get_db)):
+    if not all([request.show_name, request.season, request.episode_number]):
+        raise HTTPException(
+            status_code=400,
+            detail="show_name, season, and episode_number are required for TV shows"
+        )
 
-if __name__ == "__main__":
+    if snapshots:
+        return edge_timestamps(raw_request, request, ("episode",), request.profile, "TV show episode not found")
+    response = READS.do(read_key("episode", request), read_tvshow_timestamps, db, request)
+    return negotiated_response(raw_request, response)
+
+
+# Media Identity Endpoints
+def read_timestamps_by_rating_key(db: Session, rating_key: int, profile: Optional[str]) -> dict:
+    profile_mask = get_profile_mask(db, profile)
+    identity = resolve_identity(db, rating_key)
+    model = Movie if identity and identity.media_type == "movie" else TVShow
+    media = db.get(model, identity.media_id) if identity else None
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    response = {"media_type": identity.media_type, "title": media.title}
+    if identity.media_type == "episode":
+        response.update(show_name=media.show_name, season=media.season, episode_number=media.episode_number)
+    response["timestamps"] = current_timestamps(db, identity.media_type, media)
+    if profile_mask is not None:
+        response["skip_ranges"] = build_skip_ranges(response["timestamps"], profile_mask)
+    return response
+
+
+@app.get("/media/{rating_key}/timestamps")
+def get_timestamps_by_rating_key(
+        rating_key: int,
+        raw_request: Request,
+        profile: Optional[str] = None,
+        db: Session = Depends(get_db)
+):
+    """Resolve skip data with one integer lookup on the Plex ratingKey."""
+    if snapshots:
+        request = GetMediaRequest(title="", rating_key=rating_key)
+        return edge_timestamps(raw_request, request, ("movie", "episode"), profile, "Media not found")
+    response = READS.do(("rating_key", rating_key, profile), read_timestamps_by_rating_key, db, rating_key, profile)
+    return negotiated_response(raw_request, response)
+
+
+@app.post("/media/link/")
+def link_media(request: GetMediaRequest, db: Session = Depends(get_db)):
+    """Attach a Plex ratingKey and GUIDs to a movie or episode stored by name."""
+    if request.rating_key is None and not request.guids:
+        raise HTTPException(status_code=400, detail="rating_key or guids are required")
+
+    if request.show_name or request.season or request.episode_number:
+        media_type = "episode"
+        media = db.query(TVShow).filter(
+            TVShow.show_name == request.show_name,
+            TVShow.season == request.season,
+            TVShow.episode_number == request.episode_number
+        ).first()
+    else:
+        media_type = "movie"
+        media = db.query(Movie).filter(Movie.title == request.title).first()
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    identity = link_identity(db, media_type, media.id, request.rating_key, request.guids)
+    db.commit()
+    return {"message": "Media identifiers linked", "media_key": identity.id}
+
+
+def find_edited_media(db: Session, request: GetMediaRequest):
+    """The media type and stored movie or episode a request names, by Plex identifiers or names."""
+    identity = resolve_identity(db, request.rating_key, request.guids)
+    if identity:
+        model = Movie if identity.media_type == "movie" else TVShow
+        media = db.get(model, identity.media_id)
+        if media:
+            return identity.media_type, media
+    if request.show_name or request.season or request.episode_number:
+        return "episode", db.query(TVShow).filter(
+            TVShow.show_name == request.show_name,
+            TVShow.season == request.season,
+            TVShow.episode_number == request.episode_number
+        ).first()
+    return "movie", db.query(Movie).filter(Movie.title == request.title).first()
+
+
+# Segment Event Endpoints
+@app.post("/segment-events/history/")
+def get_segment_history(request: GetMediaRequest, db: Session = Depends(get_db)):
+    """Every recorded edit of a title's ranges, oldest first."""
+    media_type, media = find_edited_media(db, request)
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    segment_events = db.query(SegmentEvent).filter(
+        SegmentEvent.media_type == media_type,
+        SegmentEvent.media_id == media.id
+    ).order_by(SegmentEvent.id).all()
+    return {
+        "media_type": media_type,
+        "events": [
+            {
+                "id": segment_event.id,
+                "action": segment_event.action,
+                "index": segment_event.index,
+                "data": segment_event.data,
+                "author": segment_event.author,
+                "created_at": segment_event.created_at
+            }
+            for segment_event in segment_events
+        ]
+    }
+
+
+@app.post("/segment-events/{event_id}/undo")
+def undo_segment_event(event_id: int, db: Session = Depends(get_db),
+                       author: Optional[str] = Header(None, alias=AUTHOR_HEADER)):
+    """Restore a title's ranges to what they were before an edit.
+
+    The restore is itself an edit, so the edits made since are not lost from
+    the history and an undo can be undone.
+    """
+    segment_event = db.get(SegmentEvent, event_id)
+    if not segment_event:
+        raise HTTPException(status_code=404, detail="Segment event not found")
+    model = Movie if segment_event.media_type == "movie" else TVShow
+    media = db.get(model, segment_event.media_id)
+    if not media:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    earlier = db.query(SegmentEvent).filter(
+        SegmentEvent.media_type == segment_event.media_type,
+        SegmentEvent.media_id == segment_event.media_id,
+        SegmentEvent.id < event_id
+    ).order_by(SegmentEvent.id).all()
+    timestamps = fold_segment_events([], earlier)
+    record_segment_event(db, segment_event.media_type, media, "replace", data=timestamps, author=author)
+    db.commit()
+    return {"message": f"Segment event {event_id} undone", "timestamps": timestamps}
+
+
+def find_profile(db: Session, name: Optional[str]) -> Optional[Profile]:
+    """The named viewer profile, None for the default one."""
+    if not name:
+        return None
+    profile = db.query(Profile).filter(Profile.name == name).first()
+    if not profile:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+    return profile
+
+
+def resolve_plan_media(db: Session, request: GetMediaRequest):
+    """The media type and stored movie or episode a skip plan request names, (type, None) when unknown.
+
+    Plex identifiers are tried first, then the names; movies also match a
+    normalized spelling of their title but never a fuzzy one.
+    """
+    identity = resolve_identity(db, request.rating_key, request.guids)
+    if identity:
+        model = Movie if identity.media_type == "movie" else TVShow
+        media = db.get(model, identity.media_id)
+        if media:
+            return identity.media_type, media
+    if request.show_name or request.season or request.episode_number:
+        if not all([request.show_name, request.season, request.episode_number]):
+            raise HTTPException(
+                status_code=400,
+                detail="show_name, season, and episode_number are required for TV shows"
+            )
+        return "episode", db.query(TVShow).filter(
+            TVShow.show_name == request.show_name,
+            TVShow.season == request.season,
+            TVShow.episode_number == request.episode_number
+        ).first()
+    media = db.query(Movie).filter(Movie.title == request.title).first()
+    if not media:
+        media, _ = find_similar_movie(db, request.title, fuzzy=False)
+    return "movie", media
+
+
+def find_skip_plan(db: Session, request: GetMediaRequest, profile: Optional[Profile], buffer_ms: int):
+    """The skip plan of a title, materialized on first read; None when the title is unknown.
+
+    A newly materialized plan is added to the session, the caller commits it.
+    """
+    media_type, media = resolve_plan_media(db, request)
+    if not media:
+        return None
+    profile_id = profile.id if profile else 0
+
+    # Fast path: the materialized plan, unless the title was edited since
+    stored = db.query(SkipPlan).filter(
+        SkipPlan.media_type == media_type,
+        SkipPlan.media_id == media.id,
+        SkipPlan.profile_id == profile_id,
+        SkipPlan.buffer_ms == buffer_ms
+    ).first()
+    if stored and (stored.event_id or 0) == (media.last_event_id or 0):
+        SKIP_PLAN_LOOKUPS.inc("hit")
+        return stored.plan
+
+    SKIP_PLAN_LOOKUPS.inc("miss")
+    category_mask = profile.category_mask if profile else ALL_CATEGORIES_MASK
+    plan = compute_skip_plan(current_timestamps(db, media_type, media), category_mask, buffer_ms)
+    if stored:
+        stored.plan, stored.event_id = plan, media.last_event_id or 0
+    else:
+        db.add(SkipPlan(
+            media_type=media_type,
+            media_id=media.id,
+            profile_id=profile_id,
+            buffer_ms=buffer_ms,
+            plan=plan,
+            event_id=media.last_event_id or 0
+        ))
+    return plan
+
+
+def commit_skip_plans(db: Session):
+    try:
+        db.commit()
+    except (IntegrityError, OperationalError) as e:
+        # A concurrent request materialized the same plan first, or an edit made the read stale
+        logger.debug("Skip plan not stored: %s", e)
+        db.rollback()
+
+
+def read_skip_plan(db: Session, request: GetMediaRequest, buffer_ms: int) -> list:
+    plan = find_skip_plan(db, request, find_profile(db, request.profile), buffer_ms)
+    if plan is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    commit_skip_plans(db)
+    return plan
+
+
+# Skip Plan Endpoints
+@app.post("/skip-plans/get/")
+def get_skip_plan(request: SkipPlanRequest, raw_request: Request, db: Session = Depends(get_db)):
+    """Return the ready-to-execute skip plan for a title, profile and buffer."""
+    buffer_ms = quantize_buffer(request.buffer_seconds)
+    if snapshots:
+        plan = edge_skip_plan(snapshots.current, request, edge_profile_mask(snapshots.current, request.profile),
+                              buffer_ms)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="Media not found")
+        return negotiated_response(raw_request, {"buffer_seconds": buffer_ms / 1000, "plan": plan})
+    plan = READS.do(read_key("plan", request, buffer_ms), read_skip_plan, db, request, buffer_ms)
+    return negotiated_response(raw_request, {"buffer_seconds": buffer_ms / 1000, "plan": plan})
+
+
+@app.post("/skip-plans/batch/")
+def get_skip_plans(request: SkipPlanBatchRequest, db: Session = Depends(get_db)):
+    """Return the skip plans of several titles at once, null for titles without an entry.
+
+    Clients use it to prefetch the plans of what is likely to play next. The
+    answer is always JSON, the packed format only holds flat segment lists.
+    """
+    buffer_ms = quantize_buffer(request.buffer_seconds)
+    if snapshots:
+        snapshot = snapshots.current
+        profile_mask = edge_profile_mask(snapshot, request.profile)
+        plans = [edge_skip_plan(snapshot, item, profile_mask, buffer_ms) for item in request.items]
+        return DefaultJSONResponse({"buffer_seconds": buffer_ms / 1000, "plans": plans})
+    profile = find_profile(db, request.profile)
+    plans = []
+    for item in request.items:
+        try:
+            plans.append(find_skip_plan(db, item, profile, buffer_ms))
+        except HTTPException:
+            plans.append(None)
+        # Sessions do not autoflush, a later item for the same title must see the plan just added
+        db.flush()
+    commit_skip_plans(db)
+    return DefaultJSONResponse({"buffer_seconds": buffer_ms / 1000, "plans": plans})
+
+
+# Edge Mode
+snapshots: Optional[SnapshotStore] = None  # Set on read-only edge nodes
+
+
+def export_snapshot(db: Session, path: str, job=None) -> int:
+    """Write every stored title to a snapshot file an edge node can serve; returns the titles written."""
+    identity_keys = {}  # (media type, media id) -> snapshot keys from Plex identifiers
+    for identity in db.query(MediaIdentity).filter(MediaIdentity.rating_key.isnot(None)):
+        identity_keys.setdefault((identity.media_type, identity.media_id), []).append(
+            ("rating_key", identity.media_type, identity.rating_key))
+    guids = db.query(MediaGuid.guid, MediaIdentity.media_type, MediaIdentity.media_id).join(
+        MediaIdentity, MediaGuid.identity_id == MediaIdentity.id)
+    for guid, media_type, media_id in guids:
+        identity_keys.setdefault((media_type, media_id), []).append(("guid", media_type, guid))
+
+    writer = SnapshotWriter({
+        "created_at": time.time(),
+        "profiles": {profile.name: profile.category_mask for profile in db.query(Profile)}
+    })
+    total = db.query(Movie).count() + db.query(TVShow).count() if job else None
+    for movie in db.query(Movie).yield_per(1000):
+        if job:
+            job.checkpoint(len(writer.records), total)
+        writer.add(
+            {"media_type": "movie", "title": movie.title, "timestamps": current_timestamps(db, "movie", movie)},
+            [("movie", movie.title), *identity_keys.get(("movie", movie.id), [])]
+        )
+    for episode in db.query(TVShow).yield_per(1000):
+        if job:
+            job.checkpoint(len(writer.records), total)
+        writer.add(
+            {
+                "media_type": "episode",
+                "show_name": episode.show_name,
+                "season": episode.season,
+                "episode_number": episode.episode_number,
+                "title": episode.title,
+                "timestamps": current_timestamps(db, "episode", episode)
+            },
+            [("episode", episode.show_name, episode.season, episode.episode_number),
+             *identity_keys.get(("episode", episode.id), [])]
+        )
+    writer.write(path)
+    return len(writer.records)
+
+
+def edge_record(snapshot, request: GetMediaRequest, media_types):
+    """Packed record of a title by Plex identifiers, then by its names.
+
+    Near-miss movie titles are not resolved on edge nodes.
+    """
+    for media_type in media_types:
+        if request.rating_key is not None:
+            record = snapshot.record("rating_key", media_type, request.rating_key)
+            if record is not None:
+                return record
+        for guid in request.guids:
+            record = snapshot.record("guid", media_type, guid)
+            if record is not None:
+                return record
+    if request.show_name or request.season or request.episode_number:
+        if "episode" in media_types:
+            return snapshot.record("episode", request.show_name, request.season, request.episode_number)
+        return None
+    if "movie" in media_types and request.title:
+        return snapshot.record("movie", request.title)
+    return None
+
+
+def edge_profile_mask(snapshot, name: Optional[str]) -> Optional[int]:
+    if not name:
+        return None
+    try:
+        return snapshot.meta["profiles"][name]
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Profile '{name}' not found")
+
+
+def edge_timestamps(raw_request: Request, request: GetMediaRequest, media_types, profile: Optional[str],
+                    not_found: str):
+    """Answer a get-timestamps request from the snapshot, sending packed records without decoding them."""
+    snapshot = snapshots.current
+    profile_mask = edge_profile_mask(snapshot, profile)
+    record = edge_record(snapshot, request, media_types)
+    if record is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    media_type = wire_format.negotiate(raw_request.headers.get("accept"))
+    if profile_mask is None and media_type == wire_format.PACKED_MEDIA_TYPE:
+        return Response(content=record, media_type=media_type)
+    response = wire_format.unpack_payload(record)
+    if profile_mask is not None:
+        response["skip_ranges"] = build_skip_ranges(response["timestamps"], profile_mask)
+    return negotiated_response(raw_request, response)
+
+
+def edge_skip_plan(snapshot, request: GetMediaRequest, profile_mask: Optional[int], buffer_ms: int):
+    """Skip plan of a title computed from the snapshot, None when it has no entry."""
+    record = edge_record(snapshot, request, ("movie", "episode"))
+    if record is None:
+        return None
+    timestamps = wire_format.unpack_payload(record)["timestamps"]
+    return compute_skip_plan(timestamps, ALL_CATEGORIES_MASK if profile_mask is None else profile_mask, buffer_ms)
+
+
+# Maintenance jobs
+class DatabaseJobStore(JobStore):
+    """Job state in the jobs table, so every worker sees it."""
+
+    def create(self, kind: str, params: dict) -> int:
+        with SessionLocal() as db:
+            job = Job(kind=kind, status=QUEUED, params=params, created_at=time.time())
+            db.add(job)
+            db.commit()
+            return job.id
+
+    def update(self, job_id: int, **fields):
+        with SessionLocal() as db:
+            db.execute(update(Job).where(Job.id == job_id).values(**fields))
+            db.commit()
+
+    def cancel_requested(self, job_id: int) -> bool:
+        with SessionLocal() as db:
+            return bool(db.query(Job.cancel_requested).filter(Job.id == job_id).scalar())
+
+
+jobs = JobRunner(DatabaseJobStore(), registry=registry)
+
+
+def fail_interrupted_jobs(bind):
+    """Mark jobs left queued or running by a previous server as failed."""
+    with Session(bind) as db:
+        db.query(Job).filter(Job.status.in_((QUEUED, RUNNING))).update(
+            {"status": FAILED, "error": "Interrupted by a restart", "finished_at": time.time()},
+            synchronize_session=False
+        )
+        db.commit()
+
+
+def compact_job(job):
+    """Fold every pending segment event into the stored ranges."""
+    with SessionLocal() as db:
+        return {"last_event_id": compact_segment_events(db, 0, job)}
+
+
+def export_snapshot_job(job):
+    """Write a snapshot to SNAPSHOT_EXPORT_PATH; the path is configuration, never a request parameter."""
+    with SessionLocal() as db:
+        return {"path": SNAPSHOT_EXPORT_PATH, "titles": export_snapshot(db, SNAPSHOT_EXPORT_PATH, job)}
+
+
+def vacuum_job(job):
+    """Refresh the query planner's statistics, then rebuild the database file.
+
+    SQLite holds the write lock while vacuuming, so writes wait for it up to
+    the busy timeout; run it when edits are rare.
+    """
+    statements = ("ANALYZE", "VACUUM")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for done, statement in enumerate(statements):
+            job.checkpoint(done, len(statements))
+            conn.exec_driver_sql(statement)
+    job.checkpoint(len(statements))
+    return {"statements": list(statements)}
+
+
+def batches(db: Session, model):
+    """Every row of a table in id order, JOB_BATCH_SIZE rows at a time."""
+    last_id = 0
+    while True:
+        batch = db.query(model).filter(model.id > last_id).order_by(model.id).limit(JOB_BATCH_SIZE).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+
+def rebuild_title_index_job(job):
+    """Recompute every movie's normalized title and rebuild the fuzzy title index from scratch.
+
+    The index is otherwise only ever added to, so renamed and deleted movies
+    stay in it. Only the index of the worker running the job is replaced.
+    """
+    global movie_title_index
+    index = TitleIndex()
+    with SessionLocal() as db:
+        total, done = db.query(Movie).count(), 0
+        for batch in batches(db, Movie):
+            for movie in batch:
+                normalized = normalize_title(movie.title)
+                if movie.normalized_title != normalized:
+                    movie.normalized_title = normalized
+                index.add(movie.id, movie.title, normalized)
+            db.commit()
+            done += len(batch)
+            job.checkpoint(done, total)
+    movie_title_index = index
+    return {"titles": len(index)}
+
+
+def normalize_job(job):
+    """Store the ranges of titles kept since before the segment event log in normal form.
+
+    Reads normalize those lists every time until then. Titles never edited
+    get their normalized ranges as the first event of their history, then
+    every such title is compacted, which writes the list back normalized.
+    """
+    changed = done = 0
+    with SessionLocal() as db:
+        total = db.query(Movie).count() + db.query(TVShow).count()
+        for media_type, model in (("movie", Movie), ("episode", TVShow)):
+            for batch in batches(db, model):
+                for media in batch:
+                    if media.compacted_event_id:
+                        continue
+                    if not media.last_event_id:
+                        record_baseline_event(db, media_type, media, author="job:normalize")
+                    if stored_timestamps(media) != (media.timestamps or []):
+                        changed += 1
+                    compact_media(db, media_type, media.id)
+                db.commit()
+                done += len(batch)
+                job.checkpoint(done, total)
+    return {"titles": done, "changed": changed}
+
+
+jobs.register("compact", compact_job)
+if SNAPSHOT_EXPORT_PATH:
+    jobs.register("export-snapshot", export_snapshot_job)
+jobs.register("vacuum", vacuum_job)
+jobs.register("rebuild-title-index", rebuild_title_index_job)
+jobs.register("normalize", normalize_job)
+
+
+def job_response(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "done": job.done,
+        "total": job.total,
+        "progress": round(job.done / job.total, 4) if job.total else None,
+        "cancel_requested": bool(job.cancel_requested),
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at
+    }
+
+
+def find_job(db: Session, job_id: int) -> Job:
+    job = db.get(Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+# Job Endpoints
+@app.post("/jobs/", status_code=202)
+def submit_job(request: JobRequest, db: Session = Depends(get_db)):
+    """Queue a maintenance job; poll GET /jobs/{id} for its progress."""
+    try:
+        job_id = jobs.submit(request.kind, request.params)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind, expected one of: {', '.join(jobs.kinds)}")
+    except TypeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid parameters for {request.kind}: {e}")
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=f"Too many jobs, try again later: {e}")
+    return job_response(find_job(db, job_id))
+
+
+@app.get("/jobs/")
+def list_jobs(db: Session = Depends(get_db)):
+    return [job_response(job) for job in db.query(Job).order_by(Job.id.desc()).limit(JOB_LIST_LIMIT)]
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int, db: Session = Depends(get_db)):
+    return job_response(find_job(db, job_id))
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: int, db: Session = Depends(get_db)):
+    """Stop a job at its next checkpoint, even one running in another worker."""
+    job = find_job(db, job_id)
+    if job.status in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job already {job.status}")
+    jobs.cancel(job_id)
+    db.refresh(job)
+    return job_response(job)
+
+
+@app.get("/metrics")
+def get_metrics():
+    """Expose request, database, cache and merge metrics for Prometheus."""
+    return Response(content=registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/healthz")
+def healthz():
+    """Liveness check, the process is serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+def readyz():
+    """Readiness check, startup finished and the database answers, or the snapshot is loaded on an edge node."""
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="Not ready")
+    if snapshots:
+        return {"status": "ready", "snapshot_keys": len(snapshots.current)}
+    try:
+        with engine.connect() as conn:
+            conn.execute(sqlalchemy.text("SELECT 1"))
+    except sqlalchemy.exc.SQLAlchemyError as e:
+        raise HTTPException(status_code=503, detail=f"Database unavailable: {e}")
+    return {"status": "ready"}
+
+
+def main():
+    import argparse
     import uvicorn
 
-    uvicorn.run("backend:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Run the Plex skip backend")
+    parser.add_argument("--host", default=os.getenv("PLEX_SKIP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PLEX_SKIP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("PLEX_SKIP_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--graceful-timeout", type=int, default=SHUTDOWN_DRAIN_TIMEOUT,
+                        help="Seconds to wait for open requests on shutdown")
+    parser.add_argument("--reload", action="store_true", help="Restart on code changes, runs a single worker")
+    parser.add_argument("--edge", metavar="SNAPSHOT", default=SNAPSHOT_PATH,
+                        help="Serve reads only, from this snapshot file instead of the database")
+    parser.add_argument("--export-snapshot", metavar="PATH", help="Write a snapshot of the database and exit")
+    args = parser.parse_args()
+
+    setup_logging()
+    if args.export_snapshot:
+        prepare_database(engine)
+        with SessionLocal() as db:
+            export_snapshot(db, args.export_snapshot)
+        return
+    if args.edge:
+        # Workers import this module again and pick the mode up from the environment
+        os.environ["PLEX_SKIP_SNAPSHOT"] = args.edge
+    elif not args.reload:
+        # Migrate once here instead of in every worker at the same time
+        prepare_database(engine)
+        fail_interrupted_jobs(engine)
+        engine.dispose()
+        os.environ[DATABASE_PREPARED_ENV] = "1"
+
+    uvicorn.run(
+        "backend:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
+        timeout_graceful_shutdown=args.graceful_timeout
+    )
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""Benchmark the backend's merge, CRUD and bulk import/export paths.
+
+Suites:
+
+- merge: merge_overlapping_ranges over synthetic range lists
+- crud: add, get, update and delete requests per second, through the ASGI
+  app in-process. Update and delete run against titles with --stored
+  segments, because every write rewrites the whole JSON list.
+- bulk: one add-timestamps request with N ranges (import), and reading
+  them back (export)
+
+The backend runs on a scratch SQLite database. Results are written to
+benchmarks/results/<commit>.json, so a run can be compared with an earlier
+commit:
+
+    python benchmarks/bench_backend.py
+    python benchmarks/bench_backend.py --compare benchmarks/results/<base commit>.json
+
+Larger datasets take a while:
+
+    python benchmarks/bench_backend.py --merge-sizes 10000 100000 1000000 --bulk-sizes 10000 100000 1000000
+"""
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+sys.path.insert(0, ROOT)
+
+# The backend connects at import, point it at a scratch database first
+SCRATCH_DIR = tempfile.mkdtemp(prefix="plex-skip-bench-")
+atexit.register(shutil.rmtree, SCRATCH_DIR, ignore_errors=True)
+os.environ["PLEX_SKIP_DATABASE_URL"] = f"sqlite:///{os.path.join(SCRATCH_DIR, 'bench.db')}"
+os.environ.setdefault("PLEX_SKIP_LOG_LEVEL", "WARNING")
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+import backend  # noqa: E402
+
+LABELS = ["kiss", "blood", "fight", "needle", "gunshot", None]
+CATEGORIES = ["nudity", "gore", "violence", "drugs", "other"]
+
+
+def make_ranges(count, seed=0, overlap=0.3):
+    """count synthetic ranges as dicts; about overlap of them overlap the previous one."""
+    rng = random.Random(seed)
+    ranges = []
+    position = 0.0
+    for _ in range(count):
+        position += rng.uniform(0.5, 4) if rng.random() < overlap else rng.uniform(10, 60)
+        ranges.append({
+            "start_time": round(position, 3),
+            "end_time": round(position + rng.uniform(1, 8), 3),
+            "label": rng.choice(LABELS),
+            "categories": rng.sample(CATEGORIES, rng.randint(0, 1))
+        })
+    return ranges
+
+
+def best_of(func, repeat, setup=None):
+    """Fastest of repeat runs of func, in seconds; setup() runs untimed before each."""
+    best = float("inf")
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        func(argument) if setup else func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def throughput(func, count):
+    """Calls of func(index) per second over count calls."""
+    start = time.perf_counter()
+    for index in range(count):
+        func(index)
+    return count / (time.perf_counter() - start)
+
+
+def bench_merge(sizes, repeat):
+    results = {}
+    for size in sizes:
+        data = make_ranges(size, seed=size)
+        # merge_overlapping_ranges updates ranges in place, so each run gets fresh models
+        seconds = best_of(
+            lambda ranges: backend.merge_overlapping_ranges(ranges),
+            repeat if size < 1_000_000 else 1,
+            setup=lambda: [backend.TimestampRange(**ts) for ts in data]
+        )
+        results[f"merge.{size}.ms"] = round(seconds * 1000, 3)
+    return results
+
+
+def check(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.url} returned {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def bench_crud(client, requests_count, stored_sizes):
+    results = {}
+    prefix = f"crud-{time.time_ns()}"
+    small = make_ranges(10)
+
+    results["crud.add.rps"] = round(throughput(lambda i: check(client.post("/movies/add-timestamps/", json={
+        "title": f"{prefix} movie {i}", "rating_key": None, "timestamps": small
+    })), requests_count), 1)
+    results["crud.get.rps"] = round(throughput(lambda i: check(client.post("/movies/get-timestamps/", json={
+        "title": f"{prefix} movie {i}"
+    })), requests_count), 1)
+
+    for stored in stored_sizes:
+        title = f"{prefix} stored {stored}"
+        check(client.post("/movies/add-timestamps/", json={"title": title, "timestamps": make_ranges(stored)}))
+        count = min(requests_count, max(10, stored // 10))
+
+        results[f"crud.update.{stored}.rps"] = round(throughput(lambda i: check(client.post(
+            "/movies/update-timestamp/", params={"title": title},
+            json={"index": i, "start_time": i * 1000.0, "end_time": i * 1000.0 + 5, "label": "updated"}
+        )), count), 1)
+        results[f"crud.delete.{stored}.rps"] = round(throughput(lambda i: check(client.post(
+            "/movies/delete-timestamp/", params={"title": title}, json={"index": 0}
+        )), count), 1)
+    return results
+
+
+def bench_bulk(client, sizes):
+    results = {}
+    prefix = f"bulk-{time.time_ns()}"
+    for size in sizes:
+        title = f"{prefix} {size}"
+        body = {"title": title, "timestamps": make_ranges(size, seed=size)}
+        start = time.perf_counter()
+        check(client.post("/movies/add-timestamps/", json=body))
+        results[f"bulk.import.{size}.ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        check(client.post("/movies/get-timestamps/", json={"title": title}))
+        results[f"bulk.export.{size}.ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return results
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(results, base_path):
+    """Print each metric next to the base run; ms metrics improve downwards, rps upwards."""
+    with open(base_path, encoding="utf-8") as base_file:
+        base = json.load(base_file)
+    print(f"\ncompared with {base['commit']}")
+    for name, value in results.items():
+        previous = base["results"].get(name)
+        if not previous:
+            continue
+        change = (value - previous) / previous * 100
+        better = change < 0 if name.endswith(".ms") else change > 0
+        print(f"{name:>32} {previous:>12} -> {value:>12} {change:+7.1f}% {'better' if better else 'worse'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--suites", nargs="+", choices=["merge", "crud", "bulk"], default=["merge", "crud", "bulk"])
+    parser.add_argument("--merge-sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--bulk-sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--stored", type=int, nargs="+", default=[100, 10000],
+                        help="Ranges stored on the title updates and deletes run against")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per CRUD measurement")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--compare", help="Results file of an earlier run to compare with")
+    parser.add_argument("--no-save", action="store_true", help="Do not write benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    results = {}
+    if "merge" in args.suites:
+        results.update(bench_merge(args.merge_sizes, args.repeat))
+    with TestClient(backend.app) as client:
+        if "crud" in args.suites:
+            results.update(bench_crud(client, args.requests, args.stored))
+        if "bulk" in args.suites:
+            results.update(bench_bulk(client, args.bulk_sizes))
+
+    for name, value in results.items():
+        print(f"{name:>32} {value:>12}")
+
+    commit = current_commit()
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{commit}.json")
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump({
+                "commit": commit,
+                "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "results": results
+            }, output, indent=2)
+        print(f"\nwrote {os.path.relpath(path, ROOT)}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Compare response serialization cost and bytes on the wire for large timestamp lists.
+
+"before" is FastAPI's default path for a returned dict (jsonable_encoder plus
+the standard library encoder), "after" is the backend's negotiated_response
+rendering the payload directly with orjson.
+
+Run from the repository root:
+
+    python benchmarks/bench_serialization.py --segments 100 1000 10000
+"""
+import argparse
+import gzip
+import os
+import random
+import sys
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format  # noqa: E402
+from backend import COMPRESSION_MINIMUM_SIZE, DefaultJSONResponse, orjson  # noqa: E402
+
+try:
+    import brotli
+except ImportError:  # Optional dependency
+    brotli = None
+
+LABELS = ["kiss", "blood", "fight", "needle", "gunshot", None]
+CATEGORIES = ["nudity", "gore", "violence", "drugs", "other"]
+
+
+def make_payload(count):
+    """Build a get-timestamps style response with count ranges."""
+    rng = random.Random(count)
+    timestamps = []
+    position = 0.0
+    for _ in range(count):
+        position += rng.uniform(5, 60)
+        timestamps.append({
+            "start_time": round(position, 3),
+            "end_time": round(position + rng.uniform(1, 30), 3),
+            "label": rng.choice(LABELS),
+            "categories": rng.sample(CATEGORIES, rng.randint(0, 2))
+        })
+    return {"title": f"Synthetic title with {count} ranges", "timestamps": timestamps}
+
+
+def best_of(func, repeat):
+    """Fastest of repeat timed runs, in milliseconds."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not orjson:
+        print("orjson is not installed, the backend falls back to the standard library")
+
+    columns = ["segments", "before ms", "after ms", "json B", "gzip B", "brotli B", "packed B", "packed+gzip B"]
+    print(" ".join(f"{column:>14}" for column in columns))
+    for count in args.segments:
+        payload = make_payload(count)
+        before_ms = best_of(lambda: JSONResponse(jsonable_encoder(payload)).body, args.repeat)
+        after_ms = best_of(lambda: DefaultJSONResponse(payload).body, args.repeat)
+
+        body = JSONResponse(payload).body
+        packed = wire_format.encode(payload, wire_format.PACKED_MEDIA_TYPE)
+        compressed = len(gzip.compress(body, compresslevel=9)) if len(body) >= COMPRESSION_MINIMUM_SIZE else len(body)
+        brotli_size = len(brotli.compress(body, quality=4)) if brotli else "-"
+        row = [count, f"{before_ms:.3f}", f"{after_ms:.3f}", len(body), compressed, brotli_size,
+               len(packed), len(gzip.compress(packed, compresslevel=9))]
+        print(" ".join(f"{value:>14}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Measure how long the frontend and skip engine take to import and start.
+
+Each module is imported in a fresh interpreter with -X importtime. The
+median over --runs is reported together with the modules it imports that
+take longest. "startup" also constructs PlexViewer, everything that
+happens before the window is built. With --budget-ms the script exits non-zero when a
+measurement goes over, so it can guard startup in CI.
+
+Run from the repository root:
+
+    python benchmarks/import_time.py --budget-ms 100
+"""
+import argparse
+import os
+import subprocess
+import sys
+from statistics import median
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STARTUP_CODE = (
+    "import time; started = time.perf_counter(); import frontend; frontend.PlexViewer(); "
+    "print((time.perf_counter() - started) * 1000)"
+)
+
+
+def import_profile(module):
+    """Import time of module and of each module it imported directly, in milliseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    # Each import is listed after the imports it triggered, nested ones indented by two spaces
+    children = {}
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name, cumulative = parts[2][1:], int(parts[1]) / 1000
+        if name == module:
+            return cumulative, children
+        if not name.startswith(" "):
+            children = {}  # A top-level import made while the interpreter started
+        elif not name.startswith("   "):
+            children[name.strip()] = cumulative
+    raise RuntimeError(f"{module} missing from -X importtime output")
+
+
+def startup_ms():
+    result = subprocess.run([sys.executable, "-c", STARTUP_CODE], cwd=ROOT, capture_output=True, text=True,
+                            check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", nargs="+", default=["frontend", "skip_engine"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Contributors listed per module")
+    parser.add_argument("--budget-ms", type=float, help="Fail when a median exceeds this")
+    args = parser.parse_args()
+
+    over_budget = []
+    for module in args.modules:
+        profiles = [import_profile(module) for _ in range(args.runs)]
+        total = median(total for total, _ in profiles)
+        print(f"{module}: {total:.1f} ms")
+        contributors = {name: median(children.get(name, 0) for _, children in profiles) for name in profiles[0][1]}
+        for name, value in sorted(contributors.items(), key=lambda item: -item[1])[:args.top]:
+            print(f"    {value:8.1f} ms  {name}")
+        if args.budget_ms and total > args.budget_ms:
+            over_budget.append(module)
+
+    if "frontend" in args.modules:
+        total = median(startup_ms() for _ in range(args.runs))
+        print(f"startup (import frontend and construct PlexViewer): {total:.1f} ms")
+        if args.budget_ms and total > args.budget_ms:
+            over_budget.append("startup")
+
+    if over_budget:
+        print(f"over the {args.budget_ms:g} ms budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Load test the skip daemon and backend against a fake Plex server.
+
+Starts the backend under uvicorn on a scratch database and seeds one movie
+with marked ranges per simulated player. It then runs SkipDaemon against
+fake_plex.FakePlexServer for each session count. Reported per run:
+
+- ranges: marked ranges the players reached
+- clean: ranges of which at most --tolerance-ms was shown
+- missed: ranges shown almost entirely
+- exposure: milliseconds of each range that were shown
+- CPU and resident memory of this process (daemon plus fake server) and of the backend
+
+CPU and memory are read from /proc, so they are only reported on Linux.
+
+Run from the repository root:
+
+    python benchmarks/loadtest.py --sessions 1 10 100 --duration 60
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import fake_plex  # noqa: E402
+from log_setup import setup_logging  # noqa: E402
+from skip_engine import SkipDaemon, TICK_INTERVAL  # noqa: E402
+from skip_telemetry import SkipTelemetry, percentile  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_backend(port, database_path):
+    """Run the backend in a child process and wait until it answers."""
+    env = {
+        **os.environ,
+        "PLEX_SKIP_DATABASE_URL": f"sqlite:///{database_path}",
+        "PLEX_SKIP_LOG_LEVEL": "WARNING"
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=ROOT, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            requests.get(f"{url}/profiles/", timeout=1).raise_for_status()
+            return process, url
+        except requests.exceptions.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not start within 30s")
+
+
+def process_stats(pid):
+    """CPU seconds and resident bytes of a process, or None where /proc is unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat") as stat_file:
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu_seconds, int(fields[21]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def make_ranges(rng, duration_s):
+    """Marked ranges spread over the part of a title the players get through."""
+    ranges = []
+    position = rng.uniform(5, 10)
+    while position < duration_s - 8:
+        length = rng.uniform(2, 6)
+        ranges.append((round(position, 3), round(position + length, 3)))
+        position += length + rng.uniform(6, 15)
+    return ranges
+
+
+def seed_media(server, backend_url, rng, run_id, count, duration_s):
+    """Add one movie per player to the fake library and its ranges to the backend."""
+    seeded = []
+    for number in range(count):
+        media = server.add_media(fake_plex.FakeMedia(
+            rating_key=run_id * 100000 + number + 1,
+            title=f"Load test {run_id}-{number}",
+            duration=int((duration_s + 60) * 1000)
+        ))
+        ranges = make_ranges(rng, duration_s)
+        response = requests.post(f"{backend_url}/movies/add-timestamps/", json={
+            "title": media.title,
+            "rating_key": media.ratingKey,
+            "guids": [guid.id for guid in media.guids] + [media.guid],
+            "timestamps": [
+                {"start_time": start, "end_time": end, "label": "load test"} for start, end in ranges
+            ]
+        })
+        response.raise_for_status()
+        seeded.append((media, ranges))
+    return seeded
+
+
+def run_level(args, backend, backend_url, run_id, count):
+    rng = random.Random(run_id)
+    server = fake_plex.FakePlexServer(
+        notify_interval=args.notify_interval,
+        seek_rtt=args.seek_rtt,
+        seek_apply_delay=args.seek_apply_delay,
+        fetch_latency=args.fetch_latency,
+        seed=run_id
+    )
+    seeded = seed_media(server, backend_url, rng, run_id, count, args.duration)
+    daemon = SkipDaemon(
+        server, backend_url, lambda client_id, session: server.client(client_id),
+        buffer_seconds=args.buffer,
+        tick_interval=args.tick_interval,
+        telemetry=SkipTelemetry(capacity=100000)
+    )
+
+    own_before, backend_before = process_stats(os.getpid()), process_stats(backend.pid)
+    started = time.monotonic()
+    daemon.start()
+    sessions = [server.start_session(media) for media, _ in seeded]
+    time.sleep(args.duration)
+    daemon.stop()
+    wall = time.monotonic() - started
+    own_after, backend_after = process_stats(os.getpid()), process_stats(backend.pid)
+
+    exposures = []
+    for session, (_, ranges) in zip(sessions, seeded):
+        reached = max(end for _, end in session.played_runs())
+        for start, end in ranges:
+            if start * 1000 < reached:
+                exposures.append((round(session.exposure(start * 1000, end * 1000)), (end - start) * 1000))
+
+    result = {
+        "sessions": count,
+        "ranges": len(exposures),
+        "clean": sum(shown <= args.tolerance_ms for shown, _ in exposures),
+        "missed": sum(shown >= 0.9 * length for shown, length in exposures),
+        "exposure_ms_p50": median(shown for shown, _ in exposures) if exposures else None,
+        "exposure_ms_p95": percentile([shown for shown, _ in exposures], 0.95) if exposures else None,
+        "telemetry": daemon.telemetry.summary(),
+    }
+    if own_before and own_after:
+        result["driver_cpu_percent"] = round((own_after[0] - own_before[0]) / wall * 100, 1)
+        result["driver_rss_mb"] = round(own_after[1] / 2 ** 20, 1)
+    if backend_before and backend_after:
+        result["backend_cpu_percent"] = round((backend_after[0] - backend_before[0]) / wall * 100, 1)
+        result["backend_rss_mb"] = round(backend_after[1] / 2 ** 20, 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--duration", type=float, default=60, help="Seconds each run plays")
+    parser.add_argument("--buffer", type=float, default=0.0, help="Skip buffer in seconds")
+    parser.add_argument("--tolerance-ms", type=float, default=1000, help="Exposure still counted as clean")
+    parser.add_argument("--tick-interval", type=float, default=TICK_INTERVAL)
+    parser.add_argument("--notify-interval", type=float, default=fake_plex.NOTIFY_INTERVAL)
+    parser.add_argument("--seek-rtt", type=float, default=fake_plex.SEEK_RTT)
+    parser.add_argument("--seek-apply-delay", type=float, default=fake_plex.SEEK_APPLY_DELAY)
+    parser.add_argument("--fetch-latency", type=float, default=fake_plex.FETCH_LATENCY)
+    parser.add_argument("--json", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    setup_logging("WARNING")
+    results = []
+    with tempfile.TemporaryDirectory() as scratch:
+        backend, backend_url = start_backend(free_port(), os.path.join(scratch, "loadtest.db"))
+        try:
+            for run_id, count in enumerate(args.sessions, start=1):
+                results.append(run_level(args, backend, backend_url, run_id, count))
+        finally:
+            backend.terminate()
+            backend.wait()
+
+    columns = ["sessions", "ranges", "clean", "missed", "exp p50 ms", "exp p95 ms", "late p95 ms",
+               "seek p95 ms", "driver cpu%", "driver MB", "backend cpu%", "backend MB"]
+    print(" ".join(f"{column:>12}" for column in columns))
+    for result in results:
+        telemetry = result["telemetry"]
+        row = [result["sessions"], result["ranges"], result["clean"], result["missed"],
+               result["exposure_ms_p50"], result["exposure_ms_p95"],
+               telemetry.get("lateness_ms_p95"), telemetry.get("seek_rtt_ms_p95"),
+               result.get("driver_cpu_percent"), result.get("driver_rss_mb"),
+               result.get("backend_cpu_percent"), result.get("backend_rss_mb")]
+        print(" ".join(f"{'-' if value is None else value:>12}" for value in row))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+
+if __name__ == "__main__":
+    main()
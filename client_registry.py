@@ -0,0 +1,101 @@
+import functools
+import logging
+import threading
+
+logger = logging.getLogger("plex_skip.clients")
+
+# Seconds between health checks of each connected player
+HEALTH_CHECK_INTERVAL = 30.0
+# Cheap endpoint every Plex player answers
+HEALTH_CHECK_PATH = "/resources"
+
+
+class ClientRegistry:
+    """One connected PlexClient per player, sharing a single HTTP session.
+
+    get() returns the cached client and connects only on first use. A client
+    whose call fails is dropped and reconnected on the next get(). Health
+    checks ping every cached client so connections stay warm and dead ones
+    are replaced before the next skip needs them. With io set the checks run
+    on the player's PlexIO lane, between its seeks.
+    """
+
+    def __init__(self, factory, io=None, health_interval=HEALTH_CHECK_INTERVAL):
+        self.factory = factory  # factory(client_id, session) -> connected PlexClient
+        self.io = io
+        self.health_interval = health_interval
+        self.session = None  # requests.Session shared by every client, created on first connect
+        self._clients = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self, client_id):
+        """Connected client for a player, connecting on first use."""
+        with self._lock:
+            client = self._clients.get(client_id)
+        if client is not None:
+            return client
+
+        if self.session is None:
+            import requests
+            self.session = requests.Session()
+        client = self.factory(client_id, self.session)
+        logger.info("Connected to client", extra={"client": client_id})
+        with self._lock:
+            return self._clients.setdefault(client_id, client)
+
+    def invalidate(self, client_id, client=None):
+        """Drop a player's client, only if it is still client when that is given."""
+        with self._lock:
+            if client is None or self._clients.get(client_id) is client:
+                self._clients.pop(client_id, None)
+
+    def call(self, client_id, method, *args, **kwargs):
+        """Call a client method, dropping the client if the call fails."""
+        client = self.get(client_id)
+        try:
+            return getattr(client, method)(*args, **kwargs)
+        except Exception:
+            self.invalidate(client_id, client)
+            raise
+
+    def seeker(self, client_id):
+        """seekTo of a player's current client, suitable as SkipEngine.seek."""
+        return functools.partial(self.call, client_id, "seekTo")
+
+    def ping(self, client_id):
+        """Health check a player, reconnecting right away if it failed."""
+        try:
+            self.call(client_id, "query", HEALTH_CHECK_PATH)
+        except Exception as e:
+            logger.info("Client health check failed, reconnecting", extra={"client": client_id, "error": str(e)})
+            # Raises while the player stays unreachable, it is then pinged no more
+            self.get(client_id)
+
+    def check_health(self):
+        with self._lock:
+            client_ids = list(self._clients)
+        for client_id in client_ids:
+            if self.io is None:
+                try:
+                    self.ping(client_id)
+                except Exception as e:
+                    logger.warning("Client unreachable: %s", e, extra={"client": client_id})
+            elif not self.io.busy(client_id):
+                # A busy lane is already talking to the player
+                self.io.submit(client_id, self.ping, client_id)
+
+    def _run_health_checks(self):
+        while not self._stop.wait(self.health_interval):
+            self.check_health()
+
+    def start_health_checks(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run_health_checks, name="client-health", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
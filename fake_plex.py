@@ -0,0 +1,281 @@
+"""Local stand-in for a Plex server and its players.
+
+Emulates the parts of plexapi the skip frontend and daemon use:
+PlexServer.sessions(), fetchItem(), library sections and startAlertListener()
+delivering PlaySessionStateNotification alerts, and PlexClient.seekTo(). Players
+advance in real time, and a seek takes a network round trip plus a delay
+before the player jumps. Each session records the runs it actually played,
+so a load test can tell how much of a marked range was shown.
+"""
+import bisect
+import itertools
+import random
+import threading
+import time
+
+from plexapi.exceptions import NotFound
+
+# Seconds between timeline notifications of a playing session
+NOTIFY_INTERVAL = 1.0
+# Median round trip of a seekTo call, in seconds
+SEEK_RTT = 0.08
+# Time a player takes to jump after receiving a seek, in seconds
+SEEK_APPLY_DELAY = 0.15
+# Latency of a metadata lookup, in seconds
+FETCH_LATENCY = 0.02
+
+
+class FakeGuid:
+    def __init__(self, id):
+        self.id = id
+
+
+class FakeMedia:
+    """A library item with the attributes of plexapi's Movie and Episode."""
+
+    def __init__(self, rating_key, title, duration, show_name=None, season=None, episode=None):
+        self.ratingKey = rating_key
+        self.key = f"/library/metadata/{rating_key}"
+        self.title = title
+        self.duration = duration  # Milliseconds
+        self.type = 'episode' if show_name else 'movie'
+        self.guid = f"plex://{self.type}/{rating_key:024x}"
+        self.guids = [FakeGuid(f"tmdb://{rating_key}")]
+        if show_name:
+            self.grandparentTitle = show_name
+            self.parentIndex = season
+            self.index = episode
+        else:
+            self.year = 2000
+
+
+class FakeSession:
+    """A player's playback of one media item, advancing in real time.
+
+    Attributes not defined here (title, type, duration, ...) come from the
+    media item, as they do on plexapi's session objects.
+    """
+
+    def __init__(self, session_key, media, offset=0):
+        self.media = media
+        self.sessionKey = session_key
+        self.players = []
+        self.played = []  # Finished (start_ms, end_ms) runs, closed by seeks
+        self._lock = threading.Lock()
+        self._base_offset = offset
+        self._base_time = time.monotonic()
+        self._pending_seeks = []  # Sorted (apply_at, offset) pairs
+
+    def __getattr__(self, name):
+        if name == 'media':
+            raise AttributeError(name)
+        return getattr(self.media, name)
+
+    def _position_at(self, moment):
+        return min(self.media.duration, self._base_offset + int((moment - self._base_time) * 1000))
+
+    def _advance(self, now):
+        """Apply seeks that reached the player by now; the caller holds the lock."""
+        while self._pending_seeks and self._pending_seeks[0][0] <= now:
+            apply_at, offset = self._pending_seeks.pop(0)
+            self.played.append((self._base_offset, self._position_at(apply_at)))
+            self._base_offset, self._base_time = offset, apply_at
+
+    @property
+    def viewOffset(self):
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            return self._position_at(now)
+
+    @property
+    def state(self):
+        return 'stopped' if self.viewOffset >= self.media.duration else 'playing'
+
+    def queue_seek(self, offset, apply_at):
+        with self._lock:
+            bisect.insort(self._pending_seeks, (apply_at, offset))
+
+    def played_runs(self):
+        """Every run played so far, including the current one."""
+        now = time.monotonic()
+        with self._lock:
+            self._advance(now)
+            return self.played + [(self._base_offset, self._position_at(now))]
+
+    def exposure(self, start_ms, end_ms):
+        """Milliseconds of the range start_ms..end_ms that were played."""
+        return sum(
+            max(0, min(run_end, end_ms) - max(run_start, start_ms))
+            for run_start, run_end in self.played_runs()
+        )
+
+    def notification(self):
+        """The alert Plex sends for this session's timeline."""
+        view_offset = self.viewOffset
+        return {
+            'type': 'playing',
+            'size': 1,
+            'PlaySessionStateNotification': [{
+                'sessionKey': str(self.sessionKey),
+                'clientIdentifier': self.players[0].machineIdentifier,
+                'guid': '',
+                'ratingKey': str(self.media.ratingKey),
+                'url': '',
+                'key': self.media.key,
+                'viewOffset': view_offset,
+                'playQueueItemID': self.sessionKey,
+                'state': 'stopped' if view_offset >= self.media.duration else 'playing'
+            }]
+        }
+
+
+class FakePlexClient:
+    """A player answering query and seekTo after a simulated network round trip."""
+
+    def __init__(self, server, session, machine_identifier):
+        self.server = server
+        self.session = session
+        self.machineIdentifier = machine_identifier
+        self.title = f"Fake player {session.sessionKey}"
+        self.product = "Fake Player"
+        self.platform = "Linux"
+        self.seeks = 0
+
+    @property
+    def state(self):
+        return self.session.state
+
+    def query(self, path, method=None, **kwargs):
+        time.sleep(self.server.sample_seek_rtt())
+
+    def seekTo(self, offset, mtype=None):
+        rtt = self.server.sample_seek_rtt()
+        time.sleep(rtt / 2)
+        self.session.queue_seek(offset, time.monotonic() + self.server.seek_apply_delay)
+        time.sleep(rtt / 2)
+        self.seeks += 1
+
+
+class FakeLibrarySection:
+    def __init__(self, server, type):
+        self.server = server
+        self.type = type
+
+    def _items(self, media_type):
+        time.sleep(self.server.fetch_latency)
+        return [media for media in self.server.items.values() if media.type == media_type]
+
+    def all(self):
+        return self._items('movie' if self.type == 'movie' else 'show')
+
+    def searchEpisodes(self):
+        return self._items('episode')
+
+
+class FakeLibrary:
+    """The server's library: one movie and one show section, and an empty On Deck."""
+
+    def __init__(self, server):
+        self._sections = [FakeLibrarySection(server, 'movie'), FakeLibrarySection(server, 'show')]
+
+    def sections(self):
+        return list(self._sections)
+
+    def onDeck(self):
+        return []
+
+
+class FakeAlertListener(threading.Thread):
+    """Delivers timeline notifications for every session at the server's interval.
+
+    Like plexapi's AlertListener, callbacks run on the listener thread, so a
+    slow callback delays every notification after it.
+    """
+
+    def __init__(self, server, callback, callbackError=None):
+        super().__init__(name="fake-plex-alerts", daemon=True)
+        self.server = server
+        self.callback = callback
+        self.callbackError = callbackError
+        self._stop_event = threading.Event()
+
+    def run(self):
+        next_notify = {}  # sessionKey -> time of the next notification
+        interval = self.server.notify_interval
+        while not self._stop_event.wait(0.02):
+            now = time.monotonic()
+            for session in self.server.sessions():
+                # Spread the first notifications so sessions do not report in lockstep
+                due = next_notify.setdefault(session.sessionKey, now + self.server.rng.uniform(0, interval))
+                if due > now:
+                    continue
+                next_notify[session.sessionKey] = due + interval
+                try:
+                    self.callback(session.notification())
+                except Exception as e:
+                    if self.callbackError:
+                        self.callbackError(e)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class FakePlexServer:
+    """In-process replacement for plexapi's PlexServer with simulated players."""
+
+    def __init__(self, notify_interval=NOTIFY_INTERVAL, seek_rtt=SEEK_RTT, seek_apply_delay=SEEK_APPLY_DELAY,
+                 fetch_latency=FETCH_LATENCY, seed=0):
+        self.notify_interval = notify_interval
+        self.seek_rtt = seek_rtt
+        self.seek_apply_delay = seek_apply_delay
+        self.fetch_latency = fetch_latency
+        self.rng = random.Random(seed)
+        self.items = {}  # key -> FakeMedia
+        self.library = FakeLibrary(self)
+        self._sessions = {}  # sessionKey -> FakeSession
+        self._clients = {}  # machineIdentifier -> FakePlexClient
+        self._session_keys = itertools.count(1)
+
+    def sample_seek_rtt(self):
+        """Round trip of one seek; log-normal around the configured median."""
+        return self.seek_rtt * self.rng.lognormvariate(0, 0.5)
+
+    def add_media(self, media):
+        self.items[media.key] = media
+        return media
+
+    def start_session(self, media, offset=0):
+        """Start a new player on media at offset milliseconds."""
+        session_key = next(self._session_keys)
+        session = FakeSession(session_key, media, offset)
+        client = FakePlexClient(self, session, f"fake-player-{session_key}")
+        session.players.append(client)
+        self._clients[client.machineIdentifier] = client
+        self._sessions[session_key] = session
+        return session
+
+    def sessions(self):
+        return list(self._sessions.values())
+
+    def clients(self):
+        return list(self._clients.values())
+
+    def client(self, machine_identifier):
+        try:
+            return self._clients[machine_identifier]
+        except KeyError:
+            raise NotFound(f"Unknown client: {machine_identifier}")
+
+    def fetchItem(self, ekey):
+        time.sleep(self.fetch_latency)
+        key = f"/library/metadata/{ekey}" if isinstance(ekey, int) else ekey
+        try:
+            return self.items[key]
+        except KeyError:
+            raise NotFound(f"Unable to find item {key}")
+
+    def startAlertListener(self, callback=None, callbackError=None):
+        listener = FakeAlertListener(self, callback, callbackError)
+        listener.start()
+        return listener
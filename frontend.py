@@ -1,13 +1,24 @@
 import tkinter as tk
 from tkinter import ttk, StringVar, messagebox
 from datetime import timedelta
-from plexapi.server import PlexServer
-from plexapi.alert import AlertListener
 from dotenv import load_dotenv
+import difflib
+import logging
 import os
+import queue
 import time
-import requests
-from plexapi.client import PlexClient
+
+# plexapi and requests take most of the startup time, so they are imported
+# where first used; the window shows before they load
+import wire_format
+from alert_queue import CoalescingQueue
+from client_registry import ClientRegistry
+from library_index import LibraryIndex
+from log_setup import DebugSampler, setup_logging
+from plex_io import PLEX_IO_TIMEOUT, PlexIO
+from plan_cache import SkipPlanCache
+from skip_engine import PREFETCH_LANE, SkipEngine, fetch_skip_plan, media_identifiers, prefetch_skip_plans
+from skip_telemetry import SkipTelemetry
 
 # Load environment variables
 load_dotenv()
@@ -18,6 +29,23 @@ PLEX_TOKEN = os.getenv("PLEX_TOKEN")
 BACKEND_URL = "http://127.0.0.1:8000"  # Your FastAPI backend
 CLIENT_URL = os.getenv("PLEX_CLIENT_URL")
 CLIENT_ID = os.getenv("PLEX_CLIENT_ID")
+SKIP_PROFILE = os.getenv("PLEX_SKIP_PROFILE")  # Viewer profile deciding which categories are skipped
+TELEMETRY_LOG = os.getenv("PLEX_SKIP_TELEMETRY_LOG")  # JSON lines file receiving one record per skip
+TELEMETRY_METRICS = os.getenv("PLEX_SKIP_TELEMETRY_METRICS")  # Prometheus textfile with skip aggregates
+# Name recorded with each edit in the backend's history, the login name by default
+AUTHOR = os.getenv("PLEX_SKIP_AUTHOR") or os.getenv("USER") or os.getenv("USERNAME") or ""
+EDIT_HEADERS = {"X-Plex-Skip-Author": AUTHOR}
+# PlexIO lane skip plans are fetched from the backend on, apart from the player's seeks
+BACKEND_LANE = "backend"
+# Milliseconds the buffer entry has to stay unchanged before a plan is fetched for it
+BUFFER_DEBOUNCE_MS = 500
+
+# Content categories understood by the backend
+CATEGORIES = ("nudity", "gore", "violence", "drugs", "other")
+
+logger = logging.getLogger("plex_skip.frontend")
+# Alerts arrive about once a second per client, log them sampled
+debug_sampled = DebugSampler(logger)
 
 
 def format_time(milliseconds):
@@ -26,51 +54,159 @@ def format_time(milliseconds):
     return str(timedelta(seconds=seconds))
 
 
+def timestamp_key(ts):
+    """Identity of a stored range, used to diff the displayed list."""
+    return ts['start_time'], ts['end_time'], ts.get('label'), tuple(ts.get('categories') or ())
+
+
+def timestamp_row(ts):
+    """Treeview values of a stored range."""
+    return (
+        format_time(int(ts['start_time'] * 1000)),
+        format_time(int(ts['end_time'] * 1000)),
+        ts.get('label') or '',
+        ', '.join(ts.get('categories') or [])
+    )
+
+
 class PlexViewer:
     def __init__(self):
-        self.plex = PlexServer(PLEX_SERVER_URL, PLEX_TOKEN)
+        self.plex = None  # Connected in the background once the window is up
+        self.ui_calls = queue.SimpleQueue()  # (callback, argument) pairs to run on the Tk thread
+        # Plex calls run on a worker pool, their results come back through ui_calls
+        self.plex_io = PlexIO(deliver=lambda callback, argument: self.ui_calls.put((callback, argument)))
+        self.clients = ClientRegistry(self.create_client, io=self.plex_io)
         self.sessions = {}
+        self.sessions_refreshing = False
         self.selected_session_key = None
         self.alert_listener = None
-        self.last_view_offset = 0
-        self.last_update_time = 0
-        self.playback_state = 'stopped'
         self.current_duration = 0
-        self.recently_skipped = set()
         self.buffer_seconds = None  # Will be initialized in run()
+        self.applied_buffer = 0  # Buffer entry value once typing paused
+        self.buffer_settle_id = None
+
+        # Playback position and skipping, the engine's plan is fetched for the current buffer
+        self.telemetry = SkipTelemetry(log_path=TELEMETRY_LOG, metrics_path=TELEMETRY_METRICS)
+        self.engine = SkipEngine(CLIENT_ID, telemetry=self.telemetry, io=self.plex_io)
+        self.skip_plan_buffer = None
+        self.plan_fetches = 0  # Bumped per plan fetch and media change, older fetches are then dropped
+        self.skip_monitor_generation = 0
+        self.metadata_pending = False  # The played item changed and its metadata is not in yet
+        self.plan_cache = SkipPlanCache()  # Plans fetched or prefetched, by media, profile and buffer
+        self.library = LibraryIndex(None, io=self.plex_io)  # Built once the server is connected
+        # Latest notification per player, put by the alert thread and applied on the Tk thread
+        self.alerts = CoalescingQueue(registry=self.telemetry.registry)
+        self.current_metadata_key = None
 
         # Timestamp marking
         self.start_timestamp = None
         self.current_media_type = None
         self.current_media_info = {}
+        self.stored_titles = {}  # Plex movie title -> title the backend matched it to
+        self.displayed_timestamps = []  # Ranges shown in the timestamp list, in row order
+        self.displayed_keys = []  # timestamp_key of each row
+
+    def run_in_background(self, lane, work, on_done=None, on_error=None):
+        """Run work() on the Plex worker pool; on_done(result) or on_error(exception) then run on the Tk thread.
+
+        Calls on the same lane run one at a time, use "server" for the Plex
+        server and the client id for a player.
+        """
+        self.plex_io.submit(lane, work, on_done=on_done, on_error=on_error or self.update_error)
+
+    def process_ui_calls(self):
+        """Run callbacks queued by background work; Tk may only be used from its own thread."""
+        for notification, received_at in self.alerts.drain():
+            try:
+                self.apply_notification(notification, received_at)
+            except Exception:
+                logger.exception("Applying a notification failed")
+        while True:
+            try:
+                callback, argument = self.ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(argument)
+            except Exception:
+                logger.exception("UI callback failed")
+        self.root.after(50, self.process_ui_calls)
+
+    def create_client(self, client_id, session):
+        """Connect to a player; ClientRegistry calls this once per player."""
+        from plexapi.client import PlexClient
+        return PlexClient(
+            identifier=client_id, baseurl=CLIENT_URL, token=PLEX_TOKEN, session=session, timeout=PLEX_IO_TIMEOUT
+        )
+
+    def connect_plex(self):
+        """Connect to the Plex server in the background."""
+        def connect():
+            from plexapi.server import PlexServer
+            return PlexServer(PLEX_SERVER_URL, PLEX_TOKEN, timeout=PLEX_IO_TIMEOUT)
+
+        self.connection_var.set("Connecting to Plex server...")
+        self.run_in_background("server", connect, self.plex_connected, self.plex_connection_failed)
+
+    def plex_connected(self, plex):
+        self.plex = plex
+        self.library.plex = plex
+        self.connection_var.set(f"Connected to {plex.friendlyName}")
+        logger.info("Connected to Plex server", extra={"server": plex.friendlyName})
+        self.library.start_build(on_error=lambda e: logger.warning("Indexing the library failed: %s", e))
+
+    def plex_connection_failed(self, error):
+        self.connection_var.set("Plex server unreachable, retrying...")
+        self.update_error(f"Could not connect to Plex: {error}")
+        self.root.after(5000, self.connect_plex)
 
     def fetch_active_sessions(self):
-        """Fetch active sessions from Plex."""
-        self.sessions = {}
-        try:
-            sessions = self.plex.sessions()
-            for session in sessions:
-                player = session.players[0]  # Assume one player per session
-                session_key = str(session.sessionKey)
-                self.sessions[session_key] = {
-                    'sessionKey': session_key,
-                    'machineIdentifier': player.machineIdentifier,
-                    'title': session.title,
-                    'state': player.state,
-                    'viewOffset': session.viewOffset,
-                    'duration': session.duration,
-                    'product': player.product,
-                    'platform': player.platform,
-                    'player': player.title
-                }
-        except Exception as e:
-            self.update_error(f"Error fetching sessions: {e}")
+        """Fetch active sessions from Plex; runs in the background."""
+        sessions = {}
+        for session in self.plex.sessions():
+            player = session.players[0]  # Assume one player per session
+            session_key = str(session.sessionKey)
+            sessions[session_key] = {
+                'sessionKey': session_key,
+                'machineIdentifier': player.machineIdentifier,
+                'title': session.title,
+                'state': player.state,
+                'viewOffset': session.viewOffset,
+                'duration': session.duration,
+                'product': player.product,
+                'platform': player.platform,
+                'player': player.title
+            }
+        return sessions
+
+    def refresh_sessions(self):
+        """Start a background session discovery unless one is already running."""
+        if self.plex is None or self.sessions_refreshing:
+            return
+        self.sessions_refreshing = True
+        self.run_in_background("server", self.fetch_active_sessions, self.show_sessions, self.sessions_failed)
+
+    def show_sessions(self, sessions):
+        """Update the dropdown menu with discovered sessions."""
+        self.sessions_refreshing = False
+        self.sessions = sessions
+        menu = self.session_menu["menu"]
+        menu.delete(0, "end")
+        for session_key, session_data in self.sessions.items():
+            menu.add_command(
+                label=f"{session_data['title']} ({session_data['player']})",
+                command=lambda key=session_key: self.select_session(key)
+            )
+
+    def sessions_failed(self, error):
+        self.sessions_refreshing = False
+        self.update_error(f"Error fetching sessions: {error}")
 
     def create_edit_dialog(self, timestamp_data):
         """Create a dialog for editing timestamp data."""
         dialog = tk.Toplevel(self.root)
         dialog.title("Edit Timestamp")
-        dialog.geometry("400x250")
+        dialog.geometry("400x300")
         dialog.transient(self.root)
         dialog.grab_set()
 
@@ -102,9 +238,9 @@ class PlexViewer:
         ttk.Label(frame, text="Label (optional):").pack(pady=(0, 5))
         label_var = tk.StringVar(value=timestamp_data.get('label', ''))
         label_entry = ttk.Entry(frame, textvariable=label_var)
-        label_entry.pack(pady=(0, 20))
-
+        label_entry.pack(pady=(0, 10))
 
+        category_vars = self.create_category_checkboxes(frame, timestamp_data.get('categories') or [])
 
         def time_to_seconds(time_str):
             """Convert HH:MM:SS to seconds."""
@@ -127,7 +263,8 @@ class PlexViewer:
                 dialog.result = {
                     'start_time': float(start_seconds),
                     'end_time': float(end_seconds),
-                    'label': label_var.get() if label_var.get().strip() else None
+                    'label': label_var.get() if label_var.get().strip() else None,
+                    'categories': [name for name, var in category_vars.items() if var.get()]
                 }
                 dialog.destroy()
             except ValueError as e:
@@ -150,11 +287,23 @@ class PlexViewer:
         dialog.wait_window()
         return getattr(dialog, 'result', None)
 
+    def create_category_checkboxes(self, parent, selected):
+        """Create one checkbox per content category and return their variables."""
+        category_frame = ttk.Frame(parent)
+        category_frame.pack(pady=(0, 20))
+
+        category_vars = {}
+        for name in CATEGORIES:
+            var = tk.BooleanVar(value=name in selected)
+            ttk.Checkbutton(category_frame, text=name.capitalize(), variable=var).pack(side=tk.LEFT, padx=2)
+            category_vars[name] = var
+        return category_vars
+
     def create_label_dialog(self, start_time, end_time):
-        """Create a dialog for label input."""
+        """Create a dialog for label and category input."""
         dialog = tk.Toplevel(self.root)
         dialog.title("Add Timestamp Label")
-        dialog.geometry("400x200")
+        dialog.geometry("400x250")
         dialog.transient(self.root)  # Make dialog modal
         dialog.grab_set()  # Make dialog modal
 
@@ -183,11 +332,13 @@ class PlexViewer:
 
         label_var = tk.StringVar()
         entry = ttk.Entry(frame, textvariable=label_var, width=40)
-        entry.pack(pady=(0, 20))
+        entry.pack(pady=(0, 10))
         entry.focus()  # Put cursor in entry field
 
+        category_vars = self.create_category_checkboxes(frame, [])
+
         def submit():
-            dialog.result = label_var.get()
+            dialog.result = (label_var.get(), [name for name, var in category_vars.items() if var.get()])
             dialog.destroy()
 
         def cancel():
@@ -238,18 +389,20 @@ class PlexViewer:
     def force_refresh_timestamps(self):
         """Force a refresh of the timestamps display."""
         if self.selected_session_key and self.sessions:
-            print("Forcing timestamp refresh")  # Debug print
+            logger.debug("Forcing timestamp refresh")
             session_data = self.sessions[self.selected_session_key]
             response = self.fetch_existing_timestamps(session_data)
             if response and 'timestamps' in response:
                 self.display_timestamps(response['timestamps'])
                 # Force the GUI to update
-                self.scrollable_frame.update_idletasks()
+                self.timestamp_tree.update_idletasks()
                 return True
         return False
 
     def edit_timestamp(self, index, timestamp_data):
         """Edit an existing timestamp."""
+        import requests
+
         edited_data = self.create_edit_dialog(timestamp_data)
         if edited_data is None:
             return
@@ -257,15 +410,17 @@ class PlexViewer:
         try:
             if self.current_media_type == 'movie':
                 endpoint = f"{BACKEND_URL}/movies/update-timestamp/"
-                params = {"title": self.current_media_info['title']}
+                params = {"title": self.stored_movie_title()}
 
                 update_data = {
                     "index": index,
                     "start_time": float(edited_data['start_time']),
                     "end_time": float(edited_data['end_time']),
-                    "label": edited_data['label']
+                    "label": edited_data['label'],
+                    "categories": edited_data['categories']
                 }
-                response = requests.post(endpoint, params=params, json=update_data)
+                response = requests.post(endpoint, params=params, json=update_data, headers=EDIT_HEADERS,
+                                         timeout=PLEX_IO_TIMEOUT)
             else:  # TV show
                 endpoint = f"{BACKEND_URL}/tv-shows/update-timestamp/"
 
@@ -277,26 +432,25 @@ class PlexViewer:
                     "index": index,
                     "start_time": float(edited_data['start_time']),
                     "end_time": float(edited_data['end_time']),
-                    "label": edited_data['label'] if edited_data.get('label') else None
+                    "label": edited_data['label'] if edited_data.get('label') else None,
+                    "categories": edited_data['categories']
                 }
 
-                print(f"Sending TV show update request with params: {params}")
-                response = requests.post(endpoint, params=params)
+                logger.debug("Sending TV show update request", extra={"index": index})
+                response = requests.post(endpoint, params=params, headers=EDIT_HEADERS, timeout=PLEX_IO_TIMEOUT)
 
             response.raise_for_status()
-            response_data = response.json()
 
-            if response_data.get('timestamps'):
-                self.display_timestamps(response_data['timestamps'])
+            # The edit is merged into place by the backend, so the list is read back rather than patched here
+            self.skip_plan_changed()
+            session_data = self.sessions[self.selected_session_key]
+            self.fetch_existing_timestamps(session_data)
 
-                # Restart skip monitoring with updated timestamps
-                if self.is_active_client():
-                    session_data = self.sessions[self.selected_session_key]
-                    self.monitor_and_skip_timestamps(session_data, response_data['timestamps'])
+            # Restart skip monitoring with updated timestamps
+            if self.is_active_client():
+                self.monitor_and_skip_timestamps(session_data)
 
-                messagebox.showinfo("Success", "Timestamp updated successfully!")
-            else:
-                self.fetch_existing_timestamps(self.sessions[self.selected_session_key])
+            messagebox.showinfo("Success", "Timestamp updated successfully!")
 
         except requests.exceptions.RequestException as e:
             error_msg = str(e)
@@ -307,35 +461,40 @@ class PlexViewer:
                 except:
                     pass
             messagebox.showerror("Error", f"Failed to update timestamp: {error_msg}")
-            print(f"Debug - Update error details: {e}")
+            logger.warning("Timestamp update failed: %s", e)
 
     # Update the delete_timestamp method's movie section
     def delete_timestamp(self, index):
         """Delete an existing timestamp."""
+        import requests
+
         if not messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this timestamp?"):
             return
 
         try:
             if self.current_media_type == 'episode':
-                endpoint = f"{BACKEND_URL}/tv-shows/delete-timestamp/"
-                data = {
-                    "show_name": self.current_media_info['show_name'],
-                    "season": str(self.current_media_info['season']),
-                    "episode_number": str(self.current_media_info['episode']),
-                    "title": self.current_media_info['title'],
-                    "index": index
-                }
+                # The endpoint takes two bodies, so each is sent under its parameter name
+                response = requests.post(f"{BACKEND_URL}/tv-shows/delete-timestamp/", json={
+                    "request": {
+                        "show_name": self.current_media_info['show_name'],
+                        "season": str(self.current_media_info['season']),
+                        "episode_number": str(self.current_media_info['episode']),
+                        "title": self.current_media_info['title']
+                    },
+                    "delete_data": {"index": index}
+                }, headers=EDIT_HEADERS, timeout=PLEX_IO_TIMEOUT)
             else:  # movie
-                endpoint = f"{BACKEND_URL}/movies/delete-timestamp/"
-                data = {
-                    "title": self.current_media_info['title'],
-                    "index": index
-                }
-
-            response = requests.post(endpoint, json=data)
+                response = requests.post(
+                    f"{BACKEND_URL}/movies/delete-timestamp/",
+                    params={"title": self.stored_movie_title()},
+                    json={"index": index},
+                    headers=EDIT_HEADERS,
+                    timeout=PLEX_IO_TIMEOUT
+                )
             response.raise_for_status()
 
             messagebox.showinfo("Success", "Timestamp deleted successfully!")
+            self.skip_plan_changed()
             self.fetch_existing_timestamps(self.sessions[self.selected_session_key])
 
         except requests.exceptions.RequestException as e:
@@ -349,25 +508,24 @@ class PlexViewer:
             messagebox.showerror("Error", "Please set a start timestamp first")
             return
 
-        if self.playback_state == 'playing':
-            elapsed_time = time.time() - self.last_update_time
-            current_offset = self.last_view_offset + int(elapsed_time * 1000)
-        else:
-            current_offset = self.last_view_offset
+        current_offset = self.engine.current_position_ms()
 
         if current_offset <= self.start_timestamp:
             messagebox.showerror("Error", "End timestamp must be after start timestamp")
             return
 
-        # Show dialog to get label
-        label = self.create_label_dialog(self.start_timestamp, current_offset)
+        # Show dialog to get label and categories
+        result = self.create_label_dialog(self.start_timestamp, current_offset)
 
         # If user didn't cancel
-        if label is not None:
-            self.send_timestamps_to_backend(self.start_timestamp, current_offset, label)
+        if result is not None:
+            label, categories = result
+            self.send_timestamps_to_backend(self.start_timestamp, current_offset, label, categories)
 
-    def send_timestamps_to_backend(self, start_time, end_time, label=None):
+    def send_timestamps_to_backend(self, start_time, end_time, label=None, categories=None):
         """Send timestamp range to backend server."""
+        import requests
+
         if not self.current_media_type or not self.current_media_info:
             messagebox.showerror("Error", "No media selected")
             return
@@ -376,7 +534,8 @@ class PlexViewer:
             "timestamps": [{
                 "start_time": start_time / 1000,  # Convert to seconds
                 "end_time": end_time / 1000,
-                "label": label if label and label.strip() else None
+                "label": label if label and label.strip() else None,
+                "categories": categories or []
             }]
         }
 
@@ -388,21 +547,26 @@ class PlexViewer:
                     "show_name": self.current_media_info['show_name'],
                     "season": str(self.current_media_info['season']),
                     "episode_number": str(self.current_media_info['episode']),
-                    "title": self.current_media_info['title']
+                    "title": self.current_media_info['title'],
+                    "rating_key": self.current_media_info.get('rating_key'),
+                    "guids": self.current_media_info.get('guids', [])
                 }
             else:  # movie
                 endpoint = f"{BACKEND_URL}/movies/add-timestamps/"
                 data = {
                     **timestamp_data,
-                    "title": self.current_media_info['title']
+                    "title": self.stored_movie_title(),
+                    "rating_key": self.current_media_info.get('rating_key'),
+                    "guids": self.current_media_info.get('guids', [])
                 }
 
-            response = requests.post(endpoint, json=data)
+            response = requests.post(endpoint, json=data, headers=EDIT_HEADERS, timeout=PLEX_IO_TIMEOUT)
             response.raise_for_status()
 
             messagebox.showinfo("Success", "Timestamp range saved successfully!")
             self.start_timestamp = None  # Reset start timestamp
             self.update_timestamp_buttons()
+            self.skip_plan_changed()
 
             # Refresh timestamps display after saving
             self.fetch_existing_timestamps(self.sessions[self.selected_session_key])
@@ -420,6 +584,10 @@ class PlexViewer:
         self.session_menu = ttk.OptionMenu(session_frame, self.session_var, "Select a session")
         self.session_menu.pack(fill=tk.X)
 
+        # Progress of the background connection and client checks
+        self.connection_var = StringVar(self.root)
+        ttk.Label(session_frame, textvariable=self.connection_var, foreground='gray').pack(fill=tk.X, pady=(5, 0))
+
     def is_active_client(self):
         """Check if the current session belongs to the target client."""
         if not self.selected_session_key or not self.sessions:
@@ -434,16 +602,12 @@ class PlexViewer:
         return session_data['machineIdentifier'] == target_client_id
 
     def verify_client_connection(self):
-        """Debug method to verify client connection."""
+        """Debug method to verify client connection; runs in the background."""
         try:
-            client = PlexClient(
-                identifier=CLIENT_ID,
-                baseurl=CLIENT_URL,
-                token=PLEX_TOKEN
-            )
+            # Connects the shared client, so the first skip does not have to
+            client = self.clients.get(CLIENT_ID)
 
-            print(f"Client connection test:")
-            print(f"- Client title: {client.title}")
+            logger.info("Client connection test", extra={"client": client.title})
 
             # Check current sessions
             current_sessions = self.plex.sessions()
@@ -455,133 +619,219 @@ class PlexViewer:
                     break
 
             if matching_session:
-                print(f"- Session found")
-                print(f"- Playback state: {matching_session.players[0].state}")
-                print(f"- Current position: {matching_session.viewOffset / 1000:.2f}s")
+                logger.info("Session found", extra={
+                    "state": matching_session.players[0].state,
+                    "position_s": round(matching_session.viewOffset / 1000, 2)
+                })
                 return True
             else:
-                print("- No matching session found")
+                logger.info("No matching session found")
                 return False
 
         except Exception as e:
-            print(f"Client connection test failed: {e}")
+            logger.warning("Client connection test failed: %s", e)
             return False
 
-    def monitor_and_skip_timestamps(self, session_data, timestamps):
-        """Monitor playback and automatically skip marked timestamp ranges."""
-        try:
-            client = PlexClient(
-                identifier=CLIENT_ID,
-                baseurl=CLIENT_URL,
-                token=PLEX_TOKEN
+    def fetch_skip_plan(self, session_data, buffer_value):
+        """Load the skip plan of the current media and buffer into the engine, prefetched ones are used as is.
+
+        The fetch runs on the backend lane; its plan is dropped when another
+        fetch or a media change came after it.
+        """
+        data = self.build_media_request(session_data)
+        self.plan_fetches += 1
+        fetch_id = self.plan_fetches
+
+        def fetch():
+            return self.plan_cache.fetch(
+                data, buffer_value, lambda: fetch_skip_plan(BACKEND_URL, data, buffer_value, SKIP_PROFILE), SKIP_PROFILE
             )
-            print(f"Connected to client: {client.title}")
 
-            # Keep track of recently skipped timestamps to prevent double-skipping
-            self.recently_skipped = set()
+        def fetched(plan):
+            if fetch_id == self.plan_fetches:
+                self.engine.plan = plan
 
-            def check_and_skip():
-                """Check current playback position and skip if in a timestamp range."""
-                try:
-                    # Get current buffer value
-                    try:
-                        buffer_value = float(self.buffer_seconds.get())
-                    except ValueError:
-                        buffer_value = 0  # Default to no buffer if invalid value
+        self.run_in_background(
+            BACKEND_LANE, fetch, fetched, lambda e: self.update_error(f"Failed to fetch skip plan: {e}")
+        )
 
-                    # Always use the most recent view offset when checking position
-                    if self.playback_state == 'playing':
-                        elapsed_time = time.time() - self.last_update_time
-                        current_position_ms = self.last_view_offset + int(elapsed_time * 1000)
-                    else:
-                        current_position_ms = self.last_view_offset
+    def skip_plan_changed(self):
+        """Refetch the skip plan of the selected media on the next check, after its ranges were edited."""
+        self.skip_plan_buffer = None
+        self.plan_cache.discard(self.build_media_request(self.sessions[self.selected_session_key]))
 
-                    current_position_seconds = current_position_ms / 1000
+    def current_buffer(self):
+        """Buffer seconds entered by the user, no buffer while the entry is not a number."""
+        try:
+            return float(self.buffer_seconds.get())
+        except ValueError:
+            return 0
+
+    def buffer_edited(self, *args):
+        """Apply the buffer entry once typing paused, rather than fetching a plan per keystroke."""
+        if self.buffer_settle_id is not None:
+            self.root.after_cancel(self.buffer_settle_id)
+        self.buffer_settle_id = self.root.after(BUFFER_DEBOUNCE_MS, self.buffer_settled)
+
+    def buffer_settled(self):
+        self.buffer_settle_id = None
+        self.applied_buffer = self.current_buffer()
+
+    def prefetch_upcoming(self, item):
+        """Fetch the skip plans of what is likely to play after item, in the background."""
+        buffer_value = self.applied_buffer
+        self.run_in_background(
+            PREFETCH_LANE,
+            lambda: prefetch_skip_plans(
+                self.plex, item, self.plan_cache, BACKEND_URL, buffer_value, SKIP_PROFILE, library=self.library
+            ),
+            on_error=lambda e: logger.warning("Prefetching skip plans failed: %s", e)
+        )
 
-                    # Check each timestamp range
-                    for ts in timestamps:
-                        # Apply buffer to start and end times
-                        start_time = ts['start_time'] - buffer_value
-                        end_time = ts['end_time'] + buffer_value
+    def monitor_and_skip_timestamps(self, session_data):
+        """Monitor playback and automatically skip marked timestamp ranges."""
+        def connect_client():
+            return self.clients.get(CLIENT_ID)
 
-                        # Create a unique identifier for this skip point
-                        skip_id = f"{start_time}-{end_time}"
+        def failed(error):
+            error_msg = f"Failed to setup auto-skip monitoring: {str(error)}"
+            logger.error(error_msg)
+            self.update_error(error_msg)
 
-                        # If we're in or just about to enter a timestamp range
-                        if (start_time <= current_position_seconds <= end_time and
-                                skip_id not in self.recently_skipped):
+        self.run_in_background(
+            CLIENT_ID, connect_client, lambda client: self.start_skip_monitor(session_data, client), failed
+        )
 
-                            print(f"Attempting to skip from {current_position_seconds:.2f}s to {end_time:.2f}s")
+    def start_skip_monitor(self, session_data, client):
+        """Start the periodic skip check once the client is connected."""
+        try:
+            logger.info("Connected to client", extra={"client": client.title})
 
-                            try:
-                                # Send seek command to client
-                                seek_position = int(end_time * 1000)
-                                client.seekTo(seek_position)
-                                print(f"Seek command sent to position {end_time}s")
+            self.engine.seek = self.clients.seeker(CLIENT_ID)
+            self.engine.cooldowns.clear()
 
-                                # Add to recently skipped and schedule removal
-                                self.recently_skipped.add(skip_id)
-                                self.root.after(2000, lambda: self.recently_skipped.discard(skip_id))
+            # Force a plan fetch and stop checks started for a previous selection
+            self.skip_plan_buffer = None
+            self.skip_monitor_generation += 1
+            generation = self.skip_monitor_generation
 
-                                # Update UI
-                                label = ts.get('label', 'unnamed section')
-                                self.update_status(f"Auto-skipped {label}")
+            def check_and_skip():
+                """Check current playback position and skip if in a timestamp range."""
+                if generation != self.skip_monitor_generation:
+                    return
 
-                                # Update our internal position tracking
-                                self.last_view_offset = seek_position
-                                self.last_update_time = time.time()
+                try:
+                    buffer_value = self.applied_buffer
 
-                            except Exception as seek_error:
-                                print(f"Error during seek: {seek_error}")
+                    # The backend applies the buffer, refetch the plan when it changes
+                    if buffer_value != self.skip_plan_buffer and not self.metadata_pending:
+                        self.fetch_skip_plan(session_data, buffer_value)
+                        self.skip_plan_buffer = buffer_value
+
+                    for label in self.engine.tick():
+                        self.update_status(f"Auto-skipped {label or 'unnamed section'}")
 
                     # Schedule next check
                     self.root.after(250, check_and_skip)
 
                 except Exception as e:
-                    print(f"Check and skip error: {str(e)}")
+                    logger.exception("Check and skip error")
                     self.root.after(1000, check_and_skip)
 
             # Start the monitoring
-            print("Starting skip monitoring")
+            logger.info("Starting skip monitoring")
             check_and_skip()
 
         except Exception as e:
             error_msg = f"Failed to setup auto-skip monitoring: {str(e)}"
-            print(error_msg)
+            logger.error(error_msg)
             self.update_error(error_msg)
 
     def alert_callback(self, data):
-        """Handle alerts for the selected session."""
+        """Queue alerts for the selected client; runs on the AlertListener thread, so Tk is not touched."""
+        received_at = time.time()
+        self.library.handle_alert(data)
         for notification in data.get('PlaySessionStateNotification', []):
-            # Check if this is our target client
-            if notification.get('clientIdentifier') == CLIENT_ID:  # Your client ID
-                state = notification.get('state')
-                view_offset = notification.get('viewOffset', 0)
-                metadata_key = notification.get('key')
+            if notification.get('clientIdentifier') == CLIENT_ID:
+                self.alerts.put(CLIENT_ID, (notification, received_at))
+
+    def apply_notification(self, notification, received_at):
+        """Apply the latest notification of the selected client on the Tk thread."""
+        state = notification.get('state')
+        view_offset = notification.get('viewOffset', 0)
+        metadata_key = notification.get('key')
+
+        self.engine.update_position(view_offset, state, received_at)
+        debug_sampled("alert", "Alert", state=state, view_offset_ms=view_offset)
+
+        # Metadata only changes with the item being played, and is usually indexed already
+        if metadata_key != self.current_metadata_key:
+            self.current_metadata_key = metadata_key
+            # The previous item's ranges must not seek this one; its plan is fetched once the metadata is in
+            self.engine.plan = []
+            self.engine.cooldowns.clear()
+            self.skip_plan_buffer = None
+            self.plan_fetches += 1
+            self.metadata_pending = True
+            entry = self.library.get(metadata_key)
+            if entry is not None:
+                self.metadata_fetched(entry)
+            else:
+                self.run_in_background(
+                    "server", lambda key=metadata_key: self.library.resolve(key), self.metadata_fetched,
+                    lambda e, key=metadata_key: self.metadata_failed(key, e)
+                )
+
+    def metadata_failed(self, metadata_key, error):
+        """Fall back to the selected session's own metadata when the played item could not be resolved.
+
+        Should that fail too, the next notification resolves the item again,
+        so auto-skip does not stay off for the rest of it.
+        """
+        if metadata_key != self.current_metadata_key:
+            return
+        self.update_error(f"Error fetching metadata: {error}")
+        session_key = self.selected_session_key
+
+        def find_session():
+            for session in self.plex.sessions():
+                if str(session.sessionKey) == session_key:
+                    return session
+            return None
 
-                # Always update the view offset and time when we get a notification
-                self.last_view_offset = view_offset
-                self.last_update_time = time.time()
-                self.playback_state = state
+        def found(session):
+            if session is not None and session.key == metadata_key:
+                self.metadata_fetched(session)
+            else:
+                failed(LookupError(f"{metadata_key} is no longer playing"))
 
-                print(f"Alert: State={state}, ViewOffset={view_offset}ms")
+        def failed(fallback_error):
+            logger.warning("Could not resolve %s from the session either: %s", metadata_key, fallback_error)
+            if metadata_key == self.current_metadata_key:
+                self.current_metadata_key = None
 
-                # Update metadata if needed
-                try:
-                    item = self.plex.fetchItem(metadata_key)
-                    self.current_duration = getattr(item, 'duration', 0)
-                    self.update_media_info(item)
-                except Exception as e:
-                    self.update_error(f"Error fetching metadata: {e}")
+        self.run_in_background("server", find_session, found, failed)
+
+    def metadata_fetched(self, item):
+        if item.key != self.current_metadata_key:
+            return  # Resolved after the player moved on to another item
+        self.metadata_pending = False
+        self.current_duration = getattr(item, 'duration', 0)
+        self.update_media_info(item)
+        self.start_timestamp = None
+        self.update_timestamp_buttons()
+        self.prefetch_upcoming(item)
+
+        # The next check loads the item's plan from plan_cache, where prefetching usually put it already
+        session_data = self.sessions[self.selected_session_key]
+        response = self.fetch_existing_timestamps(session_data)
+        if not self.skip_monitor_generation and response and 'timestamps' in response:
+            self.monitor_and_skip_timestamps(session_data)
 
     def update_progress(self):
         """Update the progress bar and time labels."""
         try:
-            if self.playback_state == 'playing':
-                elapsed_time = time.time() - self.last_update_time
-                current_offset = self.last_view_offset + int(elapsed_time * 1000)
-            else:
-                current_offset = self.last_view_offset
+            current_offset = self.engine.current_position_ms()
 
             if self.current_duration > 0:
                 progress = (current_offset / self.current_duration) * 100
@@ -592,7 +842,7 @@ class PlexViewer:
                 self.remaining_var.set(f"Remaining: {format_time(time_remaining)}")
 
         except Exception as e:
-            print(f"Error updating progress: {e}")
+            logger.warning("Error updating progress: %s", e)
 
         # Schedule next update
         self.root.after(1000, self.update_progress)
@@ -658,34 +908,53 @@ class PlexViewer:
         ttk.Label(controls_frame, textvariable=self.timestamp_status_var,
                   font=('Arial', 10)).pack(side=tk.LEFT, padx=5)
 
-        # Timestamp list
+        # Timestamp list, a Treeview only draws the rows in view
+        self.timestamps_empty_var = StringVar(self.root, value="No timestamps saved yet")
+        ttk.Label(timestamp_frame, textvariable=self.timestamps_empty_var,
+                  font=('Arial', 10, 'italic'), foreground='gray').pack(fill=tk.X, padx=5)
+
         list_frame = ttk.Frame(timestamp_frame)
         list_frame.pack(fill=tk.BOTH, expand=True)
 
-        # Create scrollable frame for timestamps
-        canvas = tk.Canvas(list_frame)
-        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = ttk.Frame(canvas)
+        columns = ("start", "end", "label", "categories")
+        self.timestamp_tree = ttk.Treeview(list_frame, columns=columns, show="headings", selectmode="browse")
+        for column, heading, width in zip(columns, ("Start", "End", "Label", "Categories"), (80, 80, 180, 160)):
+            self.timestamp_tree.heading(column, text=heading)
+            self.timestamp_tree.column(column, width=width, stretch=column in ("label", "categories"))
+        scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.timestamp_tree.yview)
+        self.timestamp_tree.configure(yscrollcommand=scrollbar.set)
 
-        self.scrollable_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
-        )
+        self.timestamp_tree.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
 
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        self.timestamp_tree.bind("<Double-1>", lambda e: self.edit_selected_timestamp())
+        self.timestamp_tree.bind("<Delete>", lambda e: self.delete_selected_timestamp())
 
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        row_buttons = ttk.Frame(timestamp_frame)
+        row_buttons.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(row_buttons, text="Delete", command=self.delete_selected_timestamp,
+                   style='Small.TButton').pack(side=tk.RIGHT, padx=2)
+        ttk.Button(row_buttons, text="Edit", command=self.edit_selected_timestamp,
+                   style='Small.TButton').pack(side=tk.RIGHT, padx=2)
 
+    def selected_timestamp_index(self):
+        """Index of the selected range in the stored list, or None."""
+        selection = self.timestamp_tree.selection()
+        return self.timestamp_tree.index(selection[0]) if selection else None
+
+    def edit_selected_timestamp(self):
+        index = self.selected_timestamp_index()
+        if index is not None:
+            self.edit_timestamp(index, self.displayed_timestamps[index])
+
+    def delete_selected_timestamp(self):
+        index = self.selected_timestamp_index()
+        if index is not None:
+            self.delete_timestamp(index)
 
     def mark_start_timestamp(self):
         """Mark the current position as start timestamp."""
-        if self.playback_state == 'playing':
-            elapsed_time = time.time() - self.last_update_time
-            current_offset = self.last_view_offset + int(elapsed_time * 1000)
-        else:
-            current_offset = self.last_view_offset
+        current_offset = self.engine.current_position_ms()
 
         self.start_timestamp = current_offset
         self.update_timestamp_buttons()
@@ -704,8 +973,8 @@ class PlexViewer:
 
 
     def error_callback(self, error):
-        """Handle alert listener errors."""
-        self.update_error(f"Connection Error: {error}")
+        """Handle alert listener errors; runs on the AlertListener thread."""
+        self.ui_calls.put((self.update_error, f"Connection Error: {error}"))
 
     def update_media_info(self, item):
         """Update the media information display."""
@@ -722,7 +991,8 @@ class PlexViewer:
                 'show_name': show_name,
                 'season': season,
                 'episode': episode,
-                'title': title
+                'title': title,
+                **media_identifiers(item)
             }
 
             self.title_var.set(f"{show_name}")
@@ -733,7 +1003,8 @@ class PlexViewer:
             year = getattr(item, 'year', '')
 
             self.current_media_info = {
-                'title': title
+                'title': title,
+                **media_identifiers(item)
             }
 
             self.title_var.set(f"{title}")
@@ -747,33 +1018,66 @@ class PlexViewer:
             'playing': '▶️ Playing',
             'paused': '⏸️ Paused',
             'stopped': '⏹️ Stopped'
-        }.get(self.playback_state, self.playback_state.capitalize())
+        }.get(self.engine.playback_state, self.engine.playback_state.capitalize())
 
         self.status_var.set(state_text)
 
 
 
+    def stored_movie_title(self):
+        """Title of the backend entry for the current movie, which may differ slightly from Plex's."""
+        title = self.current_media_info['title']
+        return self.stored_titles.get(title, title)
+
+    def build_media_request(self, session_data):
+        """Build the request body identifying the current media to the backend.
+
+        The ratingKey and GUIDs let the backend resolve the media with an
+        integer lookup; the names are the fallback for unlinked entries.
+        """
+        identifiers = {
+            "rating_key": self.current_media_info.get('rating_key'),
+            "guids": self.current_media_info.get('guids', [])
+        }
+        if self.current_media_type == 'episode':
+            return {
+                "show_name": self.current_media_info['show_name'],
+                "season": str(self.current_media_info['season']),
+                "episode_number": str(self.current_media_info['episode']),
+                "title": self.current_media_info['title'],
+                **identifiers
+            }
+        return {
+            "title": self.current_media_info.get('title', session_data['title']),
+            **identifiers
+        }
+
     def fetch_existing_timestamps(self, session_data):
         """Fetch existing timestamps for the current media from backend."""
+        import requests
+
         try:
             # Determine media type and create request data
-            if hasattr(self, 'current_media_type') and self.current_media_type == 'episode':
+            if self.current_media_type == 'episode':
                 endpoint = f"{BACKEND_URL}/tv-shows/get-timestamps/"
-                data = {
-                    "show_name": self.current_media_info['show_name'],
-                    "season": str(self.current_media_info['season']),
-                    "episode_number": str(self.current_media_info['episode']),
-                    "title": self.current_media_info['title']
-                }
             else:
                 endpoint = f"{BACKEND_URL}/movies/get-timestamps/"
-                data = {
-                    "title": session_data['title']
-                }
+            data = self.build_media_request(session_data)
 
-            response = requests.post(endpoint, json=data)
+            response = requests.post(endpoint, json=data, headers={"Accept": wire_format.ACCEPT_COMPACT},
+                                     timeout=PLEX_IO_TIMEOUT)
             response.raise_for_status()
-            timestamps_data = response.json()
+            timestamps_data = wire_format.decode(response.content, response.headers.get('Content-Type'))
+
+            # A fuzzy match may be another film, such as a sequel, so it is neither shown nor edited as this one
+            if timestamps_data.get('match') == 'fuzzy':
+                self.update_status(f"No ranges stored yet, the closest title is '{timestamps_data.get('title')}'")
+                self.display_timestamps([])
+                return None
+
+            # The backend may have resolved another spelling of the title, write back to that entry
+            if self.current_media_type == 'movie' and timestamps_data.get('title'):
+                self.stored_titles[self.current_media_info['title']] = timestamps_data['title']
 
             # Update display
             self.display_timestamps(timestamps_data.get('timestamps', []))
@@ -787,56 +1091,25 @@ class PlexViewer:
             return None
 
     def display_timestamps(self, timestamps):
-        """Display existing timestamps in the scrollable frame with edit/delete controls."""
-        print("Displaying timestamps:", timestamps)  # Debug print
-
-        # Clear existing timestamps
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        if not timestamps:
-            ttk.Label(
-                self.scrollable_frame,
-                text="No timestamps saved yet",
-                font=('Arial', 10, 'italic'),
-                foreground='gray'
-            ).pack(fill=tk.X, padx=5, pady=10)
-            return
-
-        # Add each timestamp range
-        for i, ts in enumerate(timestamps):
-            frame = ttk.Frame(self.scrollable_frame)
-            frame.pack(fill=tk.X, padx=5, pady=2)
-
-            # Format times for display
-            start_time = format_time(int(ts['start_time'] * 1000))
-            end_time = format_time(int(ts['end_time'] * 1000))
-
-            # Create label with timestamp info
-            label_text = f"Range {i + 1}: {start_time} - {end_time}"
-            if ts.get('label'):
-                label_text += f" ({ts['label']})"
-
-            ttk.Label(frame, text=label_text, font=('Arial', 10)).pack(side=tk.LEFT)
-
-            # Create button frame for edit/delete buttons
-            button_frame = ttk.Frame(frame)
-            button_frame.pack(side=tk.RIGHT)
-
-            # Add edit and delete buttons
-            ttk.Button(
-                button_frame,
-                text="Edit",
-                command=lambda idx=i, data=ts: self.edit_timestamp(idx, data),
-                style='Small.TButton'
-            ).pack(side=tk.RIGHT, padx=2)
-
-            ttk.Button(
-                button_frame,
-                text="Delete",
-                command=lambda idx=i: self.delete_timestamp(idx),
-                style='Small.TButton'
-            ).pack(side=tk.RIGHT, padx=2)
+        """Show the stored ranges, changing only the rows that differ from what is shown."""
+        timestamps = timestamps or []
+        logger.debug("Displaying %d timestamps", len(timestamps))
+
+        keys = [timestamp_key(ts) for ts in timestamps]
+        rows = self.timestamp_tree.get_children()
+        matcher = difflib.SequenceMatcher(None, self.displayed_keys, keys, autojunk=False)
+        # Apply from the end so earlier row positions stay valid
+        for tag, old_start, old_end, new_start, new_end in reversed(matcher.get_opcodes()):
+            if tag == 'equal':
+                continue
+            if old_end > old_start:
+                self.timestamp_tree.delete(*rows[old_start:old_end])
+            for offset, ts in enumerate(timestamps[new_start:new_end]):
+                self.timestamp_tree.insert('', old_start + offset, values=timestamp_row(ts))
+
+        self.displayed_timestamps = list(timestamps)
+        self.displayed_keys = keys
+        self.timestamps_empty_var.set("" if timestamps else "No timestamps saved yet")
 
     def update_error(self, message):
         """Update the error message display."""
@@ -846,6 +1119,8 @@ class PlexViewer:
 
     def start_alert_listener(self):
         """Start listening to alerts for the selected session."""
+        from plexapi.alert import AlertListener
+
         if self.alert_listener:
             self.alert_listener.stop()
         self.alert_listener = AlertListener(
@@ -873,6 +1148,8 @@ class PlexViewer:
 
         # Create and configure variables
         self.buffer_seconds = StringVar(self.root, value="2")  # Initialize buffer_seconds here
+        self.applied_buffer = self.current_buffer()
+        self.buffer_seconds.trace_add('write', self.buffer_edited)
         self.title_var = StringVar(self.root)
         self.subtitle_var = StringVar(self.root)
         self.status_var = StringVar(self.root)
@@ -913,23 +1190,18 @@ class PlexViewer:
         )
         self.error_label.pack(fill=tk.X)
 
-        # Start updating UI
+        # Start updating UI, Plex is reached in the background
+        self.process_ui_calls()
+        self.connect_plex()
+        self.clients.start_health_checks()
         self.update_ui()
         self.root.mainloop()
         self.stop_alert_listener()
+        self.clients.stop()
+
     def update_ui(self):
         """Update the UI periodically."""
-        self.fetch_active_sessions()
-
-        # Update the dropdown menu
-        menu = self.session_menu["menu"]
-        menu.delete(0, "end")
-        for session_key, session_data in self.sessions.items():
-            menu.add_command(
-                label=f"{session_data['title']} ({session_data['player']})",
-                command=lambda key=session_key: self.select_session(key)
-            )
-
+        self.refresh_sessions()
         self.update_progress()
         self.root.after(1000, self.update_ui)
 
@@ -938,41 +1210,58 @@ class PlexViewer:
         self.selected_session_key = session_key
         session_data = self.sessions[session_key]
 
-        print("Verifying client connection...")
-        is_connected = self.verify_client_connection()
-        print(f"Client connected: {is_connected}")
-
         self.session_var.set(session_data['title'])
 
         # Initialize playback state
-        self.playback_state = session_data['state']
-        self.last_view_offset = session_data['viewOffset']
+        self.engine.update_position(session_data['viewOffset'], session_data['state'])
         self.current_duration = session_data['duration']
-        self.last_update_time = time.time()
 
-        try:
-            sessions = self.plex.sessions()
-            for session in sessions:
+        def find_session():
+            is_connected = self.verify_client_connection()
+            logger.info("Client connection verified", extra={"connected": is_connected})
+            for session in self.plex.sessions():
                 if str(session.sessionKey) == session_key:
-                    self.current_media_type = session.type
-                    self.update_media_info(session)
-                    self.start_timestamp = None
-                    self.update_timestamp_buttons()
-                    self.start_alert_listener()
-
-                    # Fetch timestamps and setup auto-skip if available
-                    try:
-                        response = self.fetch_existing_timestamps(session_data)
-                        if response and 'timestamps' in response:
-                            self.monitor_and_skip_timestamps(session_data, response['timestamps'])
-                    except Exception as e:
-                        self.update_error(f"Error setting up auto-skip: {str(e)}")
-                    break
+                    return session
+            return None
+
+        def failed(error):
+            self.connection_var.set("")
+            self.update_error(f"Error fetching media info: {str(error)}")
+            logger.error("Error selecting session: %s", error)
+
+        self.connection_var.set("Verifying client...")
+        self.run_in_background(
+            CLIENT_ID,
+            find_session,
+            lambda session: self.session_selected(session_key, session_data, session),
+            failed
+        )
 
+    def session_selected(self, session_key, session_data, session):
+        """Show the selected session and set up auto-skip, once it was found in the background."""
+        self.connection_var.set("")
+        if session is None or session_key != self.selected_session_key:
+            return
+
+        self.current_media_type = session.type
+        self.update_media_info(session)
+        self.start_timestamp = None
+        self.update_timestamp_buttons()
+        self.current_metadata_key = session.key
+        self.alerts.drain()  # Notifications of the previous session
+        self.start_alert_listener()
+        self.prefetch_upcoming(session)
+
+        # Fetch timestamps and setup auto-skip if available
+        try:
+            response = self.fetch_existing_timestamps(session_data)
+            if response and 'timestamps' in response:
+                self.monitor_and_skip_timestamps(session_data)
         except Exception as e:
-            self.update_error(f"Error fetching media info: {str(e)}")
-            print(f"Debug - Error details: {e}")
+            self.update_error(f"Error setting up auto-skip: {str(e)}")
+
 
 if __name__ == "__main__":
+    setup_logging()
     viewer = PlexViewer()
     viewer.run()
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Background jobs for maintenance work the backend should not do inside a request.
+
+A JobRunner runs registered job functions on a small thread pool whose
+threads are niced, so they only get the CPU when request threads leave it
+idle. Job state lives in a JobStore, the backend keeps it in the database
+so every worker process sees it and it survives restarts.
+
+A job function takes a JobContext and the job's parameters and returns a
+JSON-serializable result. It calls context.checkpoint() between units of
+work, which records progress, raises JobCancelled once a cancel was
+requested and pauses briefly so request threads get the GIL and the
+database write lock in between.
+"""
+import inspect
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("plex_skip.jobs")
+
+# Threads running jobs in each worker process
+JOB_WORKERS = int(os.getenv("PLEX_SKIP_JOB_WORKERS", "1"))
+# Jobs waiting for a thread beyond which new ones are refused
+JOB_QUEUE_LIMIT = int(os.getenv("PLEX_SKIP_JOB_QUEUE_LIMIT", "16"))
+# Niceness added to job threads
+JOB_NICENESS = 10
+# Seconds a job pauses at each checkpoint
+JOB_YIELD_SECONDS = 0.002
+# Seconds between writes of a job's progress and checks for a cancel requested by another worker
+JOB_SYNC_INTERVAL = 1.0
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobStore(ABC):
+    """Where job state is kept; the runner calls these from its threads."""
+
+    @abstractmethod
+    def create(self, kind: str, params: dict) -> int:
+        """Record a queued job; returns its id."""
+
+    @abstractmethod
+    def update(self, job_id: int, **fields):
+        pass
+
+    @abstractmethod
+    def cancel_requested(self, job_id: int) -> bool:
+        pass
+
+
+def lower_priority():
+    """Nice the calling thread; Linux applies niceness per thread."""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), JOB_NICENESS)
+    except (AttributeError, OSError) as e:
+        logger.debug("Job threads keep the normal priority: %s", e)
+
+
+class JobContext:
+    """What a running job sees of the runner."""
+
+    def __init__(self, runner, job_id: int, clock=time.monotonic):
+        self.runner = runner
+        self.job_id = job_id
+        self.clock = clock
+        self.done = 0
+        self.total = None
+        self.cancelled = threading.Event()
+        self._synced_at = clock()
+
+    def checkpoint(self, done=None, total=None):
+        """Record progress, raise JobCancelled when asked to stop and yield to request threads."""
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        now = self.clock()
+        if now - self._synced_at >= JOB_SYNC_INTERVAL:
+            self._synced_at = now
+            self.runner.store.update(self.job_id, done=self.done, total=self.total)
+            if self.runner.store.cancel_requested(self.job_id):
+                self.cancelled.set()
+        if self.cancelled.is_set():
+            raise JobCancelled()
+        time.sleep(JOB_YIELD_SECONDS)
+
+
+class JobRunner:
+    """Runs maintenance jobs on a bounded pool of low-priority threads."""
+
+    def __init__(self, store: JobStore, max_workers=JOB_WORKERS, queue_limit=JOB_QUEUE_LIMIT, registry=None):
+        self.store = store
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self._kinds = {}  # kind -> job function
+        self._contexts = {}  # job id -> JobContext of queued and running jobs
+        self._lock = threading.Lock()
+        self._executor = None
+        self._finished = None
+        if registry is not None:
+            self._finished = registry.counter(
+                "plex_skip_jobs_total", "Background jobs that ended, by kind and outcome", ("kind", "status"))
+            registry.gauge("plex_skip_jobs_active", "Background jobs queued or running in this worker", self.__len__)
+
+    def __len__(self):
+        return len(self._contexts)
+
+    @property
+    def kinds(self):
+        return sorted(self._kinds)
+
+    def register(self, kind: str, func):
+        self._kinds[kind] = func
+        return func
+
+    def start(self):
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="job", initializer=lower_priority)
+
+    def submit(self, kind: str, params=None) -> int:
+        """Queue a job; returns its id.
+
+        Raises KeyError for unknown kinds, TypeError for parameters the job
+        does not take and JobQueueFull.
+        """
+        func = self._kinds[kind]
+        params = params or {}
+        inspect.signature(func).bind(None, **params)
+        with self._lock:
+            if len(self._contexts) >= self.max_workers + self.queue_limit:
+                raise JobQueueFull(f"{len(self._contexts)} jobs are already waiting")
+            job_id = self.store.create(kind, params)
+            context = self._contexts[job_id] = JobContext(self, job_id)
+        self._executor.submit(self._run, kind, func, context, params)
+        return job_id
+
+    def cancel(self, job_id: int):
+        """Ask a job to stop at its next checkpoint; jobs of other workers notice through the store."""
+        self.store.update(job_id, cancel_requested=True)
+        context = self._contexts.get(job_id)
+        if context is not None:
+            context.cancelled.set()
+
+    def _run(self, kind, func, context: JobContext, params):
+        started = time.time()
+        try:
+            if context.cancelled.is_set() or self.store.cancel_requested(context.job_id):
+                raise JobCancelled()
+            self.store.update(context.job_id, status=RUNNING, started_at=started)
+            result = func(context, **params)
+        except JobCancelled:
+            status, fields = CANCELLED, {}
+        except Exception as e:
+            logger.exception("Job failed", extra={"job": context.job_id, "kind": kind})
+            status, fields = FAILED, {"error": str(e)}
+        else:
+            status, fields = SUCCEEDED, {"result": result}
+            if context.total is not None:
+                context.done = context.total
+        finally:
+            with self._lock:
+                self._contexts.pop(context.job_id, None)
+        self.store.update(context.job_id, status=status, done=context.done, total=context.total,
+                          finished_at=time.time(), **fields)
+        if self._finished is not None:
+            self._finished.inc(kind, status)
+        logger.info("Job finished", extra={
+            "job": context.job_id, "kind": kind, "status": status, "seconds": round(time.time() - started, 3)
+        })
+
+    def shutdown(self):
+        """Cancel queued and running jobs and wait for their threads."""
+        with self._lock:
+            contexts = list(self._contexts.values())
+        for context in contexts:
+            context.cancelled.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=False)
@@ -0,0 +1,209 @@
+import bisect
+import logging
+import os
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+logger = logging.getLogger("plex_skip.library")
+
+# PlexIO lane items are looked up again on
+LIBRARY_LANE = "library"
+# PlexIO lane the index is built on, so lookups never queue behind a build
+BUILD_LANE = "library-build"
+# Seconds a build may take; a large library takes far longer than a single Plex call
+LIBRARY_BUILD_TIMEOUT = float(os.getenv("PLEX_SKIP_LIBRARY_BUILD_TIMEOUT", "600"))
+# Timeline alert item types and states the index follows
+TIMELINE_TYPES = {1: 'movie', 4: 'episode'}
+TIMELINE_FINISHED = 5
+TIMELINE_DELETED = 9
+
+
+class LibraryEntry(NamedTuple):
+    """Identity of a movie or episode, under the attribute names of plexapi's objects.
+
+    Code reading those attributes from a plexapi item takes an entry as is.
+    """
+    ratingKey: int
+    type: str
+    title: str
+    duration: int
+    guid: Optional[str]
+    guids: Tuple[str, ...]
+    grandparentTitle: Optional[str] = None
+    parentIndex: Optional[int] = None
+    index: Optional[int] = None
+    year: Optional[int] = None
+
+    @property
+    def key(self):
+        return f"/library/metadata/{self.ratingKey}"
+
+
+def rating_key_of(key):
+    """ratingKey of a metadata key such as "/library/metadata/123", or of the ratingKey itself."""
+    return int(str(key).rsplit('/', 1)[-1])
+
+
+def library_entry(item):
+    episode = item.type == 'episode'
+    return LibraryEntry(
+        ratingKey=int(item.ratingKey),
+        type=item.type,
+        title=item.title,
+        duration=getattr(item, 'duration', None) or 0,
+        guid=getattr(item, 'guid', None),
+        guids=tuple(guid.id for guid in getattr(item, 'guids', None) or []),
+        grandparentTitle=item.grandparentTitle if episode else None,
+        parentIndex=item.parentIndex if episode else None,
+        index=item.index if episode else None,
+        year=None if episode else getattr(item, 'year', None)
+    )
+
+
+class LibraryIndex:
+    """Every movie and episode of the Plex library by ratingKey, built once.
+
+    build() reads the library section by section. Timeline alerts then keep
+    it current: finished items are looked up again and deleted ones are
+    dropped. A playing item resolves to its identity without a Plex call,
+    only items missing from the index are fetched. With io set, lookups
+    caused by alerts run on its library lane and start_build() builds on a
+    lane of its own; items alerted during a build are looked up again after.
+    """
+
+    def __init__(self, plex, io=None):
+        self.plex = plex
+        self.io = io
+        self._entries = {}  # ratingKey -> LibraryEntry
+        self._seasons = {}  # (show title, season) -> sorted (episode index, ratingKey) pairs
+        self._changed = None  # ratingKeys alerted while a build runs, looked up again once it is in
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def start_build(self, on_done=None, on_error=None):
+        """Build on io's build lane, under a deadline that fits a whole library."""
+        self.io.submit(BUILD_LANE, self.build, on_done=on_done, on_error=on_error, timeout=LIBRARY_BUILD_TIMEOUT)
+
+    def build(self):
+        """Index the whole library, replacing what was indexed before; blocks on Plex."""
+        with self._lock:
+            self._changed = set()
+        entries = {}
+        try:
+            for section in self.plex.library.sections():
+                if section.type == 'movie':
+                    items = section.all()
+                elif section.type == 'show':
+                    items = section.searchEpisodes()
+                else:
+                    continue
+                for item in items:
+                    entry = library_entry(item)
+                    entries[entry.ratingKey] = entry
+        except BaseException:
+            with self._lock:
+                self._changed = None
+            raise
+
+        seasons = {}
+        for entry in entries.values():
+            if entry.type == 'episode':
+                seasons.setdefault((entry.grandparentTitle, entry.parentIndex), []).append(
+                    (entry.index or 0, entry.ratingKey))
+        for episodes in seasons.values():
+            episodes.sort()
+        with self._lock:
+            self._entries, self._seasons = entries, seasons
+            changed, self._changed = self._changed, None
+        count = len(entries)
+        logger.info("Indexed Plex library", extra={"items": count})
+        # Sections read before an alert hold the item as it was, and alerts applied meanwhile were replaced
+        for rating_key in changed:
+            self.refresh_later(rating_key)
+        return count
+
+    def get(self, key):
+        """Entry of a ratingKey or metadata key, None when it is not indexed."""
+        try:
+            return self._entries.get(rating_key_of(key))
+        except ValueError:
+            return None
+
+    def resolve(self, key):
+        """Entry of a ratingKey or metadata key, fetched from Plex only when it is not indexed."""
+        entry = self.get(key)
+        if entry is None:
+            entry = self.add(self.plex.fetchItem(rating_key_of(key)))
+        return entry
+
+    def add(self, item):
+        entry = library_entry(item)
+        with self._lock:
+            self._discard(entry.ratingKey)
+            self._entries[entry.ratingKey] = entry
+            if entry.type == 'episode':
+                bisect.insort(self._seasons.setdefault((entry.grandparentTitle, entry.parentIndex), []),
+                              (entry.index or 0, entry.ratingKey))
+        return entry
+
+    def discard(self, rating_key):
+        with self._lock:
+            self._discard(rating_key)
+
+    def _discard(self, rating_key):
+        """Drop an entry; the caller holds the lock."""
+        entry = self._entries.pop(rating_key, None)
+        if entry is not None and entry.type == 'episode':
+            season = self._seasons.get((entry.grandparentTitle, entry.parentIndex))
+            if season and (entry.index or 0, rating_key) in season:
+                season.remove((entry.index or 0, rating_key))
+
+    def following(self, entry, limit):
+        """Indexed episodes after entry: the rest of its season, then the next season's first episode."""
+        if entry.type != 'episode':
+            return []
+        with self._lock:
+            season = self._seasons.get((entry.grandparentTitle, entry.parentIndex), [])
+            later = [rating_key for index, rating_key in season if index > (entry.index or 0)]
+            if not later:
+                later = [rating_key for _, rating_key in self._seasons.get(
+                    (entry.grandparentTitle, (entry.parentIndex or 0) + 1), [])[:1]]
+            return [self._entries[rating_key] for rating_key in later[:limit]]
+
+    def refresh(self, rating_key):
+        """Look an item up again after Plex changed it; blocks on Plex."""
+        from plexapi.exceptions import NotFound
+
+        try:
+            self.add(self.plex.fetchItem(rating_key))
+        except NotFound:
+            self.discard(rating_key)
+
+    def handle_alert(self, data):
+        """Apply a Plex alert's library timeline entries; safe to call from the alert thread."""
+        for timeline in data.get('TimelineEntry', []):
+            if timeline.get('type') not in TIMELINE_TYPES or not timeline.get('itemID'):
+                continue
+            rating_key = int(timeline['itemID'])
+            state = timeline.get('state')
+            if state not in (TIMELINE_DELETED, TIMELINE_FINISHED):
+                continue
+            with self._lock:
+                if self._changed is not None:
+                    self._changed.add(rating_key)
+            if state == TIMELINE_DELETED:
+                self.discard(rating_key)
+            else:
+                self.refresh_later(rating_key)
+
+    def refresh_later(self, rating_key):
+        """Look an item up again on io's library lane, right away without io."""
+        if self.io is None:
+            try:
+                self.refresh(rating_key)
+            except Exception as e:
+                logger.warning("Could not refresh library item %s: %s", rating_key, e)
+        else:
+            self.io.submit(LIBRARY_LANE, self.refresh, rating_key)
@@ -0,0 +1,78 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+LOG_LEVEL = os.getenv("PLEX_SKIP_LOG_LEVEL", "INFO").upper()
+
+# Attributes every LogRecord has; anything else was passed through extra=
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class KeyValueFormatter(logging.Formatter):
+    """Format records as one line: time, level, logger, message, then extra fields as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = [
+            f"{key}={value!r}" if isinstance(value, str) and " " in value else f"{key}={value}"
+            for key, value in vars(record).items()
+            if key not in STANDARD_ATTRIBUTES and not key.startswith("_")
+        ]
+        return f"{line} {' '.join(fields)}" if fields else line
+
+
+def setup_logging(level: str = LOG_LEVEL):
+    """Route all records through a queue so callers never wait on stderr.
+
+    Handlers run on a QueueListener thread. Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        root = logging.getLogger()
+        root.setLevel(level)
+        if _listener is not None:
+            return
+
+        log_queue = queue.SimpleQueue()
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(KeyValueFormatter())
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        atexit.register(_listener.stop)
+
+
+class DebugSampler:
+    """Rate-limited debug logging for hot paths.
+
+    Costs one isEnabledFor check when debug is off. When it is on, each key
+    logs at most once per interval, and the next record reports how many were
+    suppressed in between.
+    """
+
+    def __init__(self, logger: logging.Logger, interval: float = 5.0):
+        self.logger = logger
+        self.interval = interval
+        self._last = {}
+        self._suppressed = {}
+
+    def __call__(self, key, msg, *args, **fields):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        now = time.monotonic()
+        if now - self._last.get(key, float("-inf")) < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            return
+        self._last[key] = now
+        fields["suppressed"] = self._suppressed.pop(key, 0)
+        self.logger.debug(msg, *args, extra=fields)
@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from singleflight import SingleFlight
+
+logger = logging.getLogger("plex_skip.plan_cache")
+
+# Skip plans kept locally, least recently used ones are evicted first
+PLAN_CACHE_SIZE = 500
+# Seconds a cached plan is used before it is fetched again, so edits made elsewhere show up
+PLAN_CACHE_TTL = 300.0
+# Items looked ahead at when prefetching
+PREFETCH_LIMIT = 25
+# Milliseconds the backend rounds buffers to, buffers within a step get the same plan
+BUFFER_STEP_MS = 100
+
+
+def media_key(data):
+    """Key of the media a backend request body identifies, the ratingKey when Plex gave one."""
+    if data.get('rating_key'):
+        return data['rating_key']
+    return data.get('title'), data.get('show_name'), data.get('season'), data.get('episode_number')
+
+
+class SkipPlanCache:
+    """Skip plans already fetched or prefetched, by media, profile and buffer.
+
+    Plans are taken as-is from the backend; "no entry" is cached as an
+    empty plan, so titles without ranges are not asked for again either.
+    Concurrent misses for the same plan, such as several players starting
+    one episode, share a single fetch.
+    """
+
+    def __init__(self, size=PLAN_CACHE_SIZE, ttl=PLAN_CACHE_TTL, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._plans = OrderedDict()  # (media key, profile, buffer ms) -> (plan, stored at)
+        self._lock = threading.Lock()
+        self._flights = SingleFlight()
+
+    @staticmethod
+    def key(data, buffer_seconds, profile=None):
+        return media_key(data), profile, int(round(buffer_seconds * 1000 / BUFFER_STEP_MS)) * BUFFER_STEP_MS
+
+    def get(self, data, buffer_seconds, profile=None):
+        """The cached plan for a request body, or None when it has to be fetched."""
+        key = self.key(data, buffer_seconds, profile)
+        with self._lock:
+            entry = self._plans.get(key)
+            if entry is None:
+                return None
+            if self.clock() - entry[1] > self.ttl:
+                del self._plans[key]
+                return None
+            self._plans.move_to_end(key)
+            return entry[0]
+
+    def put(self, data, buffer_seconds, plan, profile=None):
+        key = self.key(data, buffer_seconds, profile)
+        with self._lock:
+            self._plans[key] = (plan, self.clock())
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.size:
+                self._plans.popitem(last=False)
+
+    def fetch(self, data, buffer_seconds, fetch, profile=None):
+        """The cached plan for a request body, or the plan fetch() returns, which is then cached."""
+        plan = self.get(data, buffer_seconds, profile)
+        if plan is not None:
+            return plan
+
+        def load():
+            fetched = fetch()
+            self.put(data, buffer_seconds, fetched, profile)
+            return fetched
+
+        return self._flights.do(self.key(data, buffer_seconds, profile), load)
+
+    def discard(self, data):
+        """Forget every plan of a media item, after its ranges were edited."""
+        key = media_key(data)
+        with self._lock:
+            for cached in [cached for cached in self._plans if cached[0] == key]:
+                del self._plans[cached]
+
+
+def upcoming_items(plex, item, limit=PREFETCH_LIMIT, library=None):
+    """Media likely to play after item: the rest of its season, the next season's start and On Deck.
+
+    Episodes are taken from library, a LibraryIndex, when it knows item.
+    Lookups that fail are left out, prefetching is best effort.
+    """
+    candidates = []
+    entry = library.get(item.ratingKey) if library is not None else None
+    if entry is not None:
+        candidates.extend(library.following(entry, limit))
+    elif getattr(item, 'type', None) == 'episode':
+        try:
+            later = [episode for episode in item.season().episodes() if (episode.index or 0) > (item.index or 0)]
+            candidates.extend(sorted(later, key=lambda episode: episode.index))
+            if not later:
+                next_season = [season for season in item.show().seasons() if season.index == item.parentIndex + 1]
+                if next_season:
+                    candidates.extend(next_season[0].episodes()[:1])
+        except Exception as e:
+            logger.debug("Could not look up the episodes after %s: %s", getattr(item, 'title', ''), e)
+    try:
+        candidates.extend(plex.library.onDeck())
+    except Exception as e:
+        logger.debug("Could not look up On Deck: %s", e)
+
+    seen = {getattr(item, 'ratingKey', None)}
+    upcoming = []
+    for candidate in candidates:
+        if candidate.ratingKey not in seen and getattr(candidate, 'type', None) in ('episode', 'movie'):
+            seen.add(candidate.ratingKey)
+            upcoming.append(candidate)
+    return upcoming[:limit]
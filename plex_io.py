@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("plex_skip.plex_io")
+
+# Threads available for blocking Plex calls
+PLEX_IO_WORKERS = int(os.getenv("PLEX_SKIP_IO_WORKERS", "8"))
+# Seconds before a Plex call is reported as failed, also passed to plexapi as its network timeout
+PLEX_IO_TIMEOUT = float(os.getenv("PLEX_SKIP_IO_TIMEOUT", "5"))
+# Seconds between checks for overdue calls
+WATCHDOG_INTERVAL = 0.05
+
+
+def deliver_inline(callback, argument):
+    callback(argument)
+
+
+class PlexCall:
+    __slots__ = ("func", "args", "deadline", "on_done", "on_error", "settled")
+
+    def __init__(self, func, args, deadline, on_done, on_error):
+        self.func = func
+        self.args = args
+        self.deadline = deadline
+        self.on_done = on_done
+        self.on_error = on_error
+        self.settled = False
+
+
+class PlexIO:
+    """Runs blocking Plex calls on a bounded thread pool.
+
+    Calls are queued per lane, usually one lane per client, and a lane runs
+    one call at a time, so a stuck player holds at most one worker and never
+    delays another player's calls. Each call has a deadline. A call still
+    queued or running when it passes reports a TimeoutError, and its late
+    result is dropped. on_done(result) and on_error(exception) are handed to
+    deliver(callback, argument), which lets hosts run them on their own
+    thread.
+    """
+
+    def __init__(self, max_workers=PLEX_IO_WORKERS, timeout=PLEX_IO_TIMEOUT, deliver=deliver_inline):
+        self.timeout = timeout
+        self.deliver = deliver
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="plex-io")
+        self._lanes = {}  # lane -> deque of calls, the first one is running
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, name="plex-io-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def submit(self, lane, func, *args, on_done=None, on_error=None, timeout=None):
+        """Queue func(*args) on a lane; returns immediately."""
+        call = PlexCall(func, args, time.monotonic() + (timeout or self.timeout), on_done, on_error)
+        with self._lock:
+            calls = self._lanes.setdefault(lane, deque())
+            calls.append(call)
+            idle = len(calls) == 1
+        if idle:
+            self._executor.submit(self._run_lane, lane)
+        return call
+
+    def busy(self, lane):
+        """Whether a lane has calls queued or running."""
+        with self._lock:
+            return lane in self._lanes
+
+    def _run_lane(self, lane):
+        while True:
+            with self._lock:
+                call = self._lanes[lane][0]
+            # Calls that timed out while queued are not run at all
+            if not call.settled:
+                try:
+                    result = call.func(*call.args)
+                except Exception as e:
+                    self._settle(call, call.on_error, e)
+                else:
+                    self._settle(call, call.on_done, result)
+            with self._lock:
+                calls = self._lanes[lane]
+                calls.popleft()
+                if not calls:
+                    del self._lanes[lane]
+                    return
+
+    def _settle(self, call, callback, argument):
+        with self._lock:
+            if call.settled:
+                return
+            call.settled = True
+        if callback is not None:
+            try:
+                self.deliver(callback, argument)
+            except Exception:
+                logger.exception("Delivering a Plex call result failed")
+        elif isinstance(argument, Exception):
+            logger.warning("Plex call failed: %s", argument)
+
+    def _watch(self):
+        while not self._stop.wait(WATCHDOG_INTERVAL):
+            now = time.monotonic()
+            with self._lock:
+                overdue = [
+                    (lane, call) for lane, calls in self._lanes.items()
+                    for call in calls if not call.settled and call.deadline <= now
+                ]
+            for lane, call in overdue:
+                logger.warning("Plex call timed out", extra={"lane": lane, "call": getattr(call.func, "__name__", "")})
+                self._settle(call, call.on_error, TimeoutError(f"Plex call on {lane} timed out"))
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,57 @@
+import threading
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent identical calls into one.
+
+    do(key, func) runs func unless a call with the same key is already in
+    flight; callers arriving meanwhile wait for that call and get its result,
+    or its exception. Results are shared, so callers must not modify them.
+    Nothing is cached: a call starting after the previous one finished runs
+    again. With a registry, calls that ran and calls that shared a result
+    are counted.
+    """
+
+    def __init__(self, registry=None):
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._calls = None
+        if registry is not None:
+            self._calls = registry.counter(
+                "plex_skip_singleflight_calls_total", "Reads that ran (leader) or waited for an identical one (shared)",
+                ("result",))
+
+    def do(self, key, func, *args):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if self._calls is not None:
+            self._calls.inc("leader" if leader else "shared")
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func(*args)
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
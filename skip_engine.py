@@ -0,0 +1,449 @@
+import bisect
+import logging
+import os
+import queue
+import threading
+import time
+
+import wire_format
+from alert_queue import CoalescingQueue
+from client_registry import ClientRegistry
+from library_index import LibraryIndex
+from plan_cache import SkipPlanCache, upcoming_items
+from plex_io import PLEX_IO_TIMEOUT, PlexIO
+from skip_telemetry import SkipTelemetry
+
+logger = logging.getLogger("plex_skip.engine")
+
+# How often the position is checked against the skip plan, in seconds
+TICK_INTERVAL = 0.25
+# A range is not skipped again this soon after it was skipped, in milliseconds
+SKIP_COOLDOWN_MS = 2000
+# Ranges this close together are cleared by one seek to the end of the last, in milliseconds
+SKIP_CHAIN_GAP_MS = int(os.getenv("PLEX_SKIP_CHAIN_GAP_MS", "1000"))
+# PlexIO lane of the background prefetching
+PREFETCH_LANE = "prefetch"
+
+
+def media_identifiers(item):
+    """Collect the Plex ratingKey and GUIDs identifying a media item."""
+    # plexapi items hold Guid objects, LibraryEntry the GUID strings
+    guids = [getattr(guid, 'id', guid) for guid in getattr(item, 'guids', None) or []]
+    if getattr(item, 'guid', None) and item.guid not in guids:
+        guids.append(item.guid)
+    rating_key = getattr(item, 'ratingKey', None)
+    return {
+        'rating_key': int(rating_key) if rating_key else None,
+        'guids': guids
+    }
+
+
+def media_request(item):
+    """Build the request body identifying a Plex movie or episode to the backend."""
+    if getattr(item, 'type', None) == 'episode':
+        data = {
+            "show_name": item.grandparentTitle,
+            "season": str(item.parentIndex),
+            "episode_number": str(item.index),
+            "title": item.title
+        }
+    else:
+        data = {"title": item.title}
+    return {**data, **media_identifiers(item)}
+
+
+def fetch_skip_plan(backend_url, data, buffer_seconds, profile=None, session=None):
+    """Fetch the ready-to-execute skip plan for a media request body.
+
+    Returns an empty plan when the backend has no entry for the media; other
+    request errors are raised.
+    """
+    if session is None:
+        import requests as session
+    body = {**data, "buffer_seconds": buffer_seconds}
+    if profile:
+        body["profile"] = profile
+    response = session.post(
+        f"{backend_url}/skip-plans/get/",
+        json=body,
+        headers={"Accept": wire_format.ACCEPT_COMPACT},
+        timeout=PLEX_IO_TIMEOUT
+    )
+    if response.status_code == 404:
+        return []
+    response.raise_for_status()
+    return wire_format.decode(response.content, response.headers.get('Content-Type'))['plan']
+
+
+def fetch_skip_plans(backend_url, items, buffer_seconds, profile=None, session=None):
+    """Fetch the skip plans of several media request bodies, None for media without an entry."""
+    if session is None:
+        import requests as session
+    body = {"items": items, "buffer_seconds": buffer_seconds}
+    if profile:
+        body["profile"] = profile
+    response = session.post(f"{backend_url}/skip-plans/batch/", json=body, timeout=PLEX_IO_TIMEOUT)
+    response.raise_for_status()
+    return response.json()['plans']
+
+
+def prefetch_skip_plans(plex, item, cache, backend_url, buffer_seconds, profile=None, session=None, library=None):
+    """Fetch into cache the plans of media likely to play after item, in one backend request.
+
+    Blocks on Plex and the backend, run it on a background lane. Returns how
+    many plans were fetched.
+    """
+    pending = []
+    for upcoming in upcoming_items(plex, item, library=library):
+        data = media_request(upcoming)
+        if cache.get(data, buffer_seconds, profile) is None:
+            pending.append(data)
+    if not pending:
+        return 0
+    for data, plan in zip(pending, fetch_skip_plans(backend_url, pending, buffer_seconds, profile, session)):
+        cache.put(data, buffer_seconds, plan or [], profile)
+    logger.debug("Prefetched skip plans", extra={"count": len(pending)})
+    return len(pending)
+
+
+def chain_ends(plan, gap_seconds):
+    """For each range of a sorted plan, the index of the last range chained to it.
+
+    Ranges chain when the next one starts at most gap_seconds after the
+    chain so far ends, so one seek can clear the whole chain.
+    """
+    ends = []
+    chain_start, chain_end = 0, None
+    for index, (start_time, end_time, _) in enumerate(plan):
+        if chain_end is not None and start_time > chain_end + gap_seconds:
+            ends.extend([index - 1] * (index - chain_start))
+            chain_start, chain_end = index, None
+        chain_end = end_time if chain_end is None else max(chain_end, end_time)
+    ends.extend([len(plan) - 1] * (len(plan) - chain_start))
+    return ends
+
+
+class SkipEngine:
+    """Skip logic for one player, independent of any UI.
+
+    The position is extrapolated from the last notification while playing.
+    tick() seeks the client past the planned range it is in, and past every
+    range chained to it within chain_gap_ms, with a single seek. The host
+    calls tick() periodically and feeds notifications to update_position().
+    With io set, seeks run on its lane for this client and tick() never
+    waits on the player.
+    """
+
+    def __init__(self, client_id, seek=None, telemetry=None, clock=time.time, io=None,
+                 chain_gap_ms=SKIP_CHAIN_GAP_MS):
+        self.client_id = client_id
+        self.seek = seek  # Callable taking the target offset in milliseconds
+        self.io = io  # PlexIO running the seeks, or None to seek inline
+        self.telemetry = telemetry
+        self.clock = clock
+        self.chain_gap_ms = chain_gap_ms
+        self.plan = []
+        self.last_view_offset = 0
+        self.last_update_time = 0
+        self.playback_state = 'stopped'
+        self.cooldowns = {}  # (start_time, end_time) of a skipped range -> clock() time it may be skipped again
+
+    @property
+    def plan(self):
+        """Sorted [start_time, end_time, label] triples, buffer applied."""
+        return self._plan
+
+    @plan.setter
+    def plan(self, plan):
+        self._plan = plan
+        self._starts = [start_time for start_time, _, _ in plan]
+        self._chain_ends = chain_ends(plan, self.chain_gap_ms / 1000)
+
+    def update_position(self, view_offset, state, received_at=None):
+        """Record the position and state reported by a notification received at received_at."""
+        self.last_view_offset = view_offset
+        self.last_update_time = self.clock() if received_at is None else received_at
+        self.playback_state = state
+        if self.telemetry:
+            self.telemetry.confirm(self.client_id, view_offset)
+
+    def current_position_ms(self):
+        """Current playback position, extrapolated from the last notification while playing."""
+        if self.playback_state == 'playing':
+            elapsed_time = self.clock() - self.last_update_time
+            return self.last_view_offset + int(elapsed_time * 1000)
+        return self.last_view_offset
+
+    def tick(self):
+        """Skip the planned range the position is in; returns the labels of ranges skipped."""
+        if self.telemetry:
+            self.telemetry.expire()
+        if self.seek is None:
+            return []
+
+        now = self.clock()
+        if self.cooldowns:
+            self.cooldowns = {segment: until for segment, until in self.cooldowns.items() if until > now}
+
+        current_position_ms = self.current_position_ms()
+        current_position_seconds = current_position_ms / 1000
+        index = bisect.bisect_right(self._starts, current_position_seconds) - 1
+        if index < 0:
+            return []
+        start_time, end_time, label = self._plan[index]
+        if current_position_seconds > end_time or (start_time, end_time) in self.cooldowns:
+            return []
+
+        chain = self._plan[index:self._chain_ends[index] + 1]
+        chain_end = max(end for _, end, _ in chain)
+        segments = [(start, end) for start, end, _ in chain]
+        labels = [chain_label for _, _, chain_label in chain]
+        logger.debug("Attempting to skip from %.2fs to %.2fs", current_position_seconds, chain_end)
+
+        # Landing on the end of the chain must not skip any of its ranges again
+        for segment in segments:
+            self.cooldowns[segment] = now + SKIP_COOLDOWN_MS / 1000
+        self.send_seek(
+            int(chain_end * 1000), start_time * 1000, current_position_ms, segments, " | ".join(filter(None, labels))
+        )
+
+        # Update our internal position tracking, the next notification corrects it if the seek failed
+        self.last_view_offset = int(chain_end * 1000)
+        self.last_update_time = now
+        return labels
+
+    def send_seek(self, seek_position, planned_ms, current_position_ms, segments, label):
+        """Seek the client, inline or on the io lane, and record the outcome."""
+        seek_started = time.monotonic()
+
+        def done(_):
+            if self.telemetry:
+                self.telemetry.record_skip(
+                    self.client_id, planned_ms, current_position_ms, seek_position, seek_started, time.monotonic()
+                )
+            logger.info("Seek command sent", extra={"client": self.client_id, "position_ms": seek_position, "label": label})
+
+        def failed(seek_error):
+            if self.telemetry:
+                self.telemetry.record_skip(
+                    self.client_id, planned_ms, current_position_ms, seek_position,
+                    seek_started, time.monotonic(), error=seek_error
+                )
+            logger.warning("Error during seek: %s", seek_error)
+            # Let the ranges be retried once a notification shows they are still playing
+            for segment in segments:
+                self.cooldowns.pop(segment, None)
+
+        if self.io is None:
+            try:
+                self.seek(seek_position)
+            except Exception as seek_error:
+                failed(seek_error)
+            else:
+                done(None)
+        else:
+            self.io.submit(self.client_id, self.seek, seek_position, on_done=done, on_error=failed)
+
+
+class SkipDaemon:
+    """Headless auto-skip for every session on a Plex server.
+
+    Notifications create one SkipEngine per player and keep its position
+    current. A single thread owns the engines: it ticks them and runs
+    notifications and finished Plex calls from its event queue. Playing
+    media is resolved through the LibraryIndex built on start. Plan fetches
+    and seeks run on a PlexIO lane per player, and
+    the plans of what players are likely to play next are prefetched into
+    plan_cache on a lane of their own.
+    """
+
+    def __init__(self, plex, backend_url, client_factory, profile=None, buffer_seconds=0.0,
+                 tick_interval=TICK_INTERVAL, telemetry=None, io=None):
+        self.plex = plex
+        self.backend_url = backend_url
+        self.client_factory = client_factory  # client_factory(machine_identifier, session) -> object with seekTo()
+        self.profile = profile
+        self.buffer_seconds = buffer_seconds
+        self.tick_interval = tick_interval
+        self.telemetry = telemetry or SkipTelemetry()
+        self.events = queue.SimpleQueue()  # (callback, argument) pairs run on the engine thread
+        # Latest notification per player; the first one queued wakes the engine thread to apply them all
+        self.alerts = CoalescingQueue(
+            registry=self.telemetry.registry, on_first_put=lambda: self.events.put((self.apply_alerts, None))
+        )
+        self.io = io or PlexIO(deliver=lambda callback, argument: self.events.put((callback, argument)))
+        self.clients = ClientRegistry(client_factory, io=self.io)
+        self.engines = {}  # clientIdentifier -> SkipEngine
+        self.media_keys = {}  # clientIdentifier -> metadata key the engine's plan belongs to
+        self.starting = {}  # clientIdentifier -> metadata key being looked up
+        self.plan_cache = SkipPlanCache()
+        self.library = LibraryIndex(plex, io=self.io)
+        self.http = None  # requests.Session, created on start() to keep imports cheap
+        self.alert_listener = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load_session(self, client_id, media_key):
+        """Look up the media, player and skip plan of a session; runs on the io lane."""
+        item = self.library.resolve(media_key)
+        # Connecting now means the first skip does not wait for it
+        self.clients.get(client_id)
+        # Plans of what this player is likely to play next are fetched meanwhile
+        self.io.submit(PREFETCH_LANE, self.prefetch, item)
+        data = media_request(item)
+        return self.plan_cache.fetch(
+            data, self.buffer_seconds,
+            lambda: fetch_skip_plan(self.backend_url, data, self.buffer_seconds, self.profile, session=self.http),
+            self.profile
+        )
+
+    def prefetch(self, item):
+        return prefetch_skip_plans(
+            self.plex, item, self.plan_cache, self.backend_url, self.buffer_seconds, self.profile, session=self.http,
+            library=self.library
+        )
+
+    def start_session(self, client_id, media_key):
+        """Begin loading the engine of a player that started playing media_key."""
+        self.starting[client_id] = media_key
+        engine = self.engines.get(client_id)
+        if engine is not None:
+            # Until the new plan arrives the ranges of the previous media must not seek this one
+            engine.plan = []
+            self.media_keys.pop(client_id, None)
+
+        def loaded(plan):
+            if self.starting.get(client_id) != media_key:
+                return  # The player moved on to other media meanwhile
+            del self.starting[client_id]
+            engine = self.engines.get(client_id)
+            if engine is None:
+                engine = SkipEngine(client_id, self.clients.seeker(client_id), telemetry=self.telemetry, io=self.io)
+            engine.plan = plan
+            self.media_keys[client_id] = media_key
+            self.engines[client_id] = engine
+            logger.info("Monitoring session", extra={"client": client_id, "ranges": len(plan)})
+
+        def failed(error):
+            if self.starting.get(client_id) == media_key:
+                del self.starting[client_id]
+            logger.warning("Could not start monitoring %s: %s", client_id, error)
+
+        self.io.submit(client_id, self.load_session, client_id, media_key, on_done=loaded, on_error=failed)
+
+    def handle_alert(self, data):
+        """AlertListener callback, hands notifications to the engine thread."""
+        received_at = time.time()
+        self.library.handle_alert(data)
+        for notification in data.get('PlaySessionStateNotification', []):
+            self.alerts.put(notification.get('clientIdentifier'), (notification, received_at))
+
+    def apply_alerts(self, _):
+        for notification, received_at in self.alerts.drain():
+            try:
+                self.apply_notification(notification, received_at)
+            except Exception:
+                logger.exception("Applying a notification failed")
+
+    def apply_notification(self, notification, received_at):
+        client_id = notification.get('clientIdentifier')
+        media_key = notification.get('key')
+        if self.media_keys.get(client_id) != media_key and self.starting.get(client_id) != media_key:
+            self.start_session(client_id, media_key)
+        engine = self.engines.get(client_id)
+        if engine is not None:
+            engine.update_position(notification.get('viewOffset', 0), notification.get('state'), received_at)
+
+    def tick_all(self):
+        for engine in list(self.engines.values()):
+            try:
+                engine.tick()
+            except Exception:
+                logger.exception("Check and skip error")
+
+    def run(self):
+        next_tick = time.monotonic()
+        while not self._stop.is_set():
+            remaining = next_tick - time.monotonic()
+            if remaining <= 0:
+                self.tick_all()
+                next_tick = max(next_tick + self.tick_interval, time.monotonic())
+                continue
+            try:
+                callback, argument = self.events.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            try:
+                callback(argument)
+            except Exception:
+                logger.exception("Skip daemon event failed")
+
+    def start(self):
+        import requests
+
+        self.http = requests.Session()
+        self._stop.clear()
+        self.alert_listener = self.plex.startAlertListener(self.handle_alert)
+        self.library.start_build()
+        self.clients.start_health_checks()
+        self._thread = threading.Thread(target=self.run, name="skip-daemon", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.alert_listener:
+            self.alert_listener.stop()
+        if self._thread:
+            self._thread.join()
+        self.clients.stop()
+        self.io.shutdown()
+
+
+def plex_client_factory(plex, token):
+    """Look players up among the clients the Plex server knows about."""
+    from plexapi.client import PlexClient
+
+    def create(client_id, session):
+        for client in plex.clients():
+            if client.machineIdentifier == client_id:
+                return client
+        # Fall back to the directly configured player
+        return PlexClient(
+            identifier=client_id, baseurl=os.getenv("PLEX_CLIENT_URL"), token=token, session=session,
+            timeout=PLEX_IO_TIMEOUT
+        )
+
+    return create
+
+
+def main():
+    from dotenv import load_dotenv
+    from plexapi.server import PlexServer
+    from log_setup import setup_logging
+
+    load_dotenv()
+    setup_logging()
+    token = os.getenv("PLEX_TOKEN")
+    plex = PlexServer(os.getenv("PLEX_SERVER_URL"), token, timeout=PLEX_IO_TIMEOUT)
+    daemon = SkipDaemon(
+        plex,
+        os.getenv("PLEX_SKIP_BACKEND_URL", "http://127.0.0.1:8000"),
+        plex_client_factory(plex, token),
+        profile=os.getenv("PLEX_SKIP_PROFILE"),
+        buffer_seconds=float(os.getenv("PLEX_SKIP_BUFFER", "2")),
+        telemetry=SkipTelemetry(
+            log_path=os.getenv("PLEX_SKIP_TELEMETRY_LOG"),
+            metrics_path=os.getenv("PLEX_SKIP_TELEMETRY_METRICS")
+        )
+    )
+    daemon.start()
+    logger.info("Skip daemon running")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
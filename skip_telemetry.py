@@ -0,0 +1,154 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from statistics import median
+
+import metrics
+
+logger = logging.getLogger("plex_skip.telemetry")
+
+# A seek counts as confirmed once a notification reports a position this close to its target
+CONFIRM_TOLERANCE_MS = 1500
+# Seeks still unconfirmed after this long are counted as missed
+CONFIRM_TIMEOUT = 5.0
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class SkipTelemetry:
+    """Per-skip measurements kept in a ring buffer.
+
+    Each record has the planned and actual position the skip fired at, how
+    long client.seekTo took, and how long until a notification confirmed the
+    new position. Finished records are appended to a JSON lines log, and
+    aggregates are written in the Prometheus text format for a textfile
+    collector, when those paths are set.
+    """
+
+    def __init__(self, capacity=500, log_path=None, metrics_path=None):
+        self.records = deque(maxlen=capacity)
+        self.log_path = log_path
+        self.metrics_path = metrics_path
+        self._pending = {}  # client id -> record awaiting confirmation
+        self._lock = threading.Lock()
+
+        self.registry = metrics.Registry()
+        self.skips = self.registry.counter(
+            "plex_skip_client_skips_total", "Skips by client and outcome", ("client", "result"))
+        self.lateness = self.registry.histogram(
+            "plex_skip_client_skip_lateness_seconds", "How far past the planned start a skip fired", ("client",))
+        self.seek_rtt = self.registry.histogram(
+            "plex_skip_client_seek_seconds", "Duration of the seekTo call", ("client",))
+        self.confirmation = self.registry.histogram(
+            "plex_skip_client_confirm_seconds", "Time from seek until a notification confirmed it", ("client",))
+
+    def record_skip(self, client_id, planned_ms, actual_ms, target_ms, seek_started, seek_finished, error=None):
+        """Record a skip that just fired; it stays pending until confirm() or expire() settles it.
+
+        seek_started and seek_finished are time.monotonic() values.
+        """
+        record = {
+            "time": time.time(),
+            "client": client_id,
+            "planned_ms": int(planned_ms),
+            "actual_ms": int(actual_ms),
+            "lateness_ms": max(0, int(actual_ms - planned_ms)),
+            "target_ms": int(target_ms),
+            "seek_rtt_ms": round((seek_finished - seek_started) * 1000, 1),
+            "confirm_ms": None,
+            "confirmed": None,
+            "error": str(error) if error else None,
+            "_seek_started": seek_started,
+        }
+        with self._lock:
+            self.records.append(record)
+            previous = self._pending.pop(client_id, None)
+            if error is None:
+                self._pending[client_id] = record
+        if previous is not None:
+            self._finish(previous, confirmed=False)
+        if error is not None:
+            self._finish(record, confirmed=False)
+        return record
+
+    def confirm(self, client_id, view_offset_ms, now=None):
+        """Settle the pending skip of a client if a notification reached its target."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            record = self._pending.get(client_id)
+            if record is None or view_offset_ms < record["target_ms"] - CONFIRM_TOLERANCE_MS:
+                return
+            del self._pending[client_id]
+        record["confirm_ms"] = round((now - record["_seek_started"]) * 1000, 1)
+        self._finish(record, confirmed=True)
+
+    def expire(self, now=None):
+        """Count skips left unconfirmed for longer than CONFIRM_TIMEOUT as missed."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            expired = [
+                client_id for client_id, record in self._pending.items()
+                if now - record["_seek_started"] > CONFIRM_TIMEOUT
+            ]
+            records = [self._pending.pop(client_id) for client_id in expired]
+        for record in records:
+            self._finish(record, confirmed=False)
+
+    def _finish(self, record, confirmed):
+        record["confirmed"] = confirmed
+        client = record["client"]
+        result = "error" if record["error"] else ("confirmed" if confirmed else "unconfirmed")
+        self.skips.inc(client, result)
+        self.lateness.observe(record["lateness_ms"] / 1000, client)
+        self.seek_rtt.observe(record["seek_rtt_ms"] / 1000, client)
+        if record["confirm_ms"] is not None:
+            self.confirmation.observe(record["confirm_ms"] / 1000, client)
+        if not confirmed:
+            logger.warning("Skip not confirmed", extra={"client": client, "result": result})
+        self._export(record)
+
+    def _export(self, record):
+        try:
+            if self.log_path:
+                public = {key: value for key, value in record.items() if not key.startswith("_")}
+                with open(self.log_path, "a", encoding="utf-8") as log_file:
+                    log_file.write(json.dumps(public) + "\n")
+            if self.metrics_path:
+                # Written atomically so a collector never reads a partial file
+                temporary_path = f"{self.metrics_path}.tmp"
+                with open(temporary_path, "w", encoding="utf-8") as metrics_file:
+                    metrics_file.write(self.registry.render())
+                os.replace(temporary_path, self.metrics_path)
+        except OSError as e:
+            logger.warning("Could not export skip telemetry: %s", e)
+
+    def summary(self, client_id=None):
+        """Aggregate the buffered records, optionally for one client."""
+        with self._lock:
+            records = [
+                record for record in self.records
+                if record["confirmed"] is not None and (client_id is None or record["client"] == client_id)
+            ]
+        if not records:
+            return {"skips": 0}
+
+        lateness = [record["lateness_ms"] for record in records]
+        rtt = [record["seek_rtt_ms"] for record in records]
+        confirm = [record["confirm_ms"] for record in records if record["confirm_ms"] is not None]
+        return {
+            "skips": len(records),
+            "confirmed_ratio": sum(record["confirmed"] for record in records) / len(records),
+            "lateness_ms_p50": median(lateness),
+            "lateness_ms_p95": percentile(lateness, 0.95),
+            "seek_rtt_ms_p50": median(rtt),
+            "seek_rtt_ms_p95": percentile(rtt, 0.95),
+            "confirm_ms_p50": median(confirm) if confirm else None,
+            "confirm_ms_p95": percentile(confirm, 0.95) if confirm else None,
+        }
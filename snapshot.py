@@ -0,0 +1,173 @@
+"""Immutable, memory-mapped snapshots of the stored skip data for read-only edge nodes.
+
+A snapshot file holds, after a small header and a JSON metadata block, a
+sorted array of 64-bit key hashes, a parallel array of record offsets and
+the records. Each record is one title's get-timestamps answer encoded with
+wire_format.pack_payload. A title is reachable under several keys (its
+names, ratingKey and GUIDs), all pointing at the same record.
+
+Lookups binary search the mapped hash array in place and return the record
+as a memoryview of the mapping, so serving packed answers copies nothing
+and a worker's memory is the page cache shared with every other worker.
+Snapshots are written to a temporary file and renamed into place, which
+SnapshotStore notices and swaps to atomically.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+
+import wire_format
+
+logger = logging.getLogger("plex_skip.snapshot")
+
+MAGIC = b"PSNP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHII")  # magic, version, reserved, key count, metadata length
+RECORD_LENGTH = struct.Struct("<I")
+# Seconds between checks for a newer snapshot file
+SNAPSHOT_POLL_INTERVAL = 2.0
+
+
+def snapshot_key(*parts) -> int:
+    """64-bit hash a title is indexed under, e.g. snapshot_key("movie", "The Matrix")."""
+    digest = hashlib.blake2b("\0".join(str(part) for part in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _aligned(length: int) -> int:
+    return -length % 8
+
+
+class SnapshotWriter:
+    """Collects records and their keys, then writes a snapshot file atomically."""
+
+    def __init__(self, meta=None):
+        self.meta = meta or {}
+        self.records = []  # Packed payloads
+        self.keys = {}  # key hash -> record index
+
+    def add(self, payload: dict, keys):
+        """Add one record reachable under each key, a tuple of snapshot_key parts."""
+        index = len(self.records)
+        self.records.append(wire_format.pack_payload(payload))
+        for key in keys:
+            # A 64-bit collision keeps the first record, it is not worth handling
+            self.keys.setdefault(snapshot_key(*key), index)
+
+    def write(self, path: str):
+        meta = json.dumps({**self.meta, "records": len(self.records)}, separators=(",", ":")).encode("utf-8")
+        hashes = sorted(self.keys)
+        body_start = HEADER.size + len(meta) + _aligned(HEADER.size + len(meta))
+        records_start = body_start + 16 * len(hashes)
+
+        record_offsets, position = [], records_start
+        for record in self.records:
+            record_offsets.append(position)
+            position += RECORD_LENGTH.size + len(record)
+
+        hash_array = array("Q", hashes)
+        offset_array = array("Q", (record_offsets[self.keys[key_hash]] for key_hash in hashes))
+        if sys.byteorder != "little":
+            hash_array.byteswap()
+            offset_array.byteswap()
+
+        temporary = f"{path}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(hashes), len(meta)))
+            f.write(meta)
+            f.write(b"\0" * _aligned(HEADER.size + len(meta)))
+            f.write(hash_array.tobytes())
+            f.write(offset_array.tobytes())
+            for record in self.records:
+                f.write(RECORD_LENGTH.pack(len(record)))
+                f.write(record)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        logger.info("Wrote snapshot", extra={"path": path, "records": len(self.records), "keys": len(hashes)})
+
+
+class Snapshot:
+    """A snapshot file mapped read-only."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.stat = os.fstat(f.fileno())
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(self._map)
+        magic, version, _, count, meta_length = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} snapshot")
+        self.meta = json.loads(bytes(data[HEADER.size:HEADER.size + meta_length]))
+        body_start = HEADER.size + meta_length + _aligned(HEADER.size + meta_length)
+        self._data = data
+        self._hashes = data[body_start:body_start + 8 * count].cast("Q")
+        self._offsets = data[body_start + 8 * count:body_start + 16 * count].cast("Q")
+        if sys.byteorder != "little":
+            # Mapped arrays are little-endian, big-endian hosts pay for one copy
+            self._hashes, self._offsets = array("Q", self._hashes), array("Q", self._offsets)
+            self._hashes.byteswap()
+            self._offsets.byteswap()
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def record(self, *key):
+        """Packed payload stored under a key, as a view of the mapping, or None."""
+        key_hash = snapshot_key(*key)
+        index = bisect.bisect_left(self._hashes, key_hash)
+        if index == len(self._hashes) or self._hashes[index] != key_hash:
+            return None
+        offset = self._offsets[index]
+        (length,) = RECORD_LENGTH.unpack_from(self._data, offset)
+        start = offset + RECORD_LENGTH.size
+        return self._data[start:start + length]
+
+
+class SnapshotStore:
+    """The current snapshot at a path, swapped for a newer file once one is renamed into place.
+
+    Requests keep the Snapshot they started with; an old mapping is released
+    once nothing refers to it any more.
+    """
+
+    def __init__(self, path: str, poll_interval: float = SNAPSHOT_POLL_INTERVAL):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.current = Snapshot(path)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def reload(self) -> bool:
+        """Load the file again if it changed since the current snapshot; True if it was swapped."""
+        stat = os.stat(self.path)
+        current = self.current.stat
+        if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == (current.st_ino, current.st_mtime_ns, current.st_size):
+            return False
+        self.current = Snapshot(self.path)
+        logger.info("Swapped to a new snapshot", extra={"path": self.path, "keys": len(self.current)})
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.reload()
+            except (OSError, ValueError) as e:
+                logger.warning("Keeping the current snapshot: %s", e)
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="snapshot-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
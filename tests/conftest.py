@@ -0,0 +1,22 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The backend binds its engine at import, so the test database is chosen first
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="plex-skip-tests-")
+os.environ["PLEX_SKIP_DATABASE_URL"] = f"sqlite:///{DATABASE_DIRECTORY}/media.db"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import backend
+
+    with TestClient(backend.app) as test_client:
+        yield test_client
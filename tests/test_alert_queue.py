@@ -0,0 +1,41 @@
+import metrics
+from alert_queue import CoalescingQueue
+
+
+def test_notifications_are_coalesced_per_session():
+    queue = CoalescingQueue()
+    queue.put("tv", 1)
+    queue.put("phone", 2)
+    queue.put("tv", 3)
+    assert len(queue) == 2
+    assert queue.drain() == [3, 2]
+    assert queue.drain() == []
+
+
+def test_new_sessions_are_dropped_while_the_queue_is_full():
+    registry = metrics.Registry()
+    queue = CoalescingQueue(max_keys=2, registry=registry)
+    assert queue.put("tv", 1)
+    assert queue.put("phone", 2)
+    assert not queue.put("tablet", 3)
+    assert queue.put("tv", 4)
+    assert queue.drain() == [4, 2]
+    assert queue.put("tablet", 5)
+
+    counted = registry.render()
+    assert 'plex_skip_alert_queue_entries_total{result="queued"} 3' in counted
+    assert 'plex_skip_alert_queue_entries_total{result="coalesced"} 1' in counted
+    assert 'plex_skip_alert_queue_entries_total{result="dropped"} 1' in counted
+    assert "plex_skip_alert_queue_depth 1" in counted
+
+
+def test_consumer_is_woken_only_when_the_queue_fills_from_empty():
+    wakes = []
+    queue = CoalescingQueue(on_first_put=lambda: wakes.append(len(queue)))
+    queue.put("tv", 1)
+    queue.put("tv", 2)
+    queue.put("phone", 3)
+    assert wakes == [1]
+    queue.drain()
+    queue.put("phone", 4)
+    assert wakes == [1, 1]
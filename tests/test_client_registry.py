@@ -0,0 +1,105 @@
+import pytest
+
+from client_registry import HEALTH_CHECK_PATH, ClientRegistry
+
+
+class Client:
+    def __init__(self, client_id, session, reachable):
+        self.client_id = client_id
+        self.session = session
+        self.reachable = reachable
+        self.seeks = []
+
+    def query(self, path):
+        assert path == HEALTH_CHECK_PATH
+        if not self.reachable():
+            raise ConnectionError(self.client_id)
+
+    def seekTo(self, offset):
+        self.query(HEALTH_CHECK_PATH)
+        self.seeks.append(offset)
+
+
+class Players:
+    """Factory for ClientRegistry counting connects and failing for players marked down."""
+
+    def __init__(self):
+        self.down = set()
+        self.connects = []
+
+    def __call__(self, client_id, session):
+        if client_id in self.down:
+            raise ConnectionError(client_id)
+        self.connects.append(client_id)
+        return Client(client_id, session, lambda: client_id not in self.down)
+
+
+def test_clients_are_cached_and_share_one_session():
+    players = Players()
+    registry = ClientRegistry(players)
+    tv = registry.get("tv")
+    assert registry.get("tv") is tv
+    assert registry.get("phone").session is tv.session
+    assert players.connects == ["tv", "phone"]
+
+
+def test_a_failed_call_reconnects_on_next_use():
+    players = Players()
+    registry = ClientRegistry(players)
+    seek = registry.seeker("tv")
+    first = registry.get("tv")
+    players.down.add("tv")
+    with pytest.raises(ConnectionError):
+        seek(1000)
+    players.down.clear()
+    seek(2000)
+    assert registry.get("tv") is not first
+    assert registry.get("tv").seeks == [2000]
+
+
+def test_invalidating_a_stale_client_keeps_the_current_one():
+    registry = ClientRegistry(Players())
+    stale = registry.get("tv")
+    registry.invalidate("tv")
+    current = registry.get("tv")
+    registry.invalidate("tv", stale)
+    assert registry.get("tv") is current
+
+
+def test_health_checks_evict_unreachable_players():
+    players = Players()
+    registry = ClientRegistry(players)
+    registry.get("tv")
+    registry.get("phone")
+
+    players.down.add("phone")
+    registry.check_health()
+    assert players.connects == ["tv", "phone"]
+    registry.check_health()
+    assert players.connects == ["tv", "phone"]
+
+    players.down.clear()
+    registry.get("phone")
+    assert players.connects == ["tv", "phone", "phone"]
+
+
+class Lanes:
+    def __init__(self, busy):
+        self.busy_lanes = busy
+        self.submitted = []
+
+    def busy(self, lane):
+        return lane in self.busy_lanes
+
+    def submit(self, lane, func, *args):
+        self.submitted.append(lane)
+        func(*args)
+
+
+def test_health_checks_skip_busy_lanes():
+    io = Lanes(busy={"tv"})
+    registry = ClientRegistry(Players(), io=io)
+    registry.get("tv")
+    registry.get("phone")
+    registry.check_health()
+    assert io.submitted == ["phone"]
@@ -0,0 +1,126 @@
+import threading
+import time
+
+import pytest
+
+import jobs
+from jobs import CANCELLED, FAILED, FINISHED, QUEUED, SUCCEEDED, JobQueueFull, JobRunner, JobStore
+
+
+class MemoryJobStore(JobStore):
+    def __init__(self):
+        self.jobs = {}
+        self.finished = threading.Condition()
+
+    def create(self, kind, params):
+        job_id = len(self.jobs) + 1
+        self.jobs[job_id] = {"kind": kind, "status": QUEUED, "params": params, "cancel_requested": False}
+        return job_id
+
+    def update(self, job_id, **fields):
+        with self.finished:
+            self.jobs[job_id].update(fields)
+            self.finished.notify_all()
+
+    def cancel_requested(self, job_id):
+        return self.jobs[job_id]["cancel_requested"]
+
+    def wait(self, job_id):
+        with self.finished:
+            assert self.finished.wait_for(lambda: self.jobs[job_id]["status"] in FINISHED, timeout=5)
+        return self.jobs[job_id]
+
+
+@pytest.fixture
+def runner(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_SYNC_INTERVAL", 0)
+    runner = JobRunner(MemoryJobStore(), max_workers=1, queue_limit=1)
+    runner.start()
+    yield runner
+    runner.shutdown()
+
+
+def count_to(job, total, release=None):
+    for done in range(total):
+        job.checkpoint(done, total)
+        if release is not None:
+            release.wait(2)
+    return {"counted": total}
+
+
+def test_job_progress_and_result_are_stored(runner):
+    runner.register("count", count_to)
+    job_id = runner.submit("count", {"total": 3})
+    job = runner.store.wait(job_id)
+    assert job["status"] == SUCCEEDED
+    assert job["result"] == {"counted": 3}
+    assert (job["done"], job["total"]) == (3, 3)
+    assert len(runner) == 0
+
+
+def test_failures_are_recorded(runner):
+    def fail(job):
+        raise ValueError("disk full")
+
+    runner.register("fail", fail)
+    job = runner.store.wait(runner.submit("fail"))
+    assert (job["status"], job["error"]) == (FAILED, "disk full")
+
+
+def test_submit_checks_kind_parameters_and_queue_room(runner):
+    release = threading.Event()
+    runner.register("count", count_to)
+    with pytest.raises(KeyError):
+        runner.submit("unknown")
+    with pytest.raises(TypeError):
+        runner.submit("count", {"limit": 3})
+    runner.submit("count", {"total": 2, "release": release})
+    runner.submit("count", {"total": 2})
+    try:
+        with pytest.raises(JobQueueFull):
+            runner.submit("count", {"total": 2})
+    finally:
+        release.set()
+
+
+def test_cancel_stops_a_running_job_at_its_next_checkpoint(runner):
+    started, release = threading.Event(), threading.Event()
+
+    def wait_then_count(job):
+        started.set()
+        return count_to(job, 10, release)
+
+    runner.register("count", wait_then_count)
+    job_id = runner.submit("count")
+    assert started.wait(2)
+    runner.cancel(job_id)
+    release.set()
+    job = runner.store.wait(job_id)
+    assert job["status"] == CANCELLED
+    assert job["done"] < 10
+
+
+def test_cancel_requested_through_the_store_is_noticed(runner):
+    release = threading.Event()
+    runner.register("count", count_to)
+    job_id = runner.submit("count", {"total": 10, "release": release})
+    # As another worker would, only through the shared store
+    runner.store.jobs[job_id]["cancel_requested"] = True
+    release.set()
+    assert runner.store.wait(job_id)["status"] == CANCELLED
+
+
+def test_jobs_endpoints(client):
+    response = client.post("/jobs/", json={"kind": "vacuum"})
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    for _ in range(100):
+        job = client.get(f"/jobs/{job_id}").json()
+        if job["status"] in FINISHED:
+            break
+        time.sleep(0.05)
+    assert job["status"] == SUCCEEDED
+    assert job["progress"] == 1.0
+    assert client.post(f"/jobs/{job_id}/cancel").status_code == 409
+    assert client.post("/jobs/", json={"kind": "unknown"}).status_code == 400
+    assert client.get("/jobs/999999").status_code == 404
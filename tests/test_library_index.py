@@ -0,0 +1,73 @@
+import threading
+
+from plexapi.exceptions import NotFound
+
+from fake_plex import FakeMedia
+from library_index import TIMELINE_DELETED, TIMELINE_FINISHED, LibraryIndex
+from plex_io import PlexIO
+
+
+class Section:
+    type = 'movie'
+
+    def __init__(self, plex):
+        self.plex = plex
+
+    def all(self):
+        items = list(self.plex.items.values())
+        self.plex.on_read()
+        return items
+
+
+class Plex:
+    """A movie library whose section read runs on_read before returning what it read."""
+
+    def __init__(self, *items):
+        self.items = {item.ratingKey: item for item in items}
+        self.library = self
+        self.on_read = lambda: None
+
+    def sections(self):
+        return [Section(self)]
+
+    def fetchItem(self, rating_key):
+        try:
+            return self.items[rating_key]
+        except KeyError:
+            raise NotFound(rating_key)
+
+
+def timeline(rating_key, state):
+    return {'TimelineEntry': [{'type': 1, 'itemID': str(rating_key), 'state': state}]}
+
+
+def test_alerts_during_a_build_are_applied_after_it():
+    plex = Plex(FakeMedia(1, "Alien", 1000), FakeMedia(2, "Heat", 1000))
+    index = LibraryIndex(plex)
+
+    def changed_meanwhile():
+        plex.items[1] = FakeMedia(1, "Aliens", 1000)
+        del plex.items[2]
+        index.handle_alert(timeline(1, TIMELINE_FINISHED))
+        index.handle_alert(timeline(2, TIMELINE_DELETED))
+
+    plex.on_read = changed_meanwhile
+    index.build()
+    assert index.get(1).title == "Aliens"
+    assert index.get(2) is None
+
+
+def test_start_build_outlives_the_call_timeout():
+    plex = Plex(FakeMedia(1, "Alien", 1000))
+    io = PlexIO(timeout=0.05)
+    index = LibraryIndex(plex, io=io)
+    plex.on_read = lambda: threading.Event().wait(0.2)
+    built = threading.Event()
+    errors = []
+    try:
+        index.start_build(on_done=lambda count: built.set(), on_error=errors.append)
+        assert built.wait(2)
+    finally:
+        io.shutdown()
+    assert errors == []
+    assert index.get("/library/metadata/1").title == "Alien"
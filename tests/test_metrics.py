@@ -0,0 +1,44 @@
+import metrics
+
+
+def test_counter_renders_escaped_labels():
+    registry = metrics.Registry()
+    requests = registry.counter("requests_total", "Requests", ("method", "path"))
+    requests.inc("GET", '/say/"hi"')
+    requests.inc("GET", '/say/"hi"', amount=2)
+    assert requests.value("GET", '/say/"hi"') == 3
+    assert requests.value("POST", "/") == 0
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{method="GET",path="/say/\\"hi\\""} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = metrics.Registry()
+    latency = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "/")
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/",le="0.1"} 2',
+        'latency_seconds_bucket{route="/",le="1.0"} 3',
+        'latency_seconds_bucket{route="/",le="+Inf"} 4',
+        'latency_seconds_sum{route="/"} 3.65',
+        'latency_seconds_count{route="/"} 4',
+    ]
+
+
+def test_gauge_is_read_at_scrape_time():
+    registry = metrics.Registry()
+    size = [1]
+    registry.gauge("queue_size", "Queue size", lambda: size[0])
+    size[0] = 7
+    assert registry.render().endswith("queue_size 7\n")
+
+
+def test_metrics_endpoint_labels_routes_by_template(client):
+    client.get("/metrics")
+    response = client.get("/metrics")
+    assert response.headers["content-type"] == metrics.CONTENT_TYPE
+    assert 'route="/metrics",status="200"' in response.text
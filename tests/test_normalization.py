@@ -0,0 +1,45 @@
+import random
+
+from backend import insert_range, normalize_ranges
+
+CATEGORY_SETS = ([], ["gore"], ["nudity"], ["gore", "violence"])
+LABELS = (None, "intro", "scene", "credits")
+
+
+def random_range(rng):
+    # Whole and half seconds on a short timeline, so ranges often overlap or touch
+    start_time = rng.randrange(0, 200) / 2
+    return {
+        "start_time": start_time,
+        "end_time": start_time + rng.randrange(1, 40) / 2,
+        "label": rng.choice(LABELS),
+        "categories": list(rng.choice(CATEGORY_SETS)),
+    }
+
+
+def random_ranges(rng):
+    return [random_range(rng) for _ in range(rng.randrange(0, 12))]
+
+
+def test_insert_range_matches_normalizing_the_whole_list():
+    rng = random.Random(30)
+    for _ in range(1000):
+        timestamps = normalize_ranges(random_ranges(rng))
+        new_range = random_range(rng)
+        assert insert_range(timestamps, new_range) == normalize_ranges(timestamps + [new_range])
+
+
+def test_normalize_ranges_is_idempotent():
+    rng = random.Random(30)
+    for _ in range(1000):
+        normalized = normalize_ranges(random_ranges(rng))
+        assert normalize_ranges(normalized) == normalized
+
+
+def test_normalize_ranges_drops_invalid_ranges():
+    assert normalize_ranges([
+        {"start_time": -1.0, "end_time": 5.0},
+        {"start_time": 5.0, "end_time": 5.0},
+        {"start_time": 1.0, "end_time": float("inf")},
+        {"start_time": 1.0, "end_time": 2.0},
+    ]) == [{"start_time": 1.0, "end_time": 2.0, "label": None, "categories": []}]
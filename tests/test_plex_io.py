@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+
+from plex_io import PlexIO
+
+
+@pytest.fixture
+def io():
+    io = PlexIO(max_workers=4, timeout=0.2)
+    yield io
+    io.shutdown()
+
+
+def test_calls_on_a_lane_run_in_order_one_at_a_time(io):
+    order = []
+    running = []
+    done = threading.Event()
+
+    def call(i):
+        running.append(i)
+        assert len(running) == 1
+        threading.Event().wait(0.01)
+        running.remove(i)
+        order.append(i)
+
+    for i in range(5):
+        io.submit("tv", call, i, on_done=lambda result, i=i: i == 4 and done.set())
+    assert done.wait(2)
+    assert order == [0, 1, 2, 3, 4]
+    assert not io.busy("tv")
+
+
+def test_a_stuck_lane_does_not_delay_another(io):
+    release = threading.Event()
+    other_done = threading.Event()
+    io.submit("stuck", release.wait, 2)
+    io.submit("other", lambda: "ok", on_done=lambda result: other_done.set())
+    try:
+        assert other_done.wait(1)
+        assert io.busy("stuck")
+    finally:
+        release.set()
+
+
+def test_overdue_calls_time_out_and_late_results_are_dropped(io):
+    release = threading.Event()
+    results, errors = [], []
+    queued_ran = []
+    io.submit("tv", lambda: release.wait(2) and "late", on_done=results.append, on_error=errors.append)
+    io.submit("tv", queued_ran.append, 1, on_error=errors.append)
+    for _ in range(40):
+        if len(errors) == 2:
+            break
+        threading.Event().wait(0.05)
+    release.set()
+    threading.Event().wait(0.1)
+
+    assert [type(e) for e in errors] == [TimeoutError, TimeoutError]
+    assert results == []
+    assert queued_ran == []
+
+
+def test_failures_reach_on_error(io):
+    errors = []
+    failed = threading.Event()
+
+    def fail():
+        raise ValueError("unreachable")
+
+    io.submit("tv", fail, on_error=lambda e: (errors.append(e), failed.set()))
+    assert failed.wait(1)
+    assert isinstance(errors[0], ValueError)
@@ -0,0 +1,165 @@
+import sqlalchemy
+
+import backend
+
+
+def insert_legacy_movie(title, timestamps):
+    """Store a movie the way rows written before the segment event log look."""
+    with backend.SessionLocal() as db:
+        db.execute(sqlalchemy.insert(backend.Movie).values(
+            title=title, normalized_title=title.lower(), timestamps=timestamps, compacted_event_id=None
+        ))
+        db.commit()
+
+
+def get_timestamps(client, title):
+    response = client.post("/movies/get-timestamps/", json={"title": title})
+    response.raise_for_status()
+    return response.json()["timestamps"]
+
+
+def test_edits_of_unsorted_legacy_list_address_the_order_clients_read(client):
+    insert_legacy_movie("Legacy Unsorted", [
+        {"start_time": 100.0, "end_time": 120.0, "label": "late", "categories": []},
+        {"start_time": 10.0, "end_time": 20.0, "label": "early", "categories": []},
+    ])
+    assert [ts["label"] for ts in get_timestamps(client, "Legacy Unsorted")] == ["early", "late"]
+
+    client.post("/movies/update-timestamp/", params={"title": "Legacy Unsorted"},
+                json={"index": 0, "start_time": 200.0, "end_time": 210.0, "label": "moved"}).raise_for_status()
+    assert [(ts["start_time"], ts["label"]) for ts in get_timestamps(client, "Legacy Unsorted")] == [
+        (100.0, "late"), (200.0, "moved")
+    ]
+
+    client.post("/movies/delete-timestamp/", params={"title": "Legacy Unsorted"},
+                json={"index": 0}).raise_for_status()
+    assert [ts["label"] for ts in get_timestamps(client, "Legacy Unsorted")] == ["moved"]
+
+    backend.segment_compactor.compact()
+    assert [ts["label"] for ts in get_timestamps(client, "Legacy Unsorted")] == ["moved"]
+
+
+def test_writes_validate_indexes_against_the_folded_list(client):
+    client.post("/movies/add-timestamps/", json={"title": "Counted", "timestamps": [
+        {"start_time": 10.0, "end_time": 20.0}, {"start_time": 30.0, "end_time": 40.0}
+    ]}).raise_for_status()
+    # Merges both ranges into one, which only folding the pending event shows
+    added = client.post("/movies/add-timestamps/", json={"title": "Counted", "timestamps": [
+        {"start_time": 15.0, "end_time": 35.0}
+    ]})
+    assert isinstance(added.json()["event_id"], int)
+    assert [(ts["start_time"], ts["end_time"]) for ts in added.json()["updated_timestamps"]] == [(10.0, 40.0)]
+
+    missing = client.post("/movies/delete-timestamp/", params={"title": "Counted"}, json={"index": 1})
+    assert missing.status_code == 404
+    missing = client.post("/movies/update-timestamp/", params={"title": "Counted"},
+                          json={"index": 1, "start_time": 50.0, "end_time": 60.0})
+    assert missing.status_code == 404
+
+    updated = client.post("/movies/update-timestamp/", params={"title": "Counted"},
+                          json={"index": 0, "start_time": 50.0, "end_time": 60.0})
+    assert [ts["start_time"] for ts in updated.json()["timestamps"]] == [50.0]
+    deleted = client.post("/movies/delete-timestamp/", params={"title": "Counted"}, json={"index": 0})
+    assert isinstance(deleted.json()["event_id"], int)
+    assert deleted.json()["timestamps"] == []
+    assert get_timestamps(client, "Counted") == []
+
+
+def test_skip_plan_built_before_an_edit_is_not_served(client):
+    client.post("/movies/add-timestamps/", json={"title": "Raced", "timestamps": [
+        {"start_time": 10.0, "end_time": 20.0}
+    ]}).raise_for_status()
+    assert client.post("/skip-plans/get/", json={"title": "Raced"}).json()["plan"] == [[10.0, 20.0, None]]
+
+    # An edit recorded without refreshing the stored plans, as a write from an older worker would
+    with backend.SessionLocal() as db:
+        movie = db.query(backend.Movie).filter(backend.Movie.title == "Raced").one()
+        db.add(backend.SegmentEvent(media_type="movie", media_id=movie.id, action="add",
+                                    data=[{"start_time": 30.0, "end_time": 40.0, "label": None, "categories": []}]))
+        db.flush()
+        movie.last_event_id = db.query(sqlalchemy.func.max(backend.SegmentEvent.id)).scalar()
+        db.commit()
+
+    plan = client.post("/skip-plans/get/", json={"title": "Raced"}).json()["plan"]
+    assert plan == [[10.0, 20.0, None], [30.0, 40.0, None]]
+
+
+def stored_plans(title):
+    with backend.SessionLocal() as db:
+        movie = db.query(backend.Movie).filter(backend.Movie.title == title).one()
+        plans = db.query(backend.SkipPlan).filter(
+            backend.SkipPlan.media_type == "movie", backend.SkipPlan.media_id == movie.id
+        ).all()
+        return movie.last_event_id, [(plan.id, plan.event_id, plan.plan) for plan in plans]
+
+
+def test_edits_recompute_stored_skip_plans(client):
+    client.post("/movies/add-timestamps/", json={"title": "Maintained", "timestamps": [
+        {"start_time": 10.0, "end_time": 20.0}
+    ]}).raise_for_status()
+    client.post("/skip-plans/get/", json={"title": "Maintained", "buffer_seconds": 1}).raise_for_status()
+    _, [(plan_id, _, _)] = stored_plans("Maintained")
+
+    client.post("/movies/add-timestamps/", json={"title": "Maintained", "timestamps": [
+        {"start_time": 30.0, "end_time": 40.0}
+    ]}).raise_for_status()
+    last_event_id, plans = stored_plans("Maintained")
+    assert plans == [(plan_id, last_event_id, [[9.0, 21.0, None], [29.0, 41.0, None]])]
+
+    client.post("/movies/delete-timestamp/", params={"title": "Maintained"}, json={"index": 0}).raise_for_status()
+    last_event_id, plans = stored_plans("Maintained")
+    assert plans == [(plan_id, last_event_id, [[29.0, 41.0, None]])]
+    plan = client.post("/skip-plans/get/", json={"title": "Maintained", "buffer_seconds": 1}).json()["plan"]
+    assert plan == [[29.0, 41.0, None]]
+    assert stored_plans("Maintained")[1][0][0] == plan_id
+
+
+def test_skip_plans_of_normalized_spellings_are_read_back(client):
+    client.post("/movies/add-timestamps/", json={"title": "The Spelled Film", "timestamps": [
+        {"start_time": 10.0, "end_time": 20.0}
+    ]}).raise_for_status()
+    hits = backend.SKIP_PLAN_LOOKUPS.value("hit")
+    for _ in range(3):
+        response = client.post("/skip-plans/get/", json={"title": "Spelled Film, The"})
+        assert response.json()["plan"] == [[10.0, 20.0, None]]
+    assert backend.SKIP_PLAN_LOOKUPS.value("hit") == hits + 2
+    assert len(stored_plans("The Spelled Film")[1]) == 1
+
+
+def test_skip_plan_buffers_are_rounded_to_one_stored_plan(client):
+    client.post("/movies/add-timestamps/", json={"title": "Buffered", "timestamps": [
+        {"start_time": 10.0, "end_time": 20.0}
+    ]}).raise_for_status()
+    for buffer_seconds in (2.0, 2.04, 1.96):
+        response = client.post("/skip-plans/get/", json={"title": "Buffered", "buffer_seconds": buffer_seconds})
+        assert response.json()["buffer_seconds"] == 2.0
+        assert response.json()["plan"][0][:2] == [8.0, 22.0]
+
+    with backend.SessionLocal() as db:
+        movie = db.query(backend.Movie).filter(backend.Movie.title == "Buffered").one()
+        plans = db.query(backend.SkipPlan).filter(backend.SkipPlan.media_id == movie.id).all()
+        assert [plan.buffer_ms for plan in plans] == [2000]
+
+
+class Checkpoints:
+    def checkpoint(self, done=None, total=None):
+        pass
+
+
+def test_normalize_job_stores_legacy_lists_normalized(client):
+    insert_legacy_movie("Legacy Normalized", [
+        {"start_time": 50.0, "end_time": 60.0, "label": "late", "categories": []},
+        {"start_time": 5.0, "end_time": 8.0, "label": "early", "categories": []},
+    ])
+    read_before = get_timestamps(client, "Legacy Normalized")
+
+    result = backend.normalize_job(Checkpoints())
+    assert result["changed"] >= 1
+    with backend.SessionLocal() as db:
+        movie = db.query(backend.Movie).filter(backend.Movie.title == "Legacy Normalized").one()
+        assert movie.compacted_event_id
+        assert movie.timestamps == read_before
+    assert get_timestamps(client, "Legacy Normalized") == read_before
+
+    history = client.post("/segment-events/history/", json={"title": "Legacy Normalized"}).json()["events"]
+    assert [(event["action"], event["author"]) for event in history] == [("replace", "job:normalize")]
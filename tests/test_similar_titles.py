@@ -0,0 +1,31 @@
+def add_movie(client, title):
+    client.post("/movies/add-timestamps/", json={
+        "title": title, "timestamps": [{"start_time": 10.0, "end_time": 20.0}]
+    }).raise_for_status()
+
+
+def test_fuzzy_matches_are_marked_and_never_linked(client):
+    add_movie(client, "Sequel Story II")
+    add_movie(client, "Sequel Story The Film")
+
+    response = client.post("/movies/get-timestamps/", json={
+        "title": "Sequel Story Film", "rating_key": 990001, "guids": ["imdb://tt9900001"]
+    }).json()
+    assert response["title"] == "Sequel Story The Film"
+    assert response["match"] == "fuzzy"
+    assert client.get("/media/990001/timestamps").status_code == 404
+
+
+def test_sequels_and_other_years_are_not_served(client):
+    add_movie(client, "Numbered Saga II")
+    add_movie(client, "Remade (1984)")
+
+    assert client.post("/movies/get-timestamps/", json={"title": "Numbered Saga III"}).status_code == 404
+    assert client.post("/movies/get-timestamps/", json={"title": "Remade (2021)"}).status_code == 404
+    assert client.post("/movies/get-timestamps/", json={"title": "remade"}).json()["match"] == "normalized"
+
+
+def test_skip_plans_ignore_fuzzy_matches(client):
+    add_movie(client, "Planned Picture The Movie")
+    assert client.post("/skip-plans/get/", json={"title": "Planned Picture Movie"}).status_code == 404
+    assert client.post("/skip-plans/get/", json={"title": "planned picture the movie"}).status_code == 200
@@ -0,0 +1,56 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import metrics
+from singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_run_once():
+    registry = metrics.Registry()
+    flights = SingleFlight(registry)
+    release = threading.Event()
+    calls = []
+
+    def read():
+        calls.append(1)
+        release.wait(2)
+        return {"title": "Alien"}
+
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(flights.do, "alien", read) for _ in range(4)]
+        while flights._calls.value("shared") < 3:
+            threading.Event().wait(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert calls == [1]
+    assert all(result is results[0] for result in results)
+    assert flights._calls.value("leader") == 1
+
+
+def test_waiters_get_the_leaders_exception():
+    flights = SingleFlight(metrics.Registry())
+    release = threading.Event()
+
+    def read():
+        release.wait(2)
+        raise LookupError("gone")
+
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(flights.do, "alien", read) for _ in range(2)]
+        while flights._calls.value("shared") < 1:
+            threading.Event().wait(0.01)
+        release.set()
+        for future in futures:
+            with pytest.raises(LookupError):
+                future.result()
+
+
+def test_results_are_not_cached_and_keys_do_not_share():
+    flights = SingleFlight()
+    counter = iter(range(10))
+    assert flights.do("a", next, counter) == 0
+    assert flights.do("a", next, counter) == 1
+    assert flights.do("b", next, counter) == 2
@@ -0,0 +1,72 @@
+from skip_engine import SKIP_COOLDOWN_MS, SkipEngine, chain_ends
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def engine_at(position_ms, plan, seek, clock, chain_gap_ms=1000):
+    engine = SkipEngine("tv", seek, clock=clock, chain_gap_ms=chain_gap_ms)
+    engine.plan = plan
+    engine.update_position(position_ms, 'paused')
+    return engine
+
+
+def test_chain_ends():
+    plan = [[10, 20, "a"], [20.5, 30, "b"], [31, 40, "c"], [60, 70, "d"], [65, 68, "e"], [100, 110, "f"]]
+    assert chain_ends(plan, 1.0) == [2, 2, 2, 4, 4, 5]
+    assert chain_ends(plan, 0.0) == [0, 1, 2, 4, 4, 5]
+    assert chain_ends([], 1.0) == []
+
+
+def test_chained_ranges_are_cleared_with_one_seek():
+    seeks = []
+    engine = engine_at(12000, [[10, 20, "intro"], [20.5, 30, None], [31, 40, "recap"], [60, 70, "credits"]],
+                       seeks.append, Clock())
+    assert engine.tick() == ["intro", None, "recap"]
+    assert seeks == [40000]
+    assert engine.current_position_ms() == 40000
+    assert engine.tick() == []
+
+
+def test_nested_range_does_not_cut_the_chain_short():
+    seeks = []
+    engine = engine_at(61000, [[60, 90, None], [65, 70, None]], seeks.append, Clock())
+    engine.tick()
+    assert seeks == [90000]
+
+
+def test_skipped_ranges_cool_down_individually():
+    seeks = []
+    clock = Clock()
+    engine = engine_at(12000, [[10, 20, "a"], [40, 50, "b"]], seeks.append, clock, chain_gap_ms=0)
+    engine.tick()
+    # Seeking back into the skipped range is honoured until the cooldown ends
+    engine.update_position(15000, 'paused')
+    assert engine.tick() == []
+    engine.update_position(45000, 'paused')
+    assert engine.tick() == ["b"]
+
+    clock.now += SKIP_COOLDOWN_MS / 1000 + 0.1
+    engine.update_position(15000, 'paused')
+    assert engine.tick() == ["a"]
+    assert seeks == [20000, 50000, 20000]
+
+
+def test_failed_seek_lets_the_range_be_retried():
+    attempts = []
+
+    def seek(position):
+        attempts.append(position)
+        if len(attempts) == 1:
+            raise ConnectionError("player gone")
+
+    engine = engine_at(12000, [[10, 20, "a"]], seek, Clock())
+    engine.tick()
+    engine.update_position(12000, 'paused')
+    engine.tick()
+    assert attempts == [20000, 20000]
@@ -0,0 +1,52 @@
+import json
+
+from skip_telemetry import CONFIRM_TIMEOUT, SkipTelemetry
+
+
+def test_ring_buffer_keeps_the_latest_records():
+    telemetry = SkipTelemetry(capacity=3)
+    for i in range(5):
+        telemetry.record_skip("tv", 1000 * i, 1000 * i, 5000 * i, 0.0, 0.01, error="gone")
+    assert [record["planned_ms"] for record in telemetry.records] == [2000, 3000, 4000]
+
+
+def test_skips_are_settled_by_confirmation_or_expiry():
+    telemetry = SkipTelemetry()
+    telemetry.record_skip("tv", 10000, 10250, 60000, 100.0, 100.05)
+    telemetry.confirm("tv", 30000, now=101.0)
+    assert telemetry.skips.value("tv", "confirmed") == 0
+    telemetry.confirm("tv", 59000, now=101.0)
+    assert telemetry.skips.value("tv", "confirmed") == 1
+
+    telemetry.record_skip("phone", 10000, 10000, 60000, 200.0, 200.1)
+    telemetry.expire(now=200.0 + CONFIRM_TIMEOUT / 2)
+    assert telemetry.skips.value("phone", "unconfirmed") == 0
+    telemetry.expire(now=200.0 + CONFIRM_TIMEOUT + 1)
+    assert telemetry.skips.value("phone", "unconfirmed") == 1
+
+    summary = telemetry.summary("tv")
+    assert summary["skips"] == 1
+    assert summary["lateness_ms_p50"] == 250
+    assert summary["confirm_ms_p50"] == 1000.0
+    assert telemetry.summary()["confirmed_ratio"] == 0.5
+
+
+def test_a_new_skip_settles_the_pending_one_as_unconfirmed():
+    telemetry = SkipTelemetry()
+    telemetry.record_skip("tv", 1000, 1000, 5000, 0.0, 0.01)
+    telemetry.record_skip("tv", 9000, 9000, 12000, 1.0, 1.01)
+    assert telemetry.skips.value("tv", "unconfirmed") == 1
+
+
+def test_finished_records_are_exported(tmp_path):
+    log_path = tmp_path / "skips.jsonl"
+    metrics_path = tmp_path / "skips.prom"
+    telemetry = SkipTelemetry(log_path=str(log_path), metrics_path=str(metrics_path))
+    telemetry.record_skip("tv", 1000, 1200, 5000, 0.0, 0.02)
+    telemetry.confirm("tv", 5000, now=0.5)
+
+    (line,) = log_path.read_text().splitlines()
+    record = json.loads(line)
+    assert record["confirmed"] is True
+    assert not any(key.startswith("_") for key in record)
+    assert 'plex_skip_client_skips_total{client="tv",result="confirmed"} 1' in metrics_path.read_text()
@@ -0,0 +1,56 @@
+import os
+
+import wire_format
+from snapshot import Snapshot, SnapshotStore, SnapshotWriter
+
+ALIEN = {"title": "Alien", "timestamps": [
+    {"start_time": 10.0, "end_time": 20.5, "label": "chestburster", "categories": ["gore"]}
+]}
+HEAT = {"title": "Heat", "timestamps": []}
+
+
+def write_snapshot(path, *records):
+    writer = SnapshotWriter(meta={"generation": len(records)})
+    for payload, keys in records:
+        writer.add(payload, keys)
+    writer.write(str(path))
+
+
+def decoded(record):
+    return wire_format.unpack_payload(bytes(record))
+
+
+def test_records_are_read_back_under_each_key(tmp_path):
+    path = tmp_path / "skip.snapshot"
+    write_snapshot(path, (ALIEN, [("movie", "Alien"), ("rating_key", 1)]), (HEAT, [("movie", "Heat")]))
+
+    snapshot = Snapshot(str(path))
+    assert len(snapshot) == 3
+    assert snapshot.meta == {"generation": 2, "records": 2}
+    assert decoded(snapshot.record("movie", "Alien")) == ALIEN
+    assert decoded(snapshot.record("rating_key", 1)) == ALIEN
+    assert decoded(snapshot.record("movie", "Heat")) == HEAT
+    assert not os.path.exists(f"{path}.tmp")
+
+
+def test_missing_keys_return_none(tmp_path):
+    path = tmp_path / "skip.snapshot"
+    write_snapshot(path, (ALIEN, [("movie", "Alien")]))
+    assert Snapshot(str(path)).record("movie", "Aliens") is None
+
+    write_snapshot(path)
+    assert Snapshot(str(path)).record("movie", "Alien") is None
+
+
+def test_store_swaps_to_a_rewritten_file(tmp_path):
+    path = tmp_path / "skip.snapshot"
+    write_snapshot(path, (ALIEN, [("movie", "Alien")]))
+    store = SnapshotStore(str(path))
+    previous = store.current
+    assert store.reload() is False
+
+    write_snapshot(path, (ALIEN, [("movie", "Alien")]), (HEAT, [("movie", "Heat")]))
+    assert store.reload() is True
+    assert decoded(store.current.record("movie", "Heat")) == HEAT
+    # Requests that started on the old snapshot still read it
+    assert previous.record("movie", "Heat") is None
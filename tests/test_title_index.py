@@ -0,0 +1,34 @@
+import pytest
+
+from title_index import TitleIndex, numerals, normalize_title, release_year
+
+STORED = ["Saw II", "Toy Story 2", "Rocky III", "Scream 2", "The Matrix", "Star Wars: Episode V"]
+
+
+@pytest.fixture
+def index():
+    title_index = TitleIndex()
+    for key, title in enumerate(STORED):
+        title_index.add(key, title)
+    return title_index
+
+
+@pytest.mark.parametrize("title", ["Saw III", "Toy Story 3", "Rocky IV", "Scream", "Saw 2"])
+def test_sequels_do_not_match_each_other(index, title):
+    assert index.best_match(title) is None
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("Matrix", "The Matrix"),
+    ("Toy Story  2!", "Toy Story 2"),
+    ("Star Wars Episode V", "Star Wars: Episode V"),
+])
+def test_near_misses_with_the_same_numbers_match(index, title, expected):
+    assert STORED[index.best_match(title)] == expected
+
+
+def test_numerals_and_release_year():
+    assert numerals(normalize_title("Rocky IV")) == {"iv"}
+    assert numerals(normalize_title("Mix It Up")) == frozenset()
+    assert release_year("Dune (2021)") == "2021"
+    assert release_year("Dune") is None
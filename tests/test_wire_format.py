@@ -0,0 +1,50 @@
+import pytest
+
+import wire_format
+
+SEGMENTS = [
+    {"start_time": 10.5, "end_time": 20.25, "label": "intro", "categories": ["gore"]},
+    {"start_time": 30.0, "end_time": 45.125, "label": None, "categories": []},
+    {"start_time": 3600.001, "end_time": 3720.5, "label": "intro", "categories": ["gore", "nudity"]},
+]
+PAYLOAD = {"title": "Alien", "match": "exact", "timestamps": SEGMENTS}
+
+
+def test_packed_round_trip():
+    content = wire_format.encode(PAYLOAD, wire_format.PACKED_MEDIA_TYPE)
+    assert wire_format.decode(content, wire_format.PACKED_MEDIA_TYPE) == PAYLOAD
+
+
+def test_packed_round_trip_of_plans_and_empty_blocks():
+    payload = {"buffer_seconds": 2.0, "plan": [[8.5, 22.0, "intro"], [100.0, 130.75, None]], "timestamps": []}
+    content = wire_format.encode(payload, wire_format.PACKED_MEDIA_TYPE)
+    assert wire_format.decode(content, f"{wire_format.PACKED_MEDIA_TYPE}; charset=binary") == payload
+
+
+def test_packed_round_trip_of_many_labels_and_categories():
+    segments = [
+        {"start_time": float(i), "end_time": i + 0.5, "label": f"label {i}", "categories": [f"c{i % 12}"]}
+        for i in range(70000)
+    ]
+    decoded = wire_format.decode(wire_format.pack_payload({"timestamps": segments}), wire_format.PACKED_MEDIA_TYPE)
+    assert decoded["timestamps"][::9999] == segments[::9999]
+
+
+def test_msgpack_round_trip():
+    pytest.importorskip("msgpack")
+    content = wire_format.encode(PAYLOAD, wire_format.MSGPACK_MEDIA_TYPE)
+    assert wire_format.decode(content, wire_format.MSGPACK_MEDIA_TYPE) == PAYLOAD
+
+
+def test_msgpack_falls_back_to_json_without_the_package(monkeypatch):
+    monkeypatch.setattr(wire_format, "msgpack", None)
+    assert wire_format.supported_media_types() == [wire_format.PACKED_MEDIA_TYPE]
+    assert wire_format.negotiate(f"{wire_format.MSGPACK_MEDIA_TYPE}, {wire_format.JSON_MEDIA_TYPE};q=0.5") is None
+    with pytest.raises(ValueError):
+        wire_format.encode(PAYLOAD, wire_format.MSGPACK_MEDIA_TYPE)
+
+
+def test_negotiate_prefers_the_packed_format():
+    assert wire_format.negotiate(wire_format.ACCEPT_COMPACT) == wire_format.PACKED_MEDIA_TYPE
+    assert wire_format.negotiate(None) is None
+    assert wire_format.decode(b'{"plan": []}', None) == {"plan": []}
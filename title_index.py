@@ -0,0 +1,126 @@
+import re
+import sys
+import threading
+import unicodedata
+from math import ceil
+from typing import Dict, List, Optional, Tuple
+
+# A trailing release year such as "Dune (2021)" or "Dune [2021]"
+YEAR_SUFFIX = re.compile(r"\s*[\(\[]\s*(?:19|20)\d{2}\s*[\)\]]\s*$")
+NON_WORD = re.compile(r"[^\w\s]|_")
+WHITESPACE = re.compile(r"\s+")
+ARTICLES = ("the", "a", "an")
+# Words numbering a film in a series: "2", "iii", "1984"
+NUMERAL = re.compile(r"^(?:\d+|x{0,3}(?:ix|iv|v?i{1,3}|v)|x{1,3})$")
+YEAR = re.compile(r"(?:19|20)\d{2}")
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for comparison.
+
+    Accents, case, punctuation and a trailing year are dropped, and a leading
+    or trailing article ("The Matrix", "Matrix, The") is removed.
+    """
+    text = unicodedata.normalize("NFKD", title or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = YEAR_SUFFIX.sub("", text).casefold().replace("&", " and ")
+    text = WHITESPACE.sub(" ", NON_WORD.sub(" ", text)).strip()
+
+    words = text.split(" ")
+    if len(words) > 1 and words[0] in ARTICLES:
+        words = words[1:]
+    elif len(words) > 1 and words[-1] in ARTICLES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def numerals(normalized: str) -> frozenset:
+    """Sequel numbers of a normalized title; titles differing in them are different films."""
+    return frozenset(word for word in normalized.split(" ") if NUMERAL.match(word))
+
+
+def release_year(title: str) -> Optional[str]:
+    """The trailing year of a title such as "Dune (2021)", which normalize_title drops."""
+    suffix = YEAR_SUFFIX.search(title or "")
+    return YEAR.search(suffix.group()).group() if suffix else None
+
+
+def trigrams(normalized: str) -> Tuple[str, ...]:
+    """Distinct character trigrams of a normalized title, padded at the edges."""
+    padded = f"  {normalized} "
+    return tuple(sorted({padded[i:i + 3] for i in range(len(padded) - 2)}))
+
+
+class TitleIndex:
+    """In-memory trigram index for resolving near-miss titles.
+
+    Entries are only ever added, keyed by the integer id of the stored row, so
+    the index can be topped up incrementally with rows newer than last_key.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.last_key = 0
+        self._trigrams: Dict[int, Tuple[str, ...]] = {}
+        self._numerals: Dict[int, frozenset] = {}
+        self._postings: Dict[str, List[int]] = {}
+
+    def __len__(self):
+        return len(self._trigrams)
+
+    def add(self, key: int, title: str, normalized: Optional[str] = None):
+        """Index a title under the given row id, reusing its normalized form if known."""
+        if key in self._trigrams:
+            return
+        if normalized is None:
+            normalized = normalize_title(title)
+        # Interned so every entry shares one copy of each trigram string
+        grams = tuple(sys.intern(gram) for gram in trigrams(normalized))
+        self._trigrams[key] = grams
+        self._numerals[key] = numerals(normalized)
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(key)
+        self.last_key = max(self.last_key, key)
+
+    def search(self, title: str, limit: int = 5, min_score: float = 0.6) -> List[Tuple[int, float]]:
+        """Return up to limit (key, score) pairs whose Dice similarity reaches min_score.
+
+        Candidates are only gathered from the rarest query trigrams: a title
+        reaching min_score must share at least one of them, so common trigrams
+        never have their long posting lists scanned.
+        """
+        query = trigrams(normalize_title(title))
+        if not query:
+            return []
+        query_set = set(query)
+
+        # Dice >= t needs an overlap of at least t * |q| / (2 - t) trigrams
+        min_overlap = max(1, ceil(min_score * len(query) / (2 - min_score)))
+        postings = sorted(
+            (self._postings[gram] for gram in query if gram in self._postings),
+            key=len
+        )
+        candidates = set()
+        for posting in postings[:len(query) - min_overlap + 1]:
+            candidates.update(posting)
+
+        scored = []
+        for key in candidates:
+            grams = self._trigrams[key]
+            score = 2 * len(query_set.intersection(grams)) / (len(query) + len(grams))
+            if score >= min_score:
+                scored.append((key, score))
+        scored.sort(key=lambda match: match[1], reverse=True)
+        return scored[:limit]
+
+    def best_match(self, title: str, min_score: float = 0.6) -> Optional[int]:
+        """Key of the most similar indexed title, or None when nothing is close enough.
+
+        Sequels score high against each other ("Saw III" and "Saw II"), so
+        only titles with the same sequel numbers qualify.
+        """
+        wanted = numerals(normalize_title(title))
+        for key, _ in self.search(title, limit=len(self._trigrams), min_score=min_score):
+            if self._numerals[key] == wanted:
+                return key
+        return None
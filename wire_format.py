@@ -0,0 +1,226 @@
+import json
+import struct
+import sys
+from array import array
+from typing import List, Optional
+
+try:
+    import msgpack
+except ImportError:  # Optional dependency
+    msgpack = None
+
+# Besides JSON, segment payloads can be sent packed (parallel float32 arrays with
+# label and category dictionaries, standard library only) or as MessagePack when
+# the optional msgpack package is installed.
+JSON_MEDIA_TYPE = "application/json"
+PACKED_MEDIA_TYPE = "application/vnd.plex-skip.packed"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+
+# Accept header clients send to prefer the compact encodings over JSON
+ACCEPT_COMPACT = f"{PACKED_MEDIA_TYPE}, {MSGPACK_MEDIA_TYPE};q=0.9, {JSON_MEDIA_TYPE};q=0.5"
+
+MAGIC = b"PSG1"
+HEADER = struct.Struct("<4sIB")  # magic, JSON header length, block count
+BLOCK_HEADER = struct.Struct("<BI")  # flags, segment count
+
+# Block flags
+TRIPLES = 1  # Segments are [start, end, label] lists instead of dicts
+WIDE_LABELS = 2  # Label references are uint32 instead of uint16
+WIDE_CATEGORIES = 4  # Category bits are uint32 instead of uint8
+
+
+def supported_media_types() -> List[str]:
+    """Binary media types this process can encode and decode."""
+    return [PACKED_MEDIA_TYPE] + ([MSGPACK_MEDIA_TYPE] if msgpack else [])
+
+
+def negotiate(accept: Optional[str]) -> Optional[str]:
+    """Pick the binary media type the client prefers, or None to answer with JSON."""
+    if not accept:
+        return None
+
+    candidates = supported_media_types() + [JSON_MEDIA_TYPE]
+    best, best_quality = None, 0.0
+    for part in accept.split(","):
+        media_range, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        # Earlier entries win ties, matching the order the client listed them
+        if media_range in candidates and quality > best_quality:
+            best, best_quality = media_range, quality
+    return best if best != JSON_MEDIA_TYPE else None
+
+
+def _write_strings(out: bytearray, strings, length_format: str):
+    out += struct.pack(f"<{length_format}", len(strings))
+    for string in strings:
+        encoded = string.encode("utf-8")
+        out += struct.pack(f"<{length_format}", len(encoded))
+        out += encoded
+
+
+def _read_strings(data: memoryview, offset: int, length_format: str):
+    size = struct.calcsize(f"<{length_format}")
+    (count,) = struct.unpack_from(f"<{length_format}", data, offset)
+    offset += size
+    strings = []
+    for _ in range(count):
+        (length,) = struct.unpack_from(f"<{length_format}", data, offset)
+        offset += size
+        strings.append(bytes(data[offset:offset + length]).decode("utf-8"))
+        offset += length
+    return strings, offset
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_array(typecode: str, data: memoryview, offset: int, count: int):
+    values = array(typecode)
+    end = offset + values.itemsize * count
+    values.frombytes(data[offset:end])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values, end
+
+
+def pack_segments(out: bytearray, name: str, segments):
+    """Append one block of segments (dicts or [start, end, label] triples) to out."""
+    triples = bool(segments) and not isinstance(segments[0], dict)
+    labels, label_refs = {}, array("I")
+    categories, category_bits = {}, array("I")
+    starts, ends = array("f"), array("f")
+
+    for segment in segments:
+        if triples:
+            start_time, end_time, label = segment
+            segment_categories = ()
+        else:
+            start_time, end_time = segment["start_time"], segment["end_time"]
+            label = segment.get("label")
+            segment_categories = segment.get("categories") or ()
+        starts.append(start_time)
+        ends.append(end_time)
+        label_refs.append(0 if label is None else labels.setdefault(label, len(labels) + 1))
+        bits = 0
+        for category in segment_categories:
+            bits |= 1 << categories.setdefault(category, len(categories))
+        category_bits.append(bits)
+
+    if len(categories) > 32:
+        raise ValueError("Too many distinct categories for the packed format")
+
+    flags = TRIPLES if triples else 0
+    if len(labels) >= 1 << 16:
+        flags |= WIDE_LABELS
+    else:
+        label_refs = array("H", label_refs)
+    if len(categories) > 8:
+        flags |= WIDE_CATEGORIES
+    else:
+        category_bits = array("B", category_bits)
+
+    encoded_name = name.encode("utf-8")
+    out += struct.pack("<B", len(encoded_name)) + encoded_name
+    out += BLOCK_HEADER.pack(flags, len(starts))
+    _write_strings(out, list(labels), "I")
+    _write_strings(out, list(categories), "B")
+    for values in (starts, ends, label_refs, category_bits):
+        out += _little_endian(values)
+
+
+def unpack_segments(data: memoryview, offset: int):
+    """Read one block written by pack_segments, returning (name, segments, new offset)."""
+    (name_length,) = struct.unpack_from("<B", data, offset)
+    offset += 1
+    name = bytes(data[offset:offset + name_length]).decode("utf-8")
+    offset += name_length
+    flags, count = BLOCK_HEADER.unpack_from(data, offset)
+    offset += BLOCK_HEADER.size
+    labels, offset = _read_strings(data, offset, "I")
+    categories, offset = _read_strings(data, offset, "B")
+    labels.insert(0, None)
+
+    starts, offset = _read_array("f", data, offset, count)
+    ends, offset = _read_array("f", data, offset, count)
+    label_refs, offset = _read_array("I" if flags & WIDE_LABELS else "H", data, offset, count)
+    category_bits, offset = _read_array("I" if flags & WIDE_CATEGORIES else "B", data, offset, count)
+
+    # float32 keeps about seven significant digits, round back to milliseconds
+    if flags & TRIPLES:
+        segments = [
+            [round(start, 3), round(end, 3), labels[ref]]
+            for start, end, ref in zip(starts, ends, label_refs)
+        ]
+    else:
+        # Titles reuse a handful of category combinations, decode each once
+        category_lists = {
+            bits: [category for bit, category in enumerate(categories) if bits >> bit & 1]
+            for bits in set(category_bits)
+        }
+        segments = [
+            {
+                "start_time": round(start, 3),
+                "end_time": round(end, 3),
+                "label": labels[ref],
+                "categories": list(category_lists[bits])
+            }
+            for start, end, ref, bits in zip(starts, ends, label_refs, category_bits)
+        ]
+    return name, segments, offset
+
+
+def pack_payload(payload: dict) -> bytes:
+    """Encode a response dict: list fields as segment blocks, everything else as a JSON header."""
+    header = {key: value for key, value in payload.items() if not isinstance(value, list)}
+    blocks = {key: value for key, value in payload.items() if isinstance(value, list)}
+    encoded_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    out = bytearray(HEADER.pack(MAGIC, len(encoded_header), len(blocks)))
+    out += encoded_header
+    for name, segments in blocks.items():
+        pack_segments(out, name, segments)
+    return bytes(out)
+
+
+def unpack_payload(content: bytes) -> dict:
+    """Decode a payload written by pack_payload."""
+    data = memoryview(content)
+    magic, header_length, block_count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Not a packed segment payload")
+    offset = HEADER.size
+    payload = json.loads(bytes(data[offset:offset + header_length]))
+    offset += header_length
+    for _ in range(block_count):
+        name, segments, offset = unpack_segments(data, offset)
+        payload[name] = segments
+    return payload
+
+
+def encode(payload: dict, media_type: str) -> bytes:
+    """Encode a response dict in one of the supported binary media types."""
+    if media_type == PACKED_MEDIA_TYPE:
+        return pack_payload(payload)
+    if media_type == MSGPACK_MEDIA_TYPE and msgpack:
+        return msgpack.packb(payload, use_bin_type=True)
+    raise ValueError(f"Unsupported media type: {media_type}")
+
+
+def decode(content: bytes, content_type: Optional[str]) -> dict:
+    """Decode a response body according to its Content-Type header."""
+    media_type = (content_type or JSON_MEDIA_TYPE).split(";")[0].strip()
+    if media_type == PACKED_MEDIA_TYPE:
+        return unpack_payload(content)
+    if media_type == MSGPACK_MEDIA_TYPE and msgpack:
+        return msgpack.unpackb(content, raw=False)
+    return json.loads(content)